@@ -0,0 +1,163 @@
+"""
+Cold-start benchmark of the Lambda handlers.
+
+Every run starts a fresh interpreter with ``-X importtime``, imports one
+handler module, invokes it once (the cold invocation) and once more (warm),
+and reports the medians together with the slowest imports of the handler.
+
+Run from the project root against the local database:
+
+    python -m benchmarks.cold_start
+    python -m benchmarks.cold_start --runs 10 --handler schedules --json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# handler name -> (module, API Gateway proxy event of a typical request)
+HANDLERS = {
+    "groups": (
+        "src.lambda_api.groups",
+        {"httpMethod": "GET", "resource": "/api/groups", "path": "/api/groups"},
+    ),
+    "members": (
+        "src.lambda_api.members",
+        {"httpMethod": "GET", "resource": "/api/members", "path": "/api/members"},
+    ),
+    "schedules": (
+        "src.lambda_api.schedules",
+        {
+            "httpMethod": "GET",
+            "resource": "/api/schedules",
+            "path": "/api/schedules",
+            "queryStringParameters": {"groupId": "1", "year": "2026", "month": "1"},
+        },
+    ),
+    "efs_handler": ("src.lambda_api.efs_handler", {"task_type": "help"}),
+}
+
+# Runs in the fresh interpreter: prints the timings as one JSON line
+PROBE = """
+import json, sys, time
+module_name, event = sys.argv[1], json.loads(sys.argv[2])
+started = time.perf_counter()
+module = __import__(module_name, fromlist=["lambda_handler"])
+imported = time.perf_counter()
+cold = module.lambda_handler(event, None)
+invoked = time.perf_counter()
+module.lambda_handler(event, None)
+warm = time.perf_counter()
+print(json.dumps({
+    "importMs": (imported - started) * 1000,
+    "coldInvokeMs": (invoked - imported) * 1000,
+    "warmInvokeMs": (warm - invoked) * 1000,
+    "statusCode": cold.get("statusCode"),
+}))
+"""
+
+
+def parse_importtime(stderr: str) -> dict:
+    """
+    Self import time in microseconds per top-level package, from the
+    ``import time: self | cumulative | name`` lines of -X importtime.
+    """
+    per_package = defaultdict(int)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:") :].split("|")
+        name = name.strip()
+        package = "src" if name.startswith("src.") else name.split(".")[0]
+        per_package[package] += int(self_us)
+    return per_package
+
+
+def run_once(module: str, event: dict, env: dict) -> dict:
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE, module, json.dumps(event)],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings = json.loads(process.stdout.strip().splitlines()[-1])
+    timings["imports"] = parse_importtime(process.stderr)
+    return timings
+
+
+def benchmark(name: str, runs: int, env: dict, top: int) -> dict:
+    module, event = HANDLERS[name]
+    results = [run_once(module, event, env) for _ in range(runs)]
+
+    imports = defaultdict(list)
+    for result in results:
+        for package, self_us in result["imports"].items():
+            imports[package].append(self_us)
+    medians = {
+        package: statistics.median(values) / 1000
+        for package, values in imports.items()
+    }
+    slowest = sorted(medians.items(), key=lambda item: item[1], reverse=True)[:top]
+
+    return {
+        "handler": name,
+        "module": module,
+        "runs": runs,
+        "statusCodes": sorted({result["statusCode"] for result in results}, key=str),
+        "importMs": statistics.median(r["importMs"] for r in results),
+        "coldInvokeMs": statistics.median(r["coldInvokeMs"] for r in results),
+        "warmInvokeMs": statistics.median(r["warmInvokeMs"] for r in results),
+        "slowestImportsMs": {package: round(ms, 2) for package, ms in slowest},
+    }
+
+
+def print_report(reports: list):
+    print(
+        f"{'handler':<12} {'import ms':>10} {'cold call ms':>13} {'warm call ms':>13}"
+        f"  status"
+    )
+    for report in reports:
+        print(
+            f"{report['handler']:<12} {report['importMs']:>10.1f}"
+            f" {report['coldInvokeMs']:>13.1f} {report['warmInvokeMs']:>13.1f}"
+            f"  {report['statusCodes']}"
+        )
+    for report in reports:
+        print(f"\nSlowest imports of {report['handler']} (self time, ms):")
+        for package, ms in report["slowestImportsMs"].items():
+            print(f"  {package:<30} {ms:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--handler", choices=sorted(HANDLERS), action="append")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="slowest imports shown")
+    parser.add_argument("--db", help="database file, default: the local one")
+    parser.add_argument("--json", action="store_true", help="print JSON results")
+    args = parser.parse_args()
+
+    env = dict(os.environ, ENV="local")
+    if args.db:
+        env["SQLITE_PATH"] = os.path.abspath(args.db)
+
+    reports = [
+        benchmark(name, args.runs, env, args.top)
+        for name in (args.handler or list(HANDLERS))
+    ]
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    else:
+        print_report(reports)
+
+
+if __name__ == "__main__":
+    main()
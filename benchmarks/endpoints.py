@@ -0,0 +1,416 @@
+"""
+Endpoint benchmark of every API route.
+
+Each route is driven through the real Lambda handlers and the Flask test
+client against a database from benchmarks.generate_dataset, with request
+parameters drawn from that database. The report has the throughput and the
+p50/p95/p99 latency per route and target; --output saves it as JSON so runs
+on different datasets or commits can be compared with --compare.
+
+The database is copied first: the write routes run against the copy.
+
+    python -m benchmarks.generate_dataset /tmp/bench.db
+    python -m benchmarks.endpoints --db /tmp/bench.db --output /tmp/run1.json
+    python -m benchmarks.endpoints --db /tmp/bench.db --compare /tmp/run1.json
+"""
+
+import argparse
+import datetime
+import importlib
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import time
+from typing import NamedTuple, Optional
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TARGETS = ("lambda", "flask")
+
+# Lambda handler module serving each top-level resource (template.yml)
+LAMBDA_MODULES = {
+    "groups": "src.lambda_api.groups",
+    "members": "src.lambda_api.members",
+    "schedules": "src.lambda_api.schedules",
+    "attendances": "src.lambda_api.schedules",
+}
+
+
+class Request(NamedTuple):
+    method: str
+    resource: str
+    path_parameters: dict = {}
+    query: Optional[dict] = None
+    body: Optional[dict] = None
+
+    @property
+    def path(self) -> str:
+        return self.resource.format(**self.path_parameters)
+
+    def to_event(self) -> dict:
+        """The API Gateway proxy event of the request."""
+        path_parameters = {name: str(v) for name, v in self.path_parameters.items()}
+        query = {name: str(value) for name, value in (self.query or {}).items()}
+        return {
+            "httpMethod": self.method,
+            "resource": self.resource,
+            "path": self.path,
+            "pathParameters": path_parameters or None,
+            "queryStringParameters": query or None,
+            "headers": {"Accept": "application/json"},
+            "body": json.dumps(self.body) if self.body is not None else None,
+        }
+
+
+class Dataset:
+    """Ids and months of the database, to draw request parameters from."""
+
+    def __init__(self, db_path: str, rnd: random.Random):
+        self.rnd = rnd
+        conn = sqlite3.connect(db_path)
+        try:
+            self.group_ids = [row[0] for row in conn.execute("SELECT id FROM groups")]
+            self.member_ids = [row[0] for row in conn.execute("SELECT id FROM members")]
+            self.schedule_ids = [
+                row[0] for row in conn.execute("SELECT id FROM schedules")
+            ]
+            self.attendance_ids = [
+                row[0]
+                for row in conn.execute("SELECT id FROM attendance ORDER BY random()")
+            ][:2000]
+            self.months = [
+                tuple(map(int, row[0].split("-")))
+                for row in conn.execute(
+                    "SELECT DISTINCT substr(schedule_day, 1, 7) FROM schedules"
+                )
+            ]
+            tables = ("groups", "members", "schedules", "attendance", "bills")
+            self.counts = {
+                table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in tables
+            }
+        finally:
+            conn.close()
+        # Schedules created by the benchmark, deleted by the delete route
+        self.created_schedule_ids = []
+        self._future_month = 0
+
+    def pick(self, values):
+        return self.rnd.choice(values)
+
+    def next_future_month(self) -> datetime.date:
+        """A month of its own for every create request, far after the data."""
+        self._future_month += 1
+        year, month = divmod(self._future_month, 12)
+        return datetime.date(2100 + year, month + 1, 1)
+
+
+def _fees(data: Dataset) -> Request:
+    year, month = data.pick(data.months)
+    return Request(
+        "GET",
+        "/api/groups/{group_id}/fees/{year}/{month}",
+        {"group_id": data.pick(data.group_ids), "year": year, "month": month},
+    )
+
+
+def _fee_report(data: Dataset) -> Request:
+    # A year-end report: the twelve months of a year of the dataset
+    year, _ = data.pick(data.months)
+    query = {"fromYear": year, "fromMonth": 1, "toYear": year, "toMonth": 12}
+    if data.rnd.random() < 0.5:
+        query["groupId"] = data.pick(data.group_ids)
+    return Request("GET", "/api/groups/fees", query=query)
+
+
+def _export(data: Dataset) -> Request:
+    # A year of attendance rows of a group, as CSV
+    year, _ = data.pick(data.months)
+    query = {"fromYear": year, "fromMonth": 1, "toYear": year, "toMonth": 12}
+    return Request(
+        "GET",
+        "/api/groups/{group_id}/export",
+        {"group_id": data.pick(data.group_ids)},
+        query=query,
+    )
+
+
+def _schedules(data: Dataset) -> Request:
+    year, month = data.pick(data.months)
+    query = {"groupId": data.pick(data.group_ids), "year": year, "month": month}
+    return Request("GET", "/api/schedules", query=query)
+
+
+def _create_schedule(data: Dataset) -> Request:
+    day = data.next_future_month().replace(day=data.rnd.randint(1, 28))
+    body = {"groupId": data.pick(data.group_ids), "scheduleDate": f"{day}T19:00:00"}
+    return Request("POST", "/api/schedules", body=body)
+
+
+def _create_recurring(data: Dataset) -> Request:
+    start = data.next_future_month()
+    body = {
+        "groupId": data.pick(data.group_ids),
+        "startDate": start.isoformat(),
+        "endDate": (start + datetime.timedelta(days=27)).isoformat(),
+        "frequency": "weekly",
+        "weekdays": [data.rnd.randint(0, 6)],
+    }
+    return Request("POST", "/api/schedules/recurring", body=body)
+
+
+def _patch_attendances(data: Dataset) -> Request:
+    changes = [
+        {"attendanceId": attendance_id, "joined": data.rnd.random() < 0.5}
+        for attendance_id in data.rnd.sample(data.attendance_ids, 5)
+    ]
+    return Request("PATCH", "/api/attendances", body={"changes": changes})
+
+
+def _delete_schedule(data: Dataset) -> Optional[Request]:
+    if not data.created_schedule_ids:
+        return None
+    path_parameters = {"schedule_id": data.created_schedule_ids.pop()}
+    return Request("DELETE", "/api/schedules/{schedule_id}", path_parameters)
+
+
+# Route name -> request factory, run in this order: reads first, the
+# deletes last so they remove the schedules the creates added
+ROUTES = {
+    "list groups": lambda data: Request("GET", "/api/groups"),
+    "member fees": _fees,
+    "fee report": _fee_report,
+    "group export": _export,
+    "list members": lambda data: Request("GET", "/api/members"),
+    "member detail": lambda data: Request(
+        "GET", "/api/members/{member_id}", {"member_id": data.pick(data.member_ids)}
+    ),
+    "member bills": lambda data: Request(
+        "GET", "/api/members/bills", query={"groupId": data.pick(data.group_ids)}
+    ),
+    "search schedules": _schedules,
+    "schedule detail": lambda data: Request(
+        "GET",
+        "/api/schedules/{schedule_id}",
+        {"schedule_id": data.pick(data.schedule_ids)},
+    ),
+    "patch attendance": lambda data: Request(
+        "PATCH",
+        "/api/attendances/{attendance_id}",
+        {"attendance_id": data.pick(data.attendance_ids)},
+        body={"joined": data.rnd.random() < 0.5},
+    ),
+    "patch attendances": _patch_attendances,
+    "create schedule": _create_schedule,
+    "create recurring": _create_recurring,
+    "delete schedule": _delete_schedule,
+}
+
+
+class LambdaTarget:
+    def __init__(self):
+        self._modules = {
+            resource: importlib.import_module(module)
+            for resource, module in LAMBDA_MODULES.items()
+        }
+
+    def send(self, request: Request):
+        """:return: (status code, response body)"""
+        module = self._modules[request.resource.split("/")[2]]
+        response = module.lambda_handler(request.to_event(), None)
+        return response["statusCode"], response.get("body")
+
+
+class FlaskTarget:
+    def __init__(self):
+        from flask_main import app
+
+        self._client = app.test_client()
+
+    def send(self, request: Request):
+        """:return: (status code, response body)"""
+        response = self._client.open(
+            request.path,
+            method=request.method,
+            query_string=request.query,
+            json=request.body,
+        )
+        return response.status_code, response.get_data(as_text=True)
+
+
+def percentile(sorted_values: list, percent: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(percent / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def remember_created(data: Dataset, route: str, status_code: int, body: str):
+    if route not in ("create schedule", "create recurring"):
+        return
+    if status_code != 200 or not body:
+        return
+    payload = json.loads(body)
+    if route == "create schedule":
+        data.created_schedule_ids.append(payload["scheduleId"])
+    elif route == "create recurring":
+        data.created_schedule_ids.extend(s["id"] for s in payload["data"]["created"])
+
+
+def run_route(target, data: Dataset, route: str, requests: int, warmup: int) -> dict:
+    factory = ROUTES[route]
+    latencies = []
+    status_codes = {}
+    errors = 0
+    elapsed = 0.0
+    for index in range(warmup + requests):
+        request = factory(data)
+        if request is None:
+            break
+        started = time.perf_counter()
+        try:
+            status_code, body = target.send(request)
+        except Exception:
+            status_code, body = "exception", None
+        duration = time.perf_counter() - started
+        remember_created(data, route, status_code, body)
+        if index < warmup:
+            continue
+        elapsed += duration
+        latencies.append(duration * 1000)
+        status_codes[str(status_code)] = status_codes.get(str(status_code), 0) + 1
+        if status_code not in (200, 304):
+            errors += 1
+
+    latencies.sort()
+    count = len(latencies)
+    return {
+        "route": route,
+        "requests": count,
+        "errors": errors,
+        "statusCodes": status_codes,
+        "throughputRps": round(count / elapsed, 1) if elapsed else 0.0,
+        "meanMs": round(sum(latencies) / count, 3) if count else 0.0,
+        "p50Ms": round(percentile(latencies, 50), 3),
+        "p95Ms": round(percentile(latencies, 95), 3),
+        "p99Ms": round(percentile(latencies, 99), 3),
+        "maxMs": round(latencies[-1], 3) if latencies else 0.0,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report: dict, previous: Optional[dict] = None):
+    baseline = {}
+    if previous:
+        baseline = {
+            (result["target"], result["route"]): result
+            for result in previous["results"]
+        }
+    print(
+        f"{'target':<7} {'route':<18} {'n':>5} {'err':>4} {'req/s':>8}"
+        f" {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+        + ("  p50 / p95 vs baseline" if previous else "")
+    )
+    for result in report["results"]:
+        line = (
+            f"{result['target']:<7} {result['route']:<18} {result['requests']:>5}"
+            f" {result['errors']:>4} {result['throughputRps']:>8.1f}"
+            f" {result['p50Ms']:>8.2f} {result['p95Ms']:>8.2f} {result['p99Ms']:>8.2f}"
+        )
+        before = baseline.get((result["target"], result["route"]))
+        if before:
+            line += "  " + " / ".join(
+                f"{change(before[key], result[key]):>+7.1f}%"
+                for key in ("p50Ms", "p95Ms")
+            )
+        print(line)
+
+
+def change(before: float, after: float) -> float:
+    return (after - before) / before * 100 if before else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--db", required=True, help="database to benchmark")
+    parser.add_argument("--target", choices=TARGETS, action="append")
+    parser.add_argument("--route", choices=list(ROUTES), action="append")
+    parser.add_argument("--requests", type=int, default=200, help="per route")
+    parser.add_argument("--warmup", type=int, default=10, help="per route")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--no-query-cache", action="store_true", help="disable the query cache"
+    )
+    parser.add_argument("--trace", action="store_true", help="keep trace output")
+    parser.add_argument("--output", help="save the results as JSON")
+    parser.add_argument("--compare", help="JSON results of an earlier run")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="feeminton-bench-")
+    db_path = os.path.join(work_dir, "feeminton.db")
+    shutil.copy(args.db, db_path)
+
+    # The settings are read at import, set them before importing the app
+    os.environ.update(ENV="local", SQLITE_PATH=db_path)
+    os.environ.setdefault("TRACING_ENABLED", "1" if args.trace else "0")
+    if args.no_query_cache:
+        os.environ["QUERY_CACHE_SIZE"] = "0"
+    logging.disable(logging.INFO)
+
+    data = Dataset(db_path, random.Random(args.seed))
+    results = []
+    try:
+        for target_name in args.target or TARGETS:
+            target = LambdaTarget() if target_name == "lambda" else FlaskTarget()
+            for route in args.route or ROUTES:
+                result = run_route(target, data, route, args.requests, args.warmup)
+                results.append({"target": target_name, **result})
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "startedAt": datetime.datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "database": os.path.abspath(args.db),
+            "rows": data.counts,
+            "months": len(data.months),
+            "requestsPerRoute": args.requests,
+            "warmup": args.warmup,
+            "queryCache": not args.no_query_cache,
+        },
+        "results": results,
+    }
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            previous = json.load(file)
+    print_report(report, previous)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Synthetic database generator for the benchmarks.
+
+Builds a database with the current schema (all migrations) and a
+configurable volume: groups, members per group, and years of weekly
+schedules with an attendance row per member. Every member has their own
+dropout rate around --dropout, and dropouts get the refunds the API would
+give them, so the fee ledger is the one production would have.
+
+    python -m benchmarks.generate_dataset /tmp/bench.db
+    python -m benchmarks.generate_dataset /tmp/big.db --groups 20 --years 5
+"""
+
+import argparse
+import datetime
+import os
+import random
+import sqlite3
+import time
+
+from src.common.migrations import apply_migrations, optimize
+from src.common.unit_of_work import UnitOfWork
+from src.services.schedules import MAX_REFUND_GROUPS, MIN_FEE_GROUPS
+
+FIRST_NAMES = (
+    "Minh Đạt Thiên Tâm Tấn Thoại Giao Ân Thảo Trí Nghị Tú Lan Hùng Vy Khoa Nhi"
+    " Phúc Quân Linh"
+).split()
+GENDERS = ("male", "female")
+MEMBER_FEES = (50, 60)
+SESSION_TIMES = ("18:00:00", "19:00:00", "20:00:00")
+
+
+def generate(
+    conn,
+    groups: int = 4,
+    members: int = 20,
+    years: int = 2,
+    dropout: float = 0.15,
+    start: datetime.date = datetime.date(2024, 1, 1),
+    seed: int = 42,
+) -> dict:
+    """
+    Fill an empty, migrated database.
+    :return: row counts per table
+    """
+    rnd = random.Random(seed)
+    with UnitOfWork(conn):
+        conn.executemany(
+            "INSERT INTO groups (id, name) VALUES (?, ?)",
+            [(group_id, f"Group {group_id}") for group_id in range(1, groups + 1)],
+        )
+
+        member_rows = []
+        dropout_rates = {}
+        for group_id in range(1, groups + 1):
+            fee = rnd.choice(MEMBER_FEES)
+            for _ in range(members):
+                member_id = len(member_rows) + 1
+                member_rows.append((member_id, group_id, member_id, fee))
+                # Some members nearly always come, some often skip
+                dropout_rates[member_id] = min(rnd.uniform(0, 2 * dropout), 0.9)
+        conn.executemany(
+            "INSERT INTO users (id, name, gender) VALUES (?, ?, ?)",
+            [
+                (user_id, f"{rnd.choice(FIRST_NAMES)} {user_id}", rnd.choice(GENDERS))
+                for _, _, user_id, _ in member_rows
+            ],
+        )
+        conn.executemany(
+            """
+            INSERT INTO members (id, group_id, user_id, member_fee, nickname)
+            SELECT ?, ?, ?, ?, name FROM users WHERE id = ?
+            """,
+            [row + (row[0],) for row in member_rows],
+        )
+
+        # One weekly session per group, on the group's own weekday
+        schedule_rows = []
+        weeks = years * 52
+        for group_id in range(1, groups + 1):
+            first = start + datetime.timedelta(days=(group_id - 1) % 7)
+            session_time = rnd.choice(SESSION_TIMES)
+            for week in range(weeks):
+                day = first + datetime.timedelta(weeks=week)
+                schedule_date = f"{day.isoformat()}T{session_time}"
+                schedule_rows.append((len(schedule_rows) + 1, group_id, schedule_date))
+        conn.executemany(
+            "INSERT INTO schedules (id, group_id, schedule_date) VALUES (?, ?, ?)",
+            schedule_rows,
+        )
+
+        members_by_group = {}
+        for member_id, group_id, _, _ in member_rows:
+            members_by_group.setdefault(group_id, []).append(member_id)
+        conn.executemany(
+            """
+            INSERT INTO attendance (schedule_id, member_id, joined, refund_amount)
+            VALUES (?, ?, ?, 0)
+            """,
+            (
+                (schedule_id, member_id, int(rnd.random() >= dropout_rates[member_id]))
+                for schedule_id, group_id, _ in schedule_rows
+                for member_id in members_by_group[group_id]
+            ),
+        )
+
+        # Same split as ScheduleRepo.recalculate_refunds, for all schedules of
+        # a group at once; the ledger triggers fill refunds and bills.
+        for group_id in range(1, groups + 1):
+            conn.execute(
+                """
+                UPDATE attendance
+                SET refund_amount = MIN(
+                    ?,
+                    ? / (SELECT COUNT(*) FROM attendance AS dropouts
+                         WHERE dropouts.schedule_id = attendance.schedule_id
+                           AND dropouts.joined = 0)
+                )
+                WHERE joined = 0
+                  AND schedule_id IN (SELECT id FROM schedules WHERE group_id = ?)
+                """,
+                (
+                    MAX_REFUND_GROUPS.get(group_id, 50),
+                    MIN_FEE_GROUPS.get(group_id, 50),
+                    group_id,
+                ),
+            )
+
+    optimize(conn)
+    tables = ("groups", "members", "schedules", "attendance", "refunds", "bills")
+    return {
+        table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        for table in tables
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("output", help="database file to create")
+    parser.add_argument("--groups", type=int, default=4)
+    parser.add_argument("--members", type=int, default=20, help="members per group")
+    parser.add_argument("--years", type=int, default=2, help="years of schedules")
+    parser.add_argument(
+        "--dropout", type=float, default=0.15, help="mean dropout rate of a member"
+    )
+    parser.add_argument(
+        "--start",
+        type=datetime.date.fromisoformat,
+        default=datetime.date(2024, 1, 1),
+        help="date of the first schedules, YYYY-MM-DD",
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--force", action="store_true", help="replace the output")
+    args = parser.parse_args()
+
+    if os.path.exists(args.output):
+        if not args.force:
+            parser.error(f"{args.output} exists, use --force to replace it")
+        os.remove(args.output)
+
+    started = time.perf_counter()
+    conn = sqlite3.connect(args.output)
+    try:
+        apply_migrations(conn)
+        counts = generate(
+            conn,
+            groups=args.groups,
+            members=args.members,
+            years=args.years,
+            dropout=args.dropout,
+            start=args.start,
+            seed=args.seed,
+        )
+    finally:
+        conn.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"Generated {args.output} in {elapsed:.1f}s:")
+    for table, count in counts.items():
+        print(f"  {table:<12} {count:>9}")
+
+
+if __name__ == "__main__":
+    main()
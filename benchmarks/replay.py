@@ -0,0 +1,408 @@
+"""
+Replay load tester for recorded API Gateway proxy events.
+
+Reads one proxy event per line from a JSONL file and replays them, paced by
+their requestContext.requestTimeEpoch and a speed-up factor, either against
+the Lambda handlers in this process or against a running Flask server.
+Workers are threads or processes; with --mode process every worker is a
+fresh interpreter, like a Lambda container, with its own connections to the
+database file. The report has latency histograms for reads and writes,
+percentiles and error rates per route, and the SQLite lock errors.
+
+"synthesize" writes a burst of events drawn from a generated database, for
+rehearsals when no recording is at hand:
+
+    python -m benchmarks.replay synthesize --db /tmp/bench.db --count 3000 \\
+        --duration 60 --write-ratio 0.3 > /tmp/burst.jsonl
+    python -m benchmarks.replay run /tmp/burst.jsonl --db /tmp/bench.db \\
+        --mode process --workers 8 --speedup 2
+    python -m benchmarks.replay run /tmp/burst.jsonl --url http://127.0.0.1:5000
+"""
+
+import argparse
+import concurrent.futures
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+
+from benchmarks.endpoints import LAMBDA_MODULES, ROUTES, Dataset, percentile
+
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+# Routes of benchmarks.endpoints that synthesized bursts draw from
+READ_ROUTES = (
+    "list groups",
+    "member fees",
+    "list members",
+    "member detail",
+    "search schedules",
+    "schedule detail",
+)
+WRITE_ROUTES = ("patch attendance", "patch attendances", "create schedule")
+# Upper bounds of the latency histogram buckets, in ms
+HISTOGRAM_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+LOCK_MESSAGES = ("database is locked", "database table is locked", "busy")
+
+
+def is_write(event: dict) -> bool:
+    return event.get("httpMethod", "GET").upper() not in READ_METHODS
+
+
+def route_of(event: dict) -> str:
+    return f"{event.get('httpMethod', 'GET')} {event.get('resource') or event['path']}"
+
+
+def load_events(path: str) -> list:
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def schedule_events(events: list, speedup: float) -> list:
+    """
+    Offsets in seconds from the start of the replay, from the recorded
+    request times divided by the speed-up; all 0 (as fast as possible)
+    with speedup 0 or without request times.
+    :return: [(offset, event)] in replay order
+    """
+    times = [e.get("requestContext", {}).get("requestTimeEpoch") for e in events]
+    if not speedup or None in times:
+        return [(0.0, event) for event in events]
+    first = min(times)
+    timed = [((t - first) / 1000 / speedup, e) for t, e in zip(times, events)]
+    return sorted(timed, key=lambda item: item[0])
+
+
+def mix_events(events: list, write_ratio: float, rnd: random.Random) -> list:
+    """
+    Keep the recorded timing but redraw each event from the recorded reads
+    or writes, so that write_ratio of them are writes.
+    """
+    reads = [event for event in events if not is_write(event)]
+    writes = [event for event in events if is_write(event)]
+    if (write_ratio > 0 and not writes) or (write_ratio < 1 and not reads):
+        raise ValueError("The recording has no reads or no writes to mix")
+    mixed = []
+    for event in events:
+        pool = writes if rnd.random() < write_ratio else reads
+        drawn = dict(rnd.choice(pool))
+        drawn["requestContext"] = event.get("requestContext", {})
+        mixed.append(drawn)
+    return mixed
+
+
+def is_lock_error(status_code, body) -> bool:
+    if status_code == 503:
+        return True
+    return status_code in (500, "exception") and any(
+        message in (body or "") for message in LOCK_MESSAGES
+    )
+
+
+class InProcessTarget:
+    """The Lambda handlers, called in the worker."""
+
+    def __init__(self):
+        self._modules = {
+            resource: importlib.import_module(module)
+            for resource, module in LAMBDA_MODULES.items()
+        }
+
+    def send(self, event: dict):
+        """:return: (status code, response body)"""
+        resource = event.get("resource") or event["path"]
+        module = self._modules[resource.split("/")[2]]
+        response = module.lambda_handler(event, None)
+        return response["statusCode"], response.get("body")
+
+
+class HttpTarget:
+    """A running Flask server (flask_main.py)."""
+
+    def __init__(self, base_url: str, timeout: float = 30):
+        self._base_url = base_url.rstrip("/")
+        self._timeout = timeout
+
+    def send(self, event: dict):
+        """:return: (status code, response body)"""
+        url = self._base_url + event["path"]
+        if event.get("queryStringParameters"):
+            url += "?" + urllib.parse.urlencode(event["queryStringParameters"])
+        body = event.get("body")
+        headers = dict(event.get("headers") or {})
+        headers.pop("Host", None)
+        if body is not None:
+            headers.setdefault("Content-Type", "application/json")
+        request = urllib.request.Request(
+            url,
+            data=body.encode() if body is not None else None,
+            headers=headers,
+            method=event.get("httpMethod", "GET"),
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self._timeout) as response:
+                return response.status, response.read().decode(errors="replace")
+        except urllib.error.HTTPError as e:
+            return e.code, e.read().decode(errors="replace")
+
+
+def run_worker(timed_events: list, start_at: float, config: dict) -> list:
+    """
+    Replay a share of the events; runs in a thread or a fresh process.
+    :return: [(route, is write, status code, latency ms, lock error, lag ms)]
+    """
+    os.environ.update(config["env"])
+    logging.disable(logging.INFO)
+    if config["url"]:
+        target = HttpTarget(config["url"])
+    else:
+        target = InProcessTarget()
+
+    results = []
+    for offset, event in timed_events:
+        delay = start_at + offset - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        lag_ms = max(-delay, 0) * 1000
+        started = time.perf_counter()
+        try:
+            status_code, body = target.send(event)
+        except Exception as e:
+            status_code, body = "exception", f"{type(e).__name__}: {e}"
+        latency_ms = (time.perf_counter() - started) * 1000
+        results.append(
+            (
+                route_of(event),
+                is_write(event),
+                status_code,
+                latency_ms,
+                is_lock_error(status_code, body),
+                lag_ms,
+            )
+        )
+    return results
+
+
+def replay(timed_events: list, workers: int, mode: str, config: dict):
+    """
+    Replay the events with `workers` threads or processes.
+    :return: (results of all workers, seconds from the common start to the end)
+    """
+    # Round robin keeps every worker's share spread over the whole replay
+    shares = [timed_events[index::workers] for index in range(workers)]
+    if mode == "process":
+        # spawn: every worker imports the app itself, like a cold container
+        executor = concurrent.futures.ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        start_delay = config["start_delay"] or 2.0 + 0.2 * workers
+    else:
+        executor = concurrent.futures.ThreadPoolExecutor(workers)
+        start_delay = config["start_delay"] or 0.5
+    start_at = time.time() + start_delay
+    with executor:
+        futures = [
+            executor.submit(run_worker, share, start_at, config) for share in shares
+        ]
+        results = [result for future in futures for result in future.result()]
+    return results, time.time() - start_at
+
+
+def histogram(latencies: list) -> dict:
+    counts = dict.fromkeys([f"<={bound}" for bound in HISTOGRAM_BUCKETS], 0)
+    counts[f">{HISTOGRAM_BUCKETS[-1]}"] = 0
+    for latency in latencies:
+        for bound in HISTOGRAM_BUCKETS:
+            if latency <= bound:
+                counts[f"<={bound}"] += 1
+                break
+        else:
+            counts[f">{HISTOGRAM_BUCKETS[-1]}"] += 1
+    return counts
+
+
+def summarize(results: list, elapsed: float) -> dict:
+    def stats(rows: list) -> dict:
+        latencies = sorted(row[3] for row in rows)
+        status_codes = defaultdict(int)
+        for row in rows:
+            status_codes[str(row[2])] += 1
+        server_errors = sum(
+            1 for row in rows if row[2] == "exception" or int(row[2]) >= 500
+        )
+        client_errors = sum(
+            1 for row in rows if row[2] != "exception" and 400 <= int(row[2]) < 500
+        )
+        return {
+            "requests": len(rows),
+            "statusCodes": dict(status_codes),
+            "errorRate": round(server_errors / len(rows), 4) if rows else 0.0,
+            "clientErrors": client_errors,
+            "lockErrors": sum(1 for row in rows if row[4]),
+            "p50Ms": round(percentile(latencies, 50), 3),
+            "p95Ms": round(percentile(latencies, 95), 3),
+            "p99Ms": round(percentile(latencies, 99), 3),
+            "maxMs": round(latencies[-1], 3) if latencies else 0.0,
+        }
+
+    by_route = defaultdict(list)
+    for row in results:
+        by_route[row[0]].append(row)
+    lags = sorted(row[5] for row in results)
+    return {
+        "total": {
+            **stats(results),
+            "elapsedS": round(elapsed, 3),
+            "throughputRps": round(len(results) / elapsed, 1) if elapsed else 0.0,
+            # How late requests were sent: high values mean the workers
+            # could not keep up with the recorded pace
+            "sendLagP95Ms": round(percentile(lags, 95), 3),
+        },
+        "routes": {route: stats(rows) for route, rows in sorted(by_route.items())},
+        "histograms": {
+            "read": histogram([row[3] for row in results if not row[1]]),
+            "write": histogram([row[3] for row in results if row[1]]),
+        },
+    }
+
+
+def print_report(summary: dict):
+    total = summary["total"]
+    print(
+        f"{total['requests']} requests in {total['elapsedS']:.1f}s,"
+        f" {total['throughputRps']:.1f} req/s, error rate {total['errorRate']:.2%},"
+        f" {total['lockErrors']} lock errors,"
+        f" send lag p95 {total['sendLagP95Ms']:.1f} ms"
+    )
+    print(
+        f"\n{'route':<48} {'n':>6} {'err %':>6} {'locks':>6}"
+        f" {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+    )
+    for route, stats in summary["routes"].items():
+        print(
+            f"{route:<48} {stats['requests']:>6} {stats['errorRate']:>6.1%}"
+            f" {stats['lockErrors']:>6} {stats['p50Ms']:>8.2f} {stats['p95Ms']:>8.2f}"
+            f" {stats['p99Ms']:>8.2f} {stats['maxMs']:>8.2f}"
+        )
+    for kind, counts in summary["histograms"].items():
+        total_count = sum(counts.values())
+        if not total_count:
+            continue
+        print(f"\n{kind} latency (ms)")
+        for bucket, count in counts.items():
+            bar = "#" * round(count / total_count * 50)
+            print(f"  {bucket:>7} {count:>7} {bar}")
+
+
+def synthesize(args):
+    """Write a burst of events drawn from a database as JSONL to stdout."""
+    rnd = random.Random(args.seed)
+    data = Dataset(args.db, rnd)
+    started_ms = int(time.time() * 1000)
+    offsets = sorted(rnd.uniform(0, args.duration * 1000) for _ in range(args.count))
+    for offset in offsets:
+        routes = WRITE_ROUTES if rnd.random() < args.write_ratio else READ_ROUTES
+        route = rnd.choice(routes)
+        event = ROUTES[route](data).to_event()
+        event["requestContext"] = {"requestTimeEpoch": started_ms + int(offset)}
+        sys.stdout.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+
+def run(args):
+    events = load_events(args.events)
+    rnd = random.Random(args.seed)
+    if args.write_ratio is not None:
+        events = mix_events(events, args.write_ratio, rnd)
+    if args.count:
+        events = [events[index % len(events)] for index in range(args.count)]
+    timed_events = schedule_events(events, args.speedup)
+
+    work_dir = None
+    env = {"ENV": "local", "TRACING_ENABLED": "1" if args.trace else "0"}
+    if not args.url:
+        if not args.db:
+            raise SystemExit("--db is required without --url")
+        db_path = args.db
+        if not args.in_place:
+            work_dir = tempfile.mkdtemp(prefix="feeminton-replay-")
+            db_path = os.path.join(work_dir, "feeminton.db")
+            shutil.copy(args.db, db_path)
+        env["SQLITE_PATH"] = db_path
+    config = {"env": env, "url": args.url, "start_delay": args.start_delay}
+
+    try:
+        results, elapsed = replay(timed_events, args.workers, args.mode, config)
+    finally:
+        if work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    summary = summarize(results, elapsed)
+    summary["meta"] = {
+        "events": args.events,
+        "target": args.url or "in-process",
+        "mode": args.mode,
+        "workers": args.workers,
+        "speedup": args.speedup,
+        "writeRatio": args.write_ratio,
+    }
+    print_report(summary)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(summary, file, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="replay a JSONL file of events")
+    run_parser.add_argument("events", help="JSONL file, one proxy event per line")
+    run_parser.add_argument("--db", help="database of the in-process handlers")
+    run_parser.add_argument(
+        "--in-place", action="store_true", help="write to --db instead of a copy"
+    )
+    run_parser.add_argument("--url", help="base URL of a running Flask server")
+    run_parser.add_argument("--mode", choices=("thread", "process"), default="thread")
+    run_parser.add_argument("--workers", type=int, default=4)
+    run_parser.add_argument(
+        "--speedup", type=float, default=1.0, help="0 replays as fast as possible"
+    )
+    run_parser.add_argument(
+        "--write-ratio", type=float, help="redraw events to this share of writes"
+    )
+    run_parser.add_argument("--count", type=int, help="replay this many events")
+    run_parser.add_argument(
+        "--start-delay", type=float, help="seconds for the workers to start"
+    )
+    run_parser.add_argument("--seed", type=int, default=1)
+    run_parser.add_argument("--trace", action="store_true", help="keep trace output")
+    run_parser.add_argument("--output", help="save the results as JSON")
+    run_parser.set_defaults(handler=run)
+
+    synth_parser = commands.add_parser(
+        "synthesize", help="write a burst of events drawn from a database"
+    )
+    synth_parser.add_argument("--db", required=True)
+    synth_parser.add_argument("--count", type=int, default=1000)
+    synth_parser.add_argument(
+        "--duration", type=float, default=60, help="seconds the burst spans"
+    )
+    synth_parser.add_argument("--write-ratio", type=float, default=0.2)
+    synth_parser.add_argument("--seed", type=int, default=1)
+    synth_parser.set_defaults(handler=synthesize)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+"""
+Concurrent-write stress test of the shared database file.
+
+Starts N processes, each standing in for a Lambda container, that patch
+attendances, create schedules and delete the schedules they created against
+one SQLite file, at a given rate per process or as fast as they can. With
+--layer api the calls go through the api_logic functions and their retrying
+write path (db_transaction); with --layer service they call ScheduleService
+directly and every lock error surfaces.
+
+The report has the committed writes per second, the lock error rate and the
+latency percentiles per operation. Afterwards the invariants are checked on
+the database, and the exit code is 1 when one of them is broken:
+- the refund of every attendance matches the dropout count of its schedule
+- the refunds and bills ledger matches a rebuild from the attendance rows
+- no attendance row points to a missing schedule or member
+- every schedule created during the run has an attendance row per member
+
+    python -m benchmarks.generate_dataset /tmp/bench.db
+    python -m benchmarks.stress_writes --db /tmp/bench.db --processes 8 --duration 20
+    python -m benchmarks.stress_writes --db /tmp/bench.db --layer service --rate 20
+"""
+
+import argparse
+import concurrent.futures
+import datetime
+import json
+import logging
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+from benchmarks.endpoints import percentile
+
+OPERATIONS = ("patch", "create", "delete")
+
+
+def parse_mix(value: str) -> dict:
+    """'patch=0.7,create=0.2,delete=0.1' -> {operation: weight}"""
+    mix = {}
+    for part in value.split(","):
+        operation, _, weight = part.partition("=")
+        if operation not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"Unknown operation {operation}")
+        mix[operation] = float(weight)
+    return mix
+
+
+class Worker:
+    """One process: the app's write path on its own connections."""
+
+    def __init__(self, index: int, layer: str, seed: int):
+        from src.common.db_connection import connection_manager
+
+        self.index = index
+        self.layer = layer
+        self.rnd = random.Random(seed * 1000 + index)
+        conn = connection_manager.get_connection()
+        self.attendance_ids = [
+            row[0] for row in conn.execute("SELECT id FROM attendance")
+        ]
+        self.group_ids = [row[0] for row in conn.execute("SELECT id FROM groups")]
+        connection_manager.release(conn)
+        # Schedules this worker created and has not deleted yet
+        self.created = []
+        self._next_day = 0
+
+    def patch(self):
+        attendance_id = self.rnd.choice(self.attendance_ids)
+        joined = self.rnd.random() < 0.5
+        if self.layer == "api":
+            from src.api_logic.schedules import patch_attendance
+
+            patch_attendance(attendance_id=attendance_id, joined=joined)
+        else:
+            self._service().patch_attendance(attendance_id, joined)
+
+    def create(self):
+        # Dates of their own per worker, far after the data
+        self._next_day += 1
+        day = datetime.date(2200 + self.index, 1, 1) + datetime.timedelta(
+            days=self._next_day
+        )
+        schedule_data = {
+            "groupId": self.rnd.choice(self.group_ids),
+            "scheduleDate": f"{day.isoformat()}T19:00:00",
+        }
+        if self.layer == "api":
+            from src.api_logic.schedules import create_schedule
+
+            schedule_id = create_schedule(schedule_data=schedule_data)["scheduleId"]
+        else:
+            schedule_id = self._service().create_schedule(schedule_data)
+        self.created.append(schedule_id)
+
+    def delete(self):
+        schedule_id = self.created[-1]
+        if self.layer == "api":
+            from src.api_logic.schedules import delete_schedule
+
+            delete_schedule(schedule_id=schedule_id)
+        else:
+            self._service().delete_schedule(schedule_id)
+        self.created.pop()
+
+    def _service(self):
+        from src.common.db_connection import connection_manager
+        from src.services.schedules import ScheduleService
+
+        return ScheduleService(connection_manager.get_connection())
+
+
+def run_worker(index: int, start_at: float, config: dict) -> dict:
+    """
+    Run writes until the end of the test; runs in a spawned process.
+    :return: {"results": [(operation, outcome, latency ms)], "created": [...]}
+    """
+    os.environ.update(config["env"])
+    # The retry warnings of every write would drown the report
+    logging.disable(logging.WARNING)
+    from src.common.db_connection import connection_manager, is_lock_error
+    from src.common.exceptions import DatabaseBusy
+
+    worker = Worker(index, config["layer"], config["seed"])
+    operations = list(config["mix"])
+    weights = [config["mix"][operation] for operation in operations]
+    interval = 1 / config["rate"] if config["rate"] else 0.0
+
+    delay = start_at - time.time()
+    if delay > 0:
+        time.sleep(delay)
+    end_at = start_at + config["duration"]
+    next_at = time.time()
+    results = []
+    while time.time() < end_at:
+        operation = worker.rnd.choices(operations, weights)[0]
+        if operation == "delete" and not worker.created:
+            operation = "create"
+        started = time.perf_counter()
+        try:
+            getattr(worker, operation)()
+            outcome = "committed"
+        except DatabaseBusy:
+            outcome = "lock"
+        except Exception as e:
+            outcome = "lock" if is_lock_error(e) else f"{type(e).__name__}: {e}"
+            connection_manager.close()
+        results.append((operation, outcome, (time.perf_counter() - started) * 1000))
+
+        if interval:
+            next_at += interval
+            pause = next_at - time.time()
+            if pause > 0:
+                time.sleep(pause)
+    connection_manager.close()
+    return {"results": results, "created": worker.created}
+
+
+def summarize(results: list, duration: float) -> dict:
+    def stats(rows: list) -> dict:
+        latencies = sorted(row[2] for row in rows if row[1] == "committed")
+        committed = len(latencies)
+        locks = sum(1 for row in rows if row[1] == "lock")
+        return {
+            "attempts": len(rows),
+            "committed": committed,
+            "committedPerSecond": round(committed / duration, 1),
+            "lockErrors": locks,
+            "lockErrorRate": round(locks / len(rows), 4) if rows else 0.0,
+            "otherErrors": len(rows) - committed - locks,
+            "p50Ms": round(percentile(latencies, 50), 3),
+            "p95Ms": round(percentile(latencies, 95), 3),
+            "p99Ms": round(percentile(latencies, 99), 3),
+            "maxMs": round(latencies[-1], 3) if latencies else 0.0,
+        }
+
+    by_operation = defaultdict(list)
+    errors = defaultdict(int)
+    for row in results:
+        by_operation[row[0]].append(row)
+        if row[1] not in ("committed", "lock"):
+            errors[row[1]] += 1
+    return {
+        "total": stats(results),
+        "operations": {op: stats(rows) for op, rows in sorted(by_operation.items())},
+        "errors": dict(errors),
+    }
+
+
+def check_invariants(conn, created_ids: list) -> dict:
+    """
+    Invariants of the database after the run.
+    :return: {invariant: number of violating rows}
+    """
+    from src.data_repo.ledger_repo import LedgerRepo
+    from src.services.schedules import MAX_REFUND_GROUPS, MIN_FEE_GROUPS
+
+    wrong_refunds = 0
+    rows = conn.execute(
+        """
+        SELECT s.group_id, a.joined, a.refund_amount,
+               (SELECT COUNT(*) FROM attendance AS d
+                WHERE d.schedule_id = a.schedule_id AND d.joined = 0)
+        FROM attendance AS a
+        JOIN schedules AS s ON s.id = a.schedule_id
+        """
+    )
+    for group_id, joined, refund_amount, dropouts in rows:
+        expected = 0
+        if not joined:
+            min_fee = MIN_FEE_GROUPS.get(group_id, 50)
+            expected = min(MAX_REFUND_GROUPS.get(group_id, 50), min_fee // dropouts)
+        wrong_refunds += (refund_amount or 0) != expected
+
+    def ledger():
+        return (
+            conn.execute(
+                "SELECT member_id, month, total_refund FROM refunds"
+                " WHERE total_refund <> 0 ORDER BY 1, 2"
+            ).fetchall(),
+            conn.execute(
+                "SELECT member_id, month, schedule_count, total_refund FROM bills"
+                " WHERE schedule_count <> 0 OR total_refund <> 0 ORDER BY 1, 2"
+            ).fetchall(),
+        )
+
+    before = ledger()
+    conn.execute("BEGIN")
+    LedgerRepo(conn).rebuild()
+    rebuilt = ledger()
+    conn.rollback()
+    ledger_rows = len(set(before[0]) ^ set(rebuilt[0])) + len(
+        set(before[1]) ^ set(rebuilt[1])
+    )
+
+    orphans = conn.execute(
+        """
+        SELECT COUNT(*) FROM attendance AS a
+        WHERE NOT EXISTS (SELECT 1 FROM schedules AS s WHERE s.id = a.schedule_id)
+           OR NOT EXISTS (SELECT 1 FROM members AS m WHERE m.id = a.member_id)
+        """
+    ).fetchone()[0]
+
+    incomplete = conn.execute(
+        """
+        SELECT COUNT(*)
+        FROM schedules AS s
+        JOIN members AS m ON m.group_id = s.group_id
+        WHERE s.id IN (SELECT value FROM json_each(?))
+          AND NOT EXISTS (
+              SELECT 1 FROM attendance AS a
+              WHERE a.schedule_id = s.id AND a.member_id = m.id
+          )
+        """,
+        (json.dumps(created_ids),),
+    ).fetchone()[0]
+
+    return {
+        "refundsMatchDropouts": wrong_refunds,
+        "ledgerMatchesRebuild": ledger_rows,
+        "noOrphanedAttendance": orphans,
+        "createdSchedulesComplete": incomplete,
+    }
+
+
+def print_report(summary: dict, invariants: dict):
+    total = summary["total"]
+    print(
+        f"{total['committed']} committed writes, {total['committedPerSecond']:.1f}/s,"
+        f" lock error rate {total['lockErrorRate']:.2%},"
+        f" {total['otherErrors']} other errors"
+    )
+    print(
+        f"\n{'operation':<10} {'attempts':>9} {'commits/s':>10} {'locks':>6}"
+        f" {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+    )
+    for operation, stats in summary["operations"].items():
+        print(
+            f"{operation:<10} {stats['attempts']:>9}"
+            f" {stats['committedPerSecond']:>10.1f} {stats['lockErrors']:>6} {stats['p50Ms']:>8.2f} {stats['p95Ms']:>8.2f}"
+            f" {stats['p99Ms']:>8.2f} {stats['maxMs']:>8.2f}"
+        )
+    for error, count in summary["errors"].items():
+        print(f"  {count}x {error}")
+    print("\nInvariants (violating rows)")
+    for name, violations in invariants.items():
+        print(f"  {'OK  ' if not violations else 'FAIL'} {name}: {violations}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--db", required=True, help="database to write to")
+    parser.add_argument(
+        "--in-place", action="store_true", help="write to --db instead of a copy"
+    )
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10, help="seconds")
+    parser.add_argument(
+        "--rate", type=float, default=0, help="writes/s per process, 0: unlimited"
+    )
+    parser.add_argument(
+        "--mix", type=parse_mix, default="patch=0.7,create=0.2,delete=0.1"
+    )
+    parser.add_argument("--layer", choices=("api", "service"), default="api")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="save the results as JSON")
+    args = parser.parse_args()
+
+    work_dir = None
+    db_path = args.db
+    if not args.in_place:
+        work_dir = tempfile.mkdtemp(prefix="feeminton-stress-")
+        db_path = os.path.join(work_dir, "feeminton.db")
+        shutil.copy(args.db, db_path)
+    env = {"ENV": "local", "SQLITE_PATH": db_path, "TRACING_ENABLED": "0"}
+    os.environ.update(env)
+    config = {
+        "env": env,
+        "layer": args.layer,
+        "mix": args.mix,
+        "rate": args.rate,
+        "duration": args.duration,
+        "seed": args.seed,
+    }
+
+    try:
+        # spawn: every process imports the app itself, like a cold container
+        context = multiprocessing.get_context("spawn")
+        start_at = time.time() + 2.0 + 0.2 * args.processes
+        with concurrent.futures.ProcessPoolExecutor(
+            args.processes, mp_context=context
+        ) as executor:
+            futures = [
+                executor.submit(run_worker, index, start_at, config)
+                for index in range(args.processes)
+            ]
+            outputs = [future.result() for future in futures]
+
+        results = [row for output in outputs for row in output["results"]]
+        created = [id_ for output in outputs for id_ in output["created"]]
+        summary = summarize(results, args.duration)
+        logging.disable(logging.INFO)
+        conn = sqlite3.connect(db_path)
+        try:
+            invariants = check_invariants(conn, created)
+        finally:
+            conn.close()
+    finally:
+        if work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_report(summary, invariants)
+    if args.output:
+        report = {
+            "meta": {k: v for k, v in vars(args).items() if k != "output"},
+            **summary,
+            "invariants": invariants,
+        }
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+        print(f"\nSaved results to {args.output}")
+    sys.exit(1 if any(invariants.values()) else 0)
+
+
+if __name__ == "__main__":
+    main()
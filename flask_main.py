@@ -1,5 +1,6 @@
-from flask import Flask
+from flask import Flask, g, request
 from flask_cors import CORS
+from pydantic import ValidationError
 
 # from src.flask_api.sessions import session_router
 from src.flask_api.members import members_router
@@ -7,9 +8,22 @@ from src.flask_api.schedules import schedules_router
 from src.flask_api.attendances import attendances_router
 from src.swagger.flask_main import swagger_bp
 from src.flask_api.groups import groups_router
+from src.flask_api.json_provider import ResponseJSONProvider
+from src.common.api_utils import validation_error_message
+from src.common.compression import negotiate
+from src.common.exceptions import (
+    AlreadyExist,
+    DatabaseBusy,
+    ExportTooLarge,
+    InvalidData,
+    NotFound,
+)
+from src.common.sql_profiler import finish_profile, start_profile
+from src.common.tracing import finish_trace, start_trace
 
 
 app = Flask(__name__)
+app.json = ResponseJSONProvider(app)
 CORS(app)
 # CORS(app, resources={r"/*": {"origins": "http://localhost:*"}})
 
@@ -21,10 +35,77 @@ app.register_blueprint(attendances_router, url_prefix="/api/attendances")
 app.register_blueprint(groups_router, url_prefix="/api/groups")
 
 
+# Same error responses as the Lambda handlers (src/common/api_utils.py)
+@app.errorhandler(AlreadyExist)
+@app.errorhandler(InvalidData)
+def invalid_data(e):
+    return {"message": str(e)}, 400
+
+
+@app.errorhandler(ValidationError)
+def validation_error(e):
+    return {"message": validation_error_message(e)}, 400
+
+
+@app.errorhandler(NotFound)
+def not_found(e):
+    return {"message": str(e)}, 404
+
+
+@app.errorhandler(ExportTooLarge)
+def export_too_large(e):
+    return {"message": str(e)}, 413
+
+
+@app.errorhandler(DatabaseBusy)
+def database_busy(e):
+    return {"message": str(e)}, 503, {"Retry-After": str(e.retry_after)}
+
+
+@app.before_request
+def open_trace():
+    g.route = f"{request.method} {request.url_rule or request.path}"
+    g.trace = start_trace(g.route)
+    g.sql_profile = start_profile()
+    g.status_code = None
+
+
+@app.after_request
+def record_status(response):
+    # Registered first, so it runs after the other after_request hooks
+    g.status_code = response.status_code
+    return response
+
+
+@app.after_request
+def compress_response(response):
+    # Same negotiation as the Lambda responses (src/common/compression.py)
+    if response.direct_passthrough or response.status_code != 200:
+        return response
+    if response.mimetype != "application/json":
+        return response
+    response.vary.add("Accept-Encoding")
+    body, encoding = negotiate(
+        response.get_data(), request.headers.get("Accept-Encoding")
+    )
+    if encoding is not None:
+        response.set_data(body)
+        response.headers["Content-Encoding"] = encoding
+    return response
+
+
 # app exit handler
+@app.teardown_request
+def close_trace(exception=None):
+    if "sql_profile" in g:
+        finish_profile(g.sql_profile, g.route)
+    if "trace" in g:
+        finish_trace(g.trace, g.status_code or (500 if exception else None))
+
+
 @app.teardown_appcontext
 def shutdown_session(exception=None):
-    # should close db session here
+    # db connections are kept open per worker thread by ConnectionManager
     pass
 
 
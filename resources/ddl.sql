@@ -1,18 +1,20 @@
--- Users table: only store identity
-CREATE TABLE IF NOT EXISTS users (
+-- Schema of the latest migration, generated from resources/migrations with
+--     python -m src.common.migrations --schema > resources/ddl.sql
+-- Do not edit it, add a migration: databases are created and upgraded by
+-- applying the migrations (efs_handler "migrate" task).
+
+CREATE TABLE users (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     name TEXT NOT NULL,
     gender TEXT CHECK(gender IN ('male','female')) NOT NULL
 );
 
--- Groups table: only store identity
-CREATE TABLE IF NOT EXISTS groups (
+CREATE TABLE groups (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     name TEXT NOT NULL
 );
 
--- Members table: only store identity and gender
-CREATE TABLE IF NOT EXISTS members (
+CREATE TABLE members (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     group_id INTEGER NOT NULL,
     user_id INTEGER NOT NULL,
@@ -20,15 +22,14 @@ CREATE TABLE IF NOT EXISTS members (
     nickname TEXT NOT NULL
 );
 
-CREATE TABLE IF NOT EXISTS schedules (
+CREATE TABLE schedules (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     group_id INTEGER NOT NULL,
     schedule_date date NOT NULL,
     description TEXT
-);
+, schedule_day TEXT GENERATED ALWAYS AS (date(schedule_date)) VIRTUAL);
 
--- Attendance table: tracks who joined/unjoined each reservation
-CREATE TABLE IF NOT EXISTS attendance (
+CREATE TABLE attendance (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     schedule_id INTEGER NOT NULL,
     member_id INTEGER NOT NULL,
@@ -38,8 +39,7 @@ CREATE TABLE IF NOT EXISTS attendance (
     FOREIGN KEY(member_id) REFERENCES members(id)
 );
 
--- Refunds table: monthly aggregation of refunds per member
-CREATE TABLE IF NOT EXISTS refunds (
+CREATE TABLE refunds (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     member_id INTEGER NOT NULL,
     month TEXT NOT NULL,
@@ -48,15 +48,457 @@ CREATE TABLE IF NOT EXISTS refunds (
     FOREIGN KEY(member_id) REFERENCES members(id)
 );
 
-
-CREATE TABLE IF NOT EXISTS bills (
+CREATE TABLE bills (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     member_id INTEGER NOT NULL,
     month TEXT NOT NULL,
     total_refund INTEGER DEFAULT 0,
-    status TEXT CHECK(status IN ('pending','reviewed')) DEFAULT 'pending',
+    status TEXT CHECK(status IN ('pending','reviewed')) DEFAULT 'pending', schedule_count INTEGER NOT NULL DEFAULT 0,
     FOREIGN KEY(member_id) REFERENCES members(id)
 );
 
+CREATE TABLE data_versions (
+    scope TEXT PRIMARY KEY NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE UNIQUE INDEX ux_attendance_schedule_member
+    ON attendance (schedule_id, member_id);
+
+CREATE INDEX ix_attendance_member
+    ON attendance (member_id);
+
+CREATE INDEX ix_members_group
+    ON members (group_id);
+
+CREATE INDEX ix_schedules_group_day
+    ON schedules (group_id, schedule_day);
+
+CREATE UNIQUE INDEX ux_refunds_member_month
+    ON refunds (member_id, month);
+
+CREATE UNIQUE INDEX ux_bills_member_month
+    ON bills (member_id, month);
+
+CREATE TRIGGER trg_attendance_insert_ledger
+AFTER INSERT ON attendance
+WHEN IFNULL(NEW.refund_amount, 0) <> 0
+BEGIN
+    INSERT INTO refunds (member_id, month, total_refund)
+    SELECT NEW.member_id, substr(s.schedule_day, 1, 7), NEW.refund_amount
+    FROM schedules AS s
+    WHERE s.id = NEW.schedule_id AND s.schedule_day IS NOT NULL
+    ON CONFLICT (member_id, month)
+        DO UPDATE SET total_refund = total_refund + excluded.total_refund;
+
+    INSERT INTO bills (member_id, month, total_refund)
+    SELECT
+        NEW.member_id,
+        strftime('%Y-%m', s.schedule_day, 'start of month', '+1 month'),
+        NEW.refund_amount
+    FROM schedules AS s
+    WHERE s.id = NEW.schedule_id AND s.schedule_day IS NOT NULL
+    ON CONFLICT (member_id, month)
+        DO UPDATE SET total_refund = total_refund + excluded.total_refund;
+END;
+
+CREATE TRIGGER trg_attendance_refund_ledger
+AFTER UPDATE OF refund_amount ON attendance
+WHEN IFNULL(NEW.refund_amount, 0) <> IFNULL(OLD.refund_amount, 0)
+BEGIN
+    INSERT INTO refunds (member_id, month, total_refund)
+    SELECT
+        NEW.member_id,
+        substr(s.schedule_day, 1, 7),
+        IFNULL(NEW.refund_amount, 0) - IFNULL(OLD.refund_amount, 0)
+    FROM schedules AS s
+    WHERE s.id = NEW.schedule_id AND s.schedule_day IS NOT NULL
+    ON CONFLICT (member_id, month)
+        DO UPDATE SET total_refund = total_refund + excluded.total_refund;
+
+    INSERT INTO bills (member_id, month, total_refund)
+    SELECT
+        NEW.member_id,
+        strftime('%Y-%m', s.schedule_day, 'start of month', '+1 month'),
+        IFNULL(NEW.refund_amount, 0) - IFNULL(OLD.refund_amount, 0)
+    FROM schedules AS s
+    WHERE s.id = NEW.schedule_id AND s.schedule_day IS NOT NULL
+    ON CONFLICT (member_id, month)
+        DO UPDATE SET total_refund = total_refund + excluded.total_refund;
+END;
+
+CREATE TRIGGER trg_attendance_delete_ledger
+AFTER DELETE ON attendance
+WHEN IFNULL(OLD.refund_amount, 0) <> 0
+BEGIN
+    UPDATE refunds
+    SET total_refund = total_refund - OLD.refund_amount
+    WHERE member_id = OLD.member_id
+      AND month = (
+          SELECT substr(s.schedule_day, 1, 7)
+          FROM schedules AS s WHERE s.id = OLD.schedule_id
+      );
+
+    UPDATE bills
+    SET total_refund = total_refund - OLD.refund_amount
+    WHERE member_id = OLD.member_id
+      AND month = (
+          SELECT strftime('%Y-%m', s.schedule_day, 'start of month', '+1 month')
+          FROM schedules AS s WHERE s.id = OLD.schedule_id
+      );
+END;
+
+CREATE TRIGGER trg_schedules_delete_attendance
+BEFORE DELETE ON schedules
+BEGIN
+    DELETE FROM attendance WHERE schedule_id = OLD.id;
+END;
+
+CREATE TRIGGER trg_schedules_insert_ledger
+AFTER INSERT ON schedules
+WHEN NEW.schedule_day IS NOT NULL
+BEGIN
+    INSERT INTO bills (member_id, month, schedule_count)
+    SELECT m.id, substr(NEW.schedule_day, 1, 7), 1
+    FROM members AS m
+    WHERE m.group_id = NEW.group_id
+    ON CONFLICT (member_id, month)
+        DO UPDATE SET schedule_count = schedule_count + 1;
+END;
+
+CREATE TRIGGER trg_schedules_delete_ledger
+AFTER DELETE ON schedules
+WHEN OLD.schedule_day IS NOT NULL
+BEGIN
+    UPDATE bills
+    SET schedule_count = schedule_count - 1
+    WHERE month = substr(OLD.schedule_day, 1, 7)
+      AND member_id IN (SELECT m.id FROM members AS m WHERE m.group_id = OLD.group_id);
+END;
+
+CREATE TRIGGER trg_schedules_update_ledger
+AFTER UPDATE OF schedule_date, group_id ON schedules
+WHEN OLD.schedule_day IS NOT NEW.schedule_day OR OLD.group_id IS NOT NEW.group_id
+BEGIN
+    UPDATE bills
+    SET schedule_count = schedule_count - 1
+    WHERE month = substr(OLD.schedule_day, 1, 7)
+      AND member_id IN (SELECT m.id FROM members AS m WHERE m.group_id = OLD.group_id);
+
+    INSERT INTO bills (member_id, month, schedule_count)
+    SELECT m.id, substr(NEW.schedule_day, 1, 7), 1
+    FROM members AS m
+    WHERE m.group_id = NEW.group_id AND NEW.schedule_day IS NOT NULL
+    ON CONFLICT (member_id, month)
+        DO UPDATE SET schedule_count = schedule_count + 1;
+
+    -- Move the schedule's refunds from the old month to the new one
+    UPDATE refunds
+    SET total_refund = total_refund - IFNULL((
+        SELECT SUM(a.refund_amount) FROM attendance AS a
+        WHERE a.schedule_id = NEW.id AND a.member_id = refunds.member_id
+    ), 0)
+    WHERE month = substr(OLD.schedule_day, 1, 7);
+
+    UPDATE bills
+    SET total_refund = total_refund - IFNULL((
+        SELECT SUM(a.refund_amount) FROM attendance AS a
+        WHERE a.schedule_id = NEW.id AND a.member_id = bills.member_id
+    ), 0)
+    WHERE month = strftime('%Y-%m', OLD.schedule_day, 'start of month', '+1 month');
+
+    INSERT INTO refunds (member_id, month, total_refund)
+    SELECT a.member_id, substr(NEW.schedule_day, 1, 7), SUM(a.refund_amount)
+    FROM attendance AS a
+    WHERE a.schedule_id = NEW.id AND NEW.schedule_day IS NOT NULL
+    GROUP BY a.member_id
+    ON CONFLICT (member_id, month)
+        DO UPDATE SET total_refund = total_refund + excluded.total_refund;
+
+    INSERT INTO bills (member_id, month, total_refund)
+    SELECT
+        a.member_id,
+        strftime('%Y-%m', NEW.schedule_day, 'start of month', '+1 month'),
+        SUM(a.refund_amount)
+    FROM attendance AS a
+    WHERE a.schedule_id = NEW.id AND NEW.schedule_day IS NOT NULL
+    GROUP BY a.member_id
+    ON CONFLICT (member_id, month)
+        DO UPDATE SET total_refund = total_refund + excluded.total_refund;
+END;
+
+CREATE TRIGGER trg_members_insert_ledger
+AFTER INSERT ON members
+BEGIN
+    INSERT INTO bills (member_id, month, schedule_count)
+    SELECT NEW.id, substr(s.schedule_day, 1, 7), COUNT(*)
+    FROM schedules AS s
+    WHERE s.group_id = NEW.group_id AND s.schedule_day IS NOT NULL
+    GROUP BY substr(s.schedule_day, 1, 7)
+    ON CONFLICT (member_id, month)
+        DO UPDATE SET schedule_count = excluded.schedule_count;
+END;
+
+CREATE TRIGGER trg_members_group_ledger
+AFTER UPDATE OF group_id ON members
+WHEN OLD.group_id IS NOT NEW.group_id
+BEGIN
+    UPDATE bills SET schedule_count = 0 WHERE member_id = NEW.id;
+
+    INSERT INTO bills (member_id, month, schedule_count)
+    SELECT NEW.id, substr(s.schedule_day, 1, 7), COUNT(*)
+    FROM schedules AS s
+    WHERE s.group_id = NEW.group_id AND s.schedule_day IS NOT NULL
+    GROUP BY substr(s.schedule_day, 1, 7)
+    ON CONFLICT (member_id, month)
+        DO UPDATE SET schedule_count = excluded.schedule_count;
+END;
+
+CREATE TRIGGER trg_members_delete_attendance
+BEFORE DELETE ON members
+BEGIN
+    DELETE FROM attendance WHERE member_id = OLD.id;
+END;
+
+CREATE TRIGGER trg_members_delete_ledger
+AFTER DELETE ON members
+BEGIN
+    DELETE FROM refunds WHERE member_id = OLD.id;
+    DELETE FROM bills WHERE member_id = OLD.id;
+END;
+
+CREATE TRIGGER trg_groups_insert_version
+AFTER INSERT ON groups
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope IN ('global', 'roster');
+END;
+
+CREATE TRIGGER trg_groups_update_version
+AFTER UPDATE ON groups
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope IN ('global', 'roster');
+END;
+
+CREATE TRIGGER trg_groups_delete_version
+AFTER DELETE ON groups
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope IN ('global', 'roster');
+END;
+
+CREATE TRIGGER trg_users_insert_version
+AFTER INSERT ON users
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope IN ('global', 'roster');
+END;
+
+CREATE TRIGGER trg_users_update_version
+AFTER UPDATE ON users
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope IN ('global', 'roster');
+END;
+
+CREATE TRIGGER trg_users_delete_version
+AFTER DELETE ON users
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope IN ('global', 'roster');
+END;
+
+CREATE TRIGGER trg_members_insert_version
+AFTER INSERT ON members
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope IN ('global', 'roster');
+
+    INSERT INTO data_versions (scope, version)
+    SELECT 'group:' || NEW.group_id, 1
+    WHERE NEW.group_id IS NOT NULL
+    ON CONFLICT (scope) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER trg_members_update_version
+AFTER UPDATE ON members
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope IN ('global', 'roster');
+
+    INSERT INTO data_versions (scope, version)
+    SELECT 'group:' || g.group_id, 1
+    FROM (SELECT OLD.group_id AS group_id UNION SELECT NEW.group_id) AS g
+    WHERE g.group_id IS NOT NULL
+    ON CONFLICT (scope) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER trg_members_delete_version
+AFTER DELETE ON members
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope IN ('global', 'roster');
+
+    INSERT INTO data_versions (scope, version)
+    SELECT 'group:' || OLD.group_id, 1
+    WHERE OLD.group_id IS NOT NULL
+    ON CONFLICT (scope) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER trg_schedules_insert_version
+AFTER INSERT ON schedules
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'global';
+
+    INSERT INTO data_versions (scope, version)
+    SELECT 'group:' || NEW.group_id, 1
+    WHERE NEW.group_id IS NOT NULL
+    ON CONFLICT (scope) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER trg_schedules_update_version
+AFTER UPDATE ON schedules
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'global';
+
+    INSERT INTO data_versions (scope, version)
+    SELECT 'group:' || g.group_id, 1
+    FROM (SELECT OLD.group_id AS group_id UNION SELECT NEW.group_id) AS g
+    WHERE g.group_id IS NOT NULL
+    ON CONFLICT (scope) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER trg_schedules_delete_version
+AFTER DELETE ON schedules
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'global';
+
+    INSERT INTO data_versions (scope, version)
+    SELECT 'group:' || OLD.group_id, 1
+    WHERE OLD.group_id IS NOT NULL
+    ON CONFLICT (scope) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER trg_attendance_insert_version
+AFTER INSERT ON attendance
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'global';
+
+    INSERT INTO data_versions (scope, version)
+    SELECT 'group:' || s.group_id, 1
+    FROM schedules AS s
+    WHERE s.id = NEW.schedule_id
+    ON CONFLICT (scope) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER trg_attendance_update_version
+AFTER UPDATE ON attendance
+WHEN NEW.joined IS NOT OLD.joined
+    OR NEW.refund_amount IS NOT OLD.refund_amount
+    OR NEW.member_id IS NOT OLD.member_id
+    OR NEW.schedule_id IS NOT OLD.schedule_id
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'global';
+
+    INSERT INTO data_versions (scope, version)
+    SELECT 'group:' || s.group_id, 1
+    FROM schedules AS s
+    WHERE s.id IN (OLD.schedule_id, NEW.schedule_id)
+    ON CONFLICT (scope) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER trg_attendance_delete_version
+AFTER DELETE ON attendance
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'global';
+
+    INSERT INTO data_versions (scope, version)
+    SELECT 'group:' || s.group_id, 1
+    FROM schedules AS s
+    WHERE s.id = OLD.schedule_id
+    ON CONFLICT (scope) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER trg_groups_insert_table_version
+AFTER INSERT ON groups
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'table:groups';
+END;
+
+CREATE TRIGGER trg_groups_update_table_version
+AFTER UPDATE ON groups
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'table:groups';
+END;
+
+CREATE TRIGGER trg_groups_delete_table_version
+AFTER DELETE ON groups
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'table:groups';
+END;
+
+CREATE TRIGGER trg_users_insert_table_version
+AFTER INSERT ON users
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'table:users';
+END;
+
+CREATE TRIGGER trg_users_update_table_version
+AFTER UPDATE ON users
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'table:users';
+END;
+
+CREATE TRIGGER trg_users_delete_table_version
+AFTER DELETE ON users
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'table:users';
+END;
+
+CREATE TRIGGER trg_members_insert_table_version
+AFTER INSERT ON members
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'table:members';
+END;
+
+CREATE TRIGGER trg_members_update_table_version
+AFTER UPDATE ON members
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'table:members';
+END;
+
+CREATE TRIGGER trg_members_delete_table_version
+AFTER DELETE ON members
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'table:members';
+END;
+
+CREATE TRIGGER trg_schedules_insert_table_version
+AFTER INSERT ON schedules
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'table:schedules';
+END;
+
+CREATE TRIGGER trg_schedules_update_table_version
+AFTER UPDATE ON schedules
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'table:schedules';
+END;
+
+CREATE TRIGGER trg_schedules_delete_table_version
+AFTER DELETE ON schedules
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'table:schedules';
+END;
+
+CREATE TRIGGER trg_attendance_insert_table_version
+AFTER INSERT ON attendance
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'table:attendance';
+END;
+
+CREATE TRIGGER trg_attendance_update_table_version
+AFTER UPDATE ON attendance
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'table:attendance';
+END;
 
+CREATE TRIGGER trg_attendance_delete_table_version
+AFTER DELETE ON attendance
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'table:attendance';
+END;
 
+PRAGMA user_version = 6;
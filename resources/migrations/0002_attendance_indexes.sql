@@ -0,0 +1,17 @@
+-- Attendance lookups by schedule and by member.
+-- create_attendances_for_group_members relies on INSERT OR IGNORE, which needs
+-- a unique (schedule_id, member_id) index; drop any duplicate rows first,
+-- keeping the oldest one.
+DELETE FROM attendance
+WHERE id NOT IN (
+    SELECT MIN(id) FROM attendance GROUP BY schedule_id, member_id
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_attendance_schedule_member
+    ON attendance (schedule_id, member_id);
+
+CREATE INDEX IF NOT EXISTS ix_attendance_member
+    ON attendance (member_id);
+
+CREATE INDEX IF NOT EXISTS ix_members_group
+    ON members (group_id);
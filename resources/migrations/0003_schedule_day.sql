@@ -0,0 +1,9 @@
+-- schedule_date holds both 'YYYY-MM-DD' (seed data) and 'YYYY-MM-DDTHH:MM:SS'
+-- (API). schedule_day is the normalized 'YYYY-MM-DD' form; month filters use
+-- half-open ranges on it so they are answered by the (group_id, schedule_day)
+-- index instead of wrapping the column in strftime().
+ALTER TABLE schedules
+    ADD COLUMN schedule_day TEXT GENERATED ALWAYS AS (date(schedule_date)) VIRTUAL;
+
+CREATE INDEX IF NOT EXISTS ix_schedules_group_day
+    ON schedules (group_id, schedule_day);
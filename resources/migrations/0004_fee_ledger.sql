@@ -0,0 +1,245 @@
+-- Monthly fee ledger in the refunds and bills tables, keyed by (member, month)
+-- with month as 'YYYY-MM'.
+--   refunds.total_refund: sum of the member's attendance refunds in the month
+--   bills.schedule_count: number of the member's group schedules in the month
+--   bills.total_refund:   refunds of the previous month credited to this bill
+-- estimated fee of a month = member_fee * bills.schedule_count - bills.total_refund
+--
+-- The triggers below apply deltas on every attendance, schedule and member
+-- change, so fee reads are single indexed lookups. LedgerRepo.rebuild()
+-- recomputes both tables from scratch for repair.
+
+-- Nothing wrote these tables before this migration.
+DELETE FROM refunds;
+DELETE FROM bills;
+
+ALTER TABLE bills ADD COLUMN schedule_count INTEGER NOT NULL DEFAULT 0;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_refunds_member_month
+    ON refunds (member_id, month);
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_bills_member_month
+    ON bills (member_id, month);
+
+-- Attendance refunds: add the delta to the month and to the next month's bill.
+CREATE TRIGGER IF NOT EXISTS trg_attendance_insert_ledger
+AFTER INSERT ON attendance
+WHEN IFNULL(NEW.refund_amount, 0) <> 0
+BEGIN
+    INSERT INTO refunds (member_id, month, total_refund)
+    SELECT NEW.member_id, substr(s.schedule_day, 1, 7), NEW.refund_amount
+    FROM schedules AS s
+    WHERE s.id = NEW.schedule_id AND s.schedule_day IS NOT NULL
+    ON CONFLICT (member_id, month)
+        DO UPDATE SET total_refund = total_refund + excluded.total_refund;
+
+    INSERT INTO bills (member_id, month, total_refund)
+    SELECT
+        NEW.member_id,
+        strftime('%Y-%m', s.schedule_day, 'start of month', '+1 month'),
+        NEW.refund_amount
+    FROM schedules AS s
+    WHERE s.id = NEW.schedule_id AND s.schedule_day IS NOT NULL
+    ON CONFLICT (member_id, month)
+        DO UPDATE SET total_refund = total_refund + excluded.total_refund;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_attendance_refund_ledger
+AFTER UPDATE OF refund_amount ON attendance
+WHEN IFNULL(NEW.refund_amount, 0) <> IFNULL(OLD.refund_amount, 0)
+BEGIN
+    INSERT INTO refunds (member_id, month, total_refund)
+    SELECT
+        NEW.member_id,
+        substr(s.schedule_day, 1, 7),
+        IFNULL(NEW.refund_amount, 0) - IFNULL(OLD.refund_amount, 0)
+    FROM schedules AS s
+    WHERE s.id = NEW.schedule_id AND s.schedule_day IS NOT NULL
+    ON CONFLICT (member_id, month)
+        DO UPDATE SET total_refund = total_refund + excluded.total_refund;
+
+    INSERT INTO bills (member_id, month, total_refund)
+    SELECT
+        NEW.member_id,
+        strftime('%Y-%m', s.schedule_day, 'start of month', '+1 month'),
+        IFNULL(NEW.refund_amount, 0) - IFNULL(OLD.refund_amount, 0)
+    FROM schedules AS s
+    WHERE s.id = NEW.schedule_id AND s.schedule_day IS NOT NULL
+    ON CONFLICT (member_id, month)
+        DO UPDATE SET total_refund = total_refund + excluded.total_refund;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_attendance_delete_ledger
+AFTER DELETE ON attendance
+WHEN IFNULL(OLD.refund_amount, 0) <> 0
+BEGIN
+    UPDATE refunds
+    SET total_refund = total_refund - OLD.refund_amount
+    WHERE member_id = OLD.member_id
+      AND month = (
+          SELECT substr(s.schedule_day, 1, 7)
+          FROM schedules AS s WHERE s.id = OLD.schedule_id
+      );
+
+    UPDATE bills
+    SET total_refund = total_refund - OLD.refund_amount
+    WHERE member_id = OLD.member_id
+      AND month = (
+          SELECT strftime('%Y-%m', s.schedule_day, 'start of month', '+1 month')
+          FROM schedules AS s WHERE s.id = OLD.schedule_id
+      );
+END;
+
+-- Deleting a schedule deletes its attendance first, while the schedule's
+-- month can still be looked up by the attendance triggers.
+CREATE TRIGGER IF NOT EXISTS trg_schedules_delete_attendance
+BEFORE DELETE ON schedules
+BEGIN
+    DELETE FROM attendance WHERE schedule_id = OLD.id;
+END;
+
+-- Schedules: count them per member of the group and month.
+CREATE TRIGGER IF NOT EXISTS trg_schedules_insert_ledger
+AFTER INSERT ON schedules
+WHEN NEW.schedule_day IS NOT NULL
+BEGIN
+    INSERT INTO bills (member_id, month, schedule_count)
+    SELECT m.id, substr(NEW.schedule_day, 1, 7), 1
+    FROM members AS m
+    WHERE m.group_id = NEW.group_id
+    ON CONFLICT (member_id, month)
+        DO UPDATE SET schedule_count = schedule_count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_schedules_delete_ledger
+AFTER DELETE ON schedules
+WHEN OLD.schedule_day IS NOT NULL
+BEGIN
+    UPDATE bills
+    SET schedule_count = schedule_count - 1
+    WHERE month = substr(OLD.schedule_day, 1, 7)
+      AND member_id IN (SELECT m.id FROM members AS m WHERE m.group_id = OLD.group_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_schedules_update_ledger
+AFTER UPDATE OF schedule_date, group_id ON schedules
+WHEN OLD.schedule_day IS NOT NEW.schedule_day OR OLD.group_id IS NOT NEW.group_id
+BEGIN
+    UPDATE bills
+    SET schedule_count = schedule_count - 1
+    WHERE month = substr(OLD.schedule_day, 1, 7)
+      AND member_id IN (SELECT m.id FROM members AS m WHERE m.group_id = OLD.group_id);
+
+    INSERT INTO bills (member_id, month, schedule_count)
+    SELECT m.id, substr(NEW.schedule_day, 1, 7), 1
+    FROM members AS m
+    WHERE m.group_id = NEW.group_id AND NEW.schedule_day IS NOT NULL
+    ON CONFLICT (member_id, month)
+        DO UPDATE SET schedule_count = schedule_count + 1;
+
+    -- Move the schedule's refunds from the old month to the new one
+    UPDATE refunds
+    SET total_refund = total_refund - IFNULL((
+        SELECT SUM(a.refund_amount) FROM attendance AS a
+        WHERE a.schedule_id = NEW.id AND a.member_id = refunds.member_id
+    ), 0)
+    WHERE month = substr(OLD.schedule_day, 1, 7);
+
+    UPDATE bills
+    SET total_refund = total_refund - IFNULL((
+        SELECT SUM(a.refund_amount) FROM attendance AS a
+        WHERE a.schedule_id = NEW.id AND a.member_id = bills.member_id
+    ), 0)
+    WHERE month = strftime('%Y-%m', OLD.schedule_day, 'start of month', '+1 month');
+
+    INSERT INTO refunds (member_id, month, total_refund)
+    SELECT a.member_id, substr(NEW.schedule_day, 1, 7), SUM(a.refund_amount)
+    FROM attendance AS a
+    WHERE a.schedule_id = NEW.id AND NEW.schedule_day IS NOT NULL
+    GROUP BY a.member_id
+    ON CONFLICT (member_id, month)
+        DO UPDATE SET total_refund = total_refund + excluded.total_refund;
+
+    INSERT INTO bills (member_id, month, total_refund)
+    SELECT
+        a.member_id,
+        strftime('%Y-%m', NEW.schedule_day, 'start of month', '+1 month'),
+        SUM(a.refund_amount)
+    FROM attendance AS a
+    WHERE a.schedule_id = NEW.id AND NEW.schedule_day IS NOT NULL
+    GROUP BY a.member_id
+    ON CONFLICT (member_id, month)
+        DO UPDATE SET total_refund = total_refund + excluded.total_refund;
+END;
+
+-- Membership: a member is billed for every schedule of their group.
+CREATE TRIGGER IF NOT EXISTS trg_members_insert_ledger
+AFTER INSERT ON members
+BEGIN
+    INSERT INTO bills (member_id, month, schedule_count)
+    SELECT NEW.id, substr(s.schedule_day, 1, 7), COUNT(*)
+    FROM schedules AS s
+    WHERE s.group_id = NEW.group_id AND s.schedule_day IS NOT NULL
+    GROUP BY substr(s.schedule_day, 1, 7)
+    ON CONFLICT (member_id, month)
+        DO UPDATE SET schedule_count = excluded.schedule_count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_members_group_ledger
+AFTER UPDATE OF group_id ON members
+WHEN OLD.group_id IS NOT NEW.group_id
+BEGIN
+    UPDATE bills SET schedule_count = 0 WHERE member_id = NEW.id;
+
+    INSERT INTO bills (member_id, month, schedule_count)
+    SELECT NEW.id, substr(s.schedule_day, 1, 7), COUNT(*)
+    FROM schedules AS s
+    WHERE s.group_id = NEW.group_id AND s.schedule_day IS NOT NULL
+    GROUP BY substr(s.schedule_day, 1, 7)
+    ON CONFLICT (member_id, month)
+        DO UPDATE SET schedule_count = excluded.schedule_count;
+END;
+
+-- Deleting a member deletes their attendance first, like schedules do.
+CREATE TRIGGER IF NOT EXISTS trg_members_delete_attendance
+BEFORE DELETE ON members
+BEGIN
+    DELETE FROM attendance WHERE member_id = OLD.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_members_delete_ledger
+AFTER DELETE ON members
+BEGIN
+    DELETE FROM refunds WHERE member_id = OLD.id;
+    DELETE FROM bills WHERE member_id = OLD.id;
+END;
+
+-- Initial fill, same statements as LedgerRepo.rebuild()
+INSERT INTO refunds (member_id, month, total_refund)
+SELECT a.member_id, substr(s.schedule_day, 1, 7), SUM(a.refund_amount)
+FROM attendance AS a
+JOIN schedules AS s ON s.id = a.schedule_id
+WHERE s.schedule_day IS NOT NULL
+GROUP BY a.member_id, substr(s.schedule_day, 1, 7);
+
+INSERT INTO bills (member_id, month, schedule_count, total_refund)
+SELECT member_id, month, SUM(schedule_count), SUM(total_refund)
+FROM (
+    SELECT
+        m.id AS member_id,
+        substr(s.schedule_day, 1, 7) AS month,
+        COUNT(*) AS schedule_count,
+        0 AS total_refund
+    FROM members AS m
+    JOIN schedules AS s ON s.group_id = m.group_id
+    WHERE s.schedule_day IS NOT NULL
+    GROUP BY m.id, substr(s.schedule_day, 1, 7)
+    UNION ALL
+    SELECT
+        r.member_id,
+        strftime('%Y-%m', r.month || '-01', '+1 month'),
+        0,
+        r.total_refund
+    FROM refunds AS r
+)
+GROUP BY member_id, month;
@@ -0,0 +1,165 @@
+-- Data versions used for HTTP ETags (src/common/http_cache.py).
+--   global:  bumped by every write
+--   roster:  groups, users and members changed
+--   group:N: anything shown for group N changed (members, schedules, attendance)
+--   epoch:   random id of this database, so versions of a re-created database
+--            never match ETags handed out before
+-- The triggers run inside the writing transaction, so the versions are shared
+-- by every Lambda container and Flask worker reading the same file.
+
+CREATE TABLE IF NOT EXISTS data_versions (
+    scope TEXT PRIMARY KEY NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT OR IGNORE INTO data_versions (scope, version)
+VALUES ('epoch', abs(random())), ('global', 0), ('roster', 0);
+
+-- Groups and users: roster
+CREATE TRIGGER IF NOT EXISTS trg_groups_insert_version
+AFTER INSERT ON groups
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope IN ('global', 'roster');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_groups_update_version
+AFTER UPDATE ON groups
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope IN ('global', 'roster');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_groups_delete_version
+AFTER DELETE ON groups
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope IN ('global', 'roster');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_users_insert_version
+AFTER INSERT ON users
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope IN ('global', 'roster');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_users_update_version
+AFTER UPDATE ON users
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope IN ('global', 'roster');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_users_delete_version
+AFTER DELETE ON users
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope IN ('global', 'roster');
+END;
+
+-- Members: roster and the member's group (old and new one on a move)
+CREATE TRIGGER IF NOT EXISTS trg_members_insert_version
+AFTER INSERT ON members
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope IN ('global', 'roster');
+
+    INSERT INTO data_versions (scope, version)
+    SELECT 'group:' || NEW.group_id, 1
+    WHERE NEW.group_id IS NOT NULL
+    ON CONFLICT (scope) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_members_update_version
+AFTER UPDATE ON members
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope IN ('global', 'roster');
+
+    INSERT INTO data_versions (scope, version)
+    SELECT 'group:' || g.group_id, 1
+    FROM (SELECT OLD.group_id AS group_id UNION SELECT NEW.group_id) AS g
+    WHERE g.group_id IS NOT NULL
+    ON CONFLICT (scope) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_members_delete_version
+AFTER DELETE ON members
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope IN ('global', 'roster');
+
+    INSERT INTO data_versions (scope, version)
+    SELECT 'group:' || OLD.group_id, 1
+    WHERE OLD.group_id IS NOT NULL
+    ON CONFLICT (scope) DO UPDATE SET version = version + 1;
+END;
+
+-- Schedules: the schedule's group
+CREATE TRIGGER IF NOT EXISTS trg_schedules_insert_version
+AFTER INSERT ON schedules
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'global';
+
+    INSERT INTO data_versions (scope, version)
+    SELECT 'group:' || NEW.group_id, 1
+    WHERE NEW.group_id IS NOT NULL
+    ON CONFLICT (scope) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_schedules_update_version
+AFTER UPDATE ON schedules
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'global';
+
+    INSERT INTO data_versions (scope, version)
+    SELECT 'group:' || g.group_id, 1
+    FROM (SELECT OLD.group_id AS group_id UNION SELECT NEW.group_id) AS g
+    WHERE g.group_id IS NOT NULL
+    ON CONFLICT (scope) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_schedules_delete_version
+AFTER DELETE ON schedules
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'global';
+
+    INSERT INTO data_versions (scope, version)
+    SELECT 'group:' || OLD.group_id, 1
+    WHERE OLD.group_id IS NOT NULL
+    ON CONFLICT (scope) DO UPDATE SET version = version + 1;
+END;
+
+-- Attendance: the group of the attendance's schedule. Updates that leave the
+-- row unchanged (e.g. refund recalculation of unaffected rows) keep the version.
+CREATE TRIGGER IF NOT EXISTS trg_attendance_insert_version
+AFTER INSERT ON attendance
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'global';
+
+    INSERT INTO data_versions (scope, version)
+    SELECT 'group:' || s.group_id, 1
+    FROM schedules AS s
+    WHERE s.id = NEW.schedule_id
+    ON CONFLICT (scope) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_attendance_update_version
+AFTER UPDATE ON attendance
+WHEN NEW.joined IS NOT OLD.joined
+    OR NEW.refund_amount IS NOT OLD.refund_amount
+    OR NEW.member_id IS NOT OLD.member_id
+    OR NEW.schedule_id IS NOT OLD.schedule_id
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'global';
+
+    INSERT INTO data_versions (scope, version)
+    SELECT 'group:' || s.group_id, 1
+    FROM schedules AS s
+    WHERE s.id IN (OLD.schedule_id, NEW.schedule_id)
+    ON CONFLICT (scope) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_attendance_delete_version
+AFTER DELETE ON attendance
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'global';
+
+    INSERT INTO data_versions (scope, version)
+    SELECT 'group:' || s.group_id, 1
+    FROM schedules AS s
+    WHERE s.id = OLD.schedule_id
+    ON CONFLICT (scope) DO UPDATE SET version = version + 1;
+END;
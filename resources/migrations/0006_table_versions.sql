@@ -0,0 +1,102 @@
+-- Per-table versions for the repository query cache (src/common/query_cache.py).
+-- Every insert, update or delete bumps 'table:<name>' in data_versions, so a
+-- cached query result is reused only while the tables it read are unchanged,
+-- whichever Lambda container or Flask worker wrote them.
+
+INSERT OR IGNORE INTO data_versions (scope, version)
+VALUES
+    ('table:groups', 0),
+    ('table:users', 0),
+    ('table:members', 0),
+    ('table:schedules', 0),
+    ('table:attendance', 0);
+
+CREATE TRIGGER IF NOT EXISTS trg_groups_insert_table_version
+AFTER INSERT ON groups
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'table:groups';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_groups_update_table_version
+AFTER UPDATE ON groups
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'table:groups';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_groups_delete_table_version
+AFTER DELETE ON groups
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'table:groups';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_users_insert_table_version
+AFTER INSERT ON users
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'table:users';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_users_update_table_version
+AFTER UPDATE ON users
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'table:users';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_users_delete_table_version
+AFTER DELETE ON users
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'table:users';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_members_insert_table_version
+AFTER INSERT ON members
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'table:members';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_members_update_table_version
+AFTER UPDATE ON members
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'table:members';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_members_delete_table_version
+AFTER DELETE ON members
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'table:members';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_schedules_insert_table_version
+AFTER INSERT ON schedules
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'table:schedules';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_schedules_update_table_version
+AFTER UPDATE ON schedules
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'table:schedules';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_schedules_delete_table_version
+AFTER DELETE ON schedules
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'table:schedules';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_attendance_insert_table_version
+AFTER INSERT ON attendance
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'table:attendance';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_attendance_update_table_version
+AFTER UPDATE ON attendance
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'table:attendance';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_attendance_delete_table_version
+AFTER DELETE ON attendance
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE scope = 'table:attendance';
+END;
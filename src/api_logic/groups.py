@@ -1,17 +1,92 @@
-from src.settings import logger
 from src.services.groups import GroupService
-from src.common.db_connection import db_context_manager
+from src.common.db_connection import db_context_manager, db_stream
+from src.common.exceptions import InvalidData
+from src.common.export import (
+    CONTENT_TYPES,
+    Export,
+    available_formats,
+    encode_csv,
+    encode_xlsx,
+)
+from src.common.http_cache import SHORT_LIVED, conditional_get
+from src.common.tracing import traced
+from src.common.utils import log_payload, month_key
 
 
+@traced("api_logic")
+@conditional_get(lambda kwargs: ["roster"], SHORT_LIVED)
 @db_context_manager
 def get_groups(conn, **kwargs):
     data = GroupService(conn).get_groups()
-    logger.info(f"Fetched members: {data}")
+    log_payload("Fetched groups", data)
     return {"data": data}
 
 
+@traced("api_logic")
+@conditional_get(lambda kwargs: [f"group:{kwargs['group_id']}"])
 @db_context_manager
 def get_member_fees(conn, group_id, year, month, **kwargs):
     data = GroupService(conn).get_member_fees(group_id, year, month)
-    logger.info(f"Fetched member fees: {data}")
+    log_payload("Fetched member fees", data)
     return {"data": data}
+
+
+# One group's report changes with that group, the all-groups report with any
+@traced("api_logic")
+@conditional_get(
+    lambda kwargs: [
+        f"group:{kwargs['groupId']}" if kwargs.get("groupId") is not None else "global"
+    ]
+)
+@db_context_manager
+def get_fee_report(
+    conn,
+    fromYear=None,
+    fromMonth=None,
+    toYear=None,
+    toMonth=None,
+    groupId=None,
+    **kwargs,
+):
+    data = GroupService(conn).get_fee_report(
+        fromYear, fromMonth, toYear, toMonth, group_id=groupId
+    )
+    log_payload("Fetched fee report", data)
+    return {"data": data}
+
+
+@db_stream
+def _export_chunks(
+    conn, group_id, from_year, from_month, to_year, to_month, rows, file_format
+):
+    header, records = GroupService(conn).get_export_rows(
+        group_id, from_year, from_month, to_year, to_month, rows
+    )
+    if file_format == "xlsx":
+        yield from encode_xlsx(header, records, title=rows.capitalize())
+    else:
+        yield from encode_csv(header, records)
+
+
+@traced("api_logic")
+def export_group(
+    group_id,
+    fromYear=None,
+    fromMonth=None,
+    toYear=None,
+    toMonth=None,
+    rows="attendance",
+    format="csv",
+    **kwargs,
+):
+    formats = available_formats()
+    if format not in formats:
+        raise InvalidData(f"format must be one of: {', '.join(formats)}")
+    # Validates the request and encodes the first chunk, the rest is encoded
+    # while the response is sent
+    chunks = _export_chunks(
+        group_id, fromYear, fromMonth, toYear, toMonth, rows, format
+    )
+    period = f"{month_key(fromYear, fromMonth)}-{month_key(toYear, toMonth)}"
+    filename = f"group-{group_id}-{rows}-{period}.{format}"
+    return Export(filename, CONTENT_TYPES[format], chunks)
@@ -1,17 +1,33 @@
-from src.settings import logger
 from src.services.members import MemberService
 from src.common.db_connection import db_context_manager
+from src.common.http_cache import SHORT_LIVED, conditional_get
+from src.common.tracing import traced
+from src.common.utils import current_month, log_payload
 
 
+@traced("api_logic")
+@conditional_get(lambda kwargs: ["roster"], SHORT_LIVED)
 @db_context_manager
 def get_members(conn, **kwargs):
     members = MemberService(conn).get_members()
-    logger.info(f"Fetched members: {members}")
+    log_payload("Fetched members", members)
     return {"data": members}
 
 
+# The detail includes next month's bill, so the ETag changes with the month
+@traced("api_logic")
+@conditional_get(lambda kwargs: ["global"], key=lambda kwargs: current_month())
 @db_context_manager
 def get_member(conn, member_id, **kwargs):
     member = MemberService(conn).get_member(member_id)
-    logger.info(f"Fetched member: {member}")
+    log_payload("Fetched member", member)
     return {"data": member}
+
+
+@traced("api_logic")
+@conditional_get(lambda kwargs: ["global"], key=lambda kwargs: current_month())
+@db_context_manager
+def get_member_bills(conn, groupId=None, ids=None, **kwargs):
+    data = MemberService(conn).get_member_bills(group_id=groupId, member_ids=ids)
+    log_payload("Fetched member bills", data)
+    return {"data": data}
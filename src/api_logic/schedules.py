@@ -1,39 +1,71 @@
-from src.schemas.pydantic_models.schedules import SearchScheduleModel
 from src.settings import logger
 from src.services.schedules import ScheduleService
-from src.common.db_connection import db_context_manager
+from src.common.db_connection import db_context_manager, db_transaction
+from src.common.http_cache import conditional_get
+from src.common.tracing import traced
+from src.common.utils import log_payload
 
 
+def _schedule_scopes(kwargs):
+    group_id = kwargs.get("groupId", kwargs.get("group_id"))
+    return [f"group:{group_id}"] if group_id else ["global"]
+
+
+@traced("api_logic")
+@conditional_get(_schedule_scopes)
 @db_context_manager
 def get_schedules(conn, **kwargs):
+    from src.schemas.pydantic_models.schedules import SearchScheduleModel
+
     params = SearchScheduleModel(**kwargs)
     data = ScheduleService(conn).get_schedules(params)
-    logger.info(f"Fetched schedules: {data}")
+    log_payload("Fetched schedules", data)
     return {"data": data}
 
 
+@traced("api_logic")
+@conditional_get(lambda kwargs: ["global"])
 @db_context_manager
 def get_schedule(conn, schedule_id, **kwargs):
     data = ScheduleService(conn).get_schedule(schedule_id)
-    logger.info(f"Fetched schedule: {data}")
+    log_payload("Fetched schedule", data)
     return {"data": data}
 
 
-@db_context_manager
+@traced("api_logic")
+@db_transaction
 def create_schedule(conn, schedule_data, **kwargs):
     reservation_id = ScheduleService(conn).create_schedule(schedule_data)
     logger.info(f"Created schedule with ID: {reservation_id}")
     return {"scheduleId": reservation_id}
 
 
-@db_context_manager
+@traced("api_logic")
+@db_transaction
+def create_recurring_schedules(conn, schedule_data, **kwargs):
+    data = ScheduleService(conn).create_recurring_schedules(schedule_data)
+    logger.info(f"Created {len(data['created'])} recurring schedules")
+    return {"data": data}
+
+
+@traced("api_logic")
+@db_transaction
 def patch_attendance(conn, attendance_id, joined, **kwargs):
     data = ScheduleService(conn).patch_attendance(attendance_id, joined)
     logger.info(f"Patched attendance ID: {attendance_id} with joined: {joined}")
     return {"data": data}
 
 
-@db_context_manager
+@traced("api_logic")
+@db_transaction
+def patch_attendances(conn, changes=None, **kwargs):
+    data = ScheduleService(conn).patch_attendances({"changes": changes})
+    logger.info(f"Patched attendances of {len(data)} schedules")
+    return {"data": data}
+
+
+@traced("api_logic")
+@db_transaction
 def delete_schedule(conn, schedule_id, **kwargs):
     ScheduleService(conn).delete_schedule(schedule_id)
     logger.info(f"Deleted schedule with ID: {schedule_id}")
@@ -1,9 +1,49 @@
+import base64
 import json
+import sys
+from types import MappingProxyType
 
-from pydantic import ValidationError
+from src.common.exceptions import (
+    FileS3NotFound,
+    AlreadyExist,
+    DatabaseBusy,
+    ExportTooLarge,
+    NotFound,
+    InvalidData,
+    MethodNotAllowed,
+)
+from src.common.compression import choose_encoding, compressor, negotiate
+from src.common.encoding import dumps
+from src.common.export import Export
+from src.settings import (
+    COMPRESSION_MIN_BYTES,
+    EXPORT_MAX_FILE_BYTES,
+    LAMBDA_RESPONSE_MAX_BYTES,
+    logger,
+)
 
-from src.common.exceptions import FileS3NotFound, AlreadyExist, NotFound, InvalidData
-from src.settings import logger
+# Cache-Control of responses without a route specific policy
+NO_STORE = "no-store"
+
+# Built once; every response gets a shallow copy it may extend
+SUCCESS_HEADERS = MappingProxyType(
+    {
+        "Access-Control-Allow-Headers": "Content-Type",
+        "Access-Control-Allow-Origin": "*",  ## Allow from anywhere
+        "Access-Control-Allow-Methods": "*",  ## Allow only GET request,
+        "Content-Type": "application/json; charset=utf-8",
+        "Cache-Control": NO_STORE,
+        "Vary": "Accept-Encoding",
+    }
+)
+ERROR_HEADERS = MappingProxyType(
+    {
+        "Access-Control-Allow-Headers": "Content-Type",
+        "Access-Control-Allow-Origin": "*",  ## Allow from anywhere
+        "Access-Control-Allow-Methods": "GET",  ## Allow only GET request
+        "Cache-Control": NO_STORE,
+    }
+)
 
 
 def exception_handler(func):
@@ -12,62 +52,172 @@ def exception_handler(func):
             data = func(event, context)
             # if isinstance(data, bytes):
             #     return make_bytes_response(data)
-            return make_success_response(data)
+            if isinstance(data, Export):
+                return make_export_response(data, get_header(event, "Accept-Encoding"))
+            if isinstance(data, tuple):
+                # (body, status_code, headers) of a conditional GET
+                response = make_success_response(*data)
+            else:
+                response = make_success_response(data)
+            return compress_response(response, get_header(event, "Accept-Encoding"))
         except (AlreadyExist, InvalidData) as e:
             logger.exception(e)
             return make_error_response(str(e), 400)
         except NotFound as e:
             logger.exception(e)
             return make_error_response(str(e), 404)
+        except ExportTooLarge as e:
+            logger.warning(e)
+            return make_error_response(str(e), 413)
+        except MethodNotAllowed as e:
+            logger.exception(e)
+            return make_error_response(
+                str(e), 405, headers={"Allow": ", ".join(e.allowed)}
+            )
+        except DatabaseBusy as e:
+            logger.warning(e)
+            return make_error_response(
+                str(e), 503, headers={"Retry-After": str(e.retry_after)}
+            )
         except FileS3NotFound as e:
             logger.exception(e)
             return make_error_response(str(e), 500)
-        except ValidationError as e:
-            logger.exception(e)
-            json_data = json.loads(e.json())[0]
-            msg = json_data["loc"][0] + " " + json_data["msg"]
-            return make_error_response(msg, 400)
         except Exception as e:
             logger.exception(e)
+            if is_validation_error(e):
+                return make_error_response(validation_error_message(e), 400)
             return make_error_response(str(e), 500)
 
     return wrapper
 
 
-def make_success_response(body: dict, status_code: int = 200):
-    print(
-        {
-            "statusCode": status_code,
-            "headers": {
-                "Access-Control-Allow-Headers": "Content-Type",
-                "Access-Control-Allow-Origin": "*",  ## Allow from anywhere
-                "Access-Control-Allow-Methods": "*",  ## Allow only GET request,
-                "Content-Type": "application/json; charset=utf-8",
-                "Cache-Control": "max-age=3600",
-            },
-            "body": json.dumps(body, ensure_ascii=False),
-        }
-    )
+def is_validation_error(e: Exception) -> bool:
+    """
+    isinstance check against pydantic.ValidationError that does not import
+    pydantic: routes that never validated input have not loaded it.
+    """
+    pydantic = sys.modules.get("pydantic")
+    return pydantic is not None and isinstance(e, pydantic.ValidationError)
+
+
+def validation_error_message(e: Exception) -> str:
+    """
+    "<field> <message>" of the first error of a pydantic.ValidationError.
+    Errors of a model validator have no field (an empty loc): message only.
+    """
+    error = json.loads(e.json())[0]
+    loc = ".".join(map(str, error["loc"]))
+    return f"{loc} {error['msg']}" if loc else error["msg"]
+
+
+def make_success_response(body: dict, status_code: int = 200, headers: dict = None):
     return {
         "statusCode": status_code,
-        "headers": {
-            "Access-Control-Allow-Headers": "Content-Type",
-            "Access-Control-Allow-Origin": "*",  ## Allow from anywhere
-            "Access-Control-Allow-Methods": "*",  ## Allow only GET request,
-            "Content-Type": "application/json; charset=utf-8",
-            "Cache-Control": "max-age=3600",
-        },
-        "body": json.dumps(body, ensure_ascii=False),
+        "headers": {**SUCCESS_HEADERS, **headers} if headers else dict(SUCCESS_HEADERS),
+        # 304 Not Modified has no body
+        "body": "" if status_code == 304 else dumps(body),
     }
 
 
-def make_error_response(message: str, status_code: int = 500):
+def make_error_response(message: str, status_code: int = 500, headers: dict = None):
     return {
         "statusCode": status_code,
-        "headers": {
-            "Access-Control-Allow-Headers": "Content-Type",
-            "Access-Control-Allow-Origin": "*",  ## Allow from anywhere
-            "Access-Control-Allow-Methods": "GET",  ## Allow only GET request
-        },
-        "body": json.dumps({"message": message}),
+        "headers": {**ERROR_HEADERS, **headers} if headers else dict(ERROR_HEADERS),
+        "body": dumps({"message": message}),
     }
+
+
+def make_export_response(export: Export, accept_encoding: str = None) -> dict:
+    """
+    Lambda proxy response of a file export. Python functions cannot stream
+    their response, so the file is buffered as it will be sent (never the
+    rows it was encoded from): text compressed on the fly when the client
+    accepts it. After every chunk the size of the response body, base64
+    encoded when binary, is checked, so an export that does not fit in one
+    Lambda response answers 413 as soon as it is known instead of failing in
+    Lambda.
+    """
+    is_text = export.content_type.startswith("text/")
+    encoding = choose_encoding(accept_encoding) if is_text else None
+    compress = flush = None
+    body = bytearray()
+    file_bytes = 0
+    for chunk in export.chunks:
+        file_bytes += len(chunk)
+        if compress is not None:
+            body += compress(chunk)
+        else:
+            body += chunk
+            # Small files are sent as they are, like other responses
+            if encoding is not None and len(body) >= COMPRESSION_MIN_BYTES:
+                compress, flush = compressor(encoding)
+                body = bytearray(compress(bytes(body)))
+        is_binary = not is_text or compress is not None
+        if (
+            file_bytes > EXPORT_MAX_FILE_BYTES
+            or response_body_size(len(body), is_binary) > LAMBDA_RESPONSE_MAX_BYTES
+        ):
+            # Stops the encoding and releases the database connection
+            export.chunks.close()
+            return make_export_too_large_response()
+
+    headers = {
+        **SUCCESS_HEADERS,
+        "Content-Type": export.content_type,
+        "Content-Disposition": f'attachment; filename="{export.filename}"',
+    }
+    if is_text and compress is None:
+        return {"statusCode": 200, "headers": headers, "body": body.decode()}
+    if compress is not None:
+        body += flush()
+        if response_body_size(len(body), True) > LAMBDA_RESPONSE_MAX_BYTES:
+            return make_export_too_large_response()
+        headers["Content-Encoding"] = encoding
+    return {
+        "statusCode": 200,
+        "headers": headers,
+        "body": base64.b64encode(body).decode(),
+        "isBase64Encoded": True,
+    }
+
+
+def response_body_size(size: int, is_binary: bool) -> int:
+    """Bytes of a body of `size` bytes in a Lambda response (base64 if binary)."""
+    return (size + 2) // 3 * 4 if is_binary else size
+
+
+def make_export_too_large_response() -> dict:
+    limit_mb = LAMBDA_RESPONSE_MAX_BYTES / (1024 * 1024)
+    return make_error_response(
+        f"The export does not fit in one response of {limit_mb:.1f} MB,"
+        " narrow the range of months",
+        413,
+    )
+
+
+def compress_response(response: dict, accept_encoding: str = None) -> dict:
+    """
+    Compress the body of a Lambda proxy response when the client accepts it.
+    A compressed body is binary, so it is sent base64 encoded with
+    isBase64Encoded (needs BinaryMediaTypes on the API, see template.yml).
+    """
+    if not accept_encoding or not response["body"]:
+        return response
+    body, encoding = negotiate(response["body"].encode(), accept_encoding)
+    if encoding is None:
+        return response
+    response["headers"]["Content-Encoding"] = encoding
+    response["body"] = base64.b64encode(body).decode()
+    response["isBase64Encoded"] = True
+    return response
+
+
+def get_header(event: dict, name: str):
+    """
+    Case-insensitive request header lookup in an API Gateway event.
+    """
+    name = name.lower()
+    for key, value in (event.get("headers") or {}).items():
+        if key.lower() == name:
+            return value
+    return None
@@ -0,0 +1,104 @@
+"""
+Accept-Encoding negotiation and compression of response bodies, shared by
+the Lambda responses (api_utils) and the Flask app.
+
+Bodies below COMPRESSION_MIN_BYTES are sent as they are: compressing them
+costs more time than it saves on the wire. brotli is offered when the
+brotli package is installed, gzip always.
+"""
+
+import gzip
+import zlib
+from typing import Optional
+
+from src.common.tracing import traced
+from src.settings import COMPRESSION_LEVEL, COMPRESSION_MIN_BYTES
+
+_brotli = None
+
+
+def _load_brotli():
+    """The brotli module or False, imported on the first large response."""
+    global _brotli
+    if _brotli is None:
+        try:
+            import brotli
+
+            _brotli = brotli
+        except ImportError:
+            _brotli = False
+    return _brotli
+
+
+def parse_accept_encoding(accept_encoding: Optional[str]) -> dict:
+    """
+    'gzip, br;q=0.8, *;q=0' -> {'gzip': 1.0, 'br': 0.8, '*': 0.0}
+    """
+    weights = {}
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding] = weight
+    return weights
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    The best supported content coding the client accepts, brotli winning
+    ties with gzip, or None for identity.
+    """
+    weights = parse_accept_encoding(accept_encoding)
+    if not weights:
+        return None
+    supported = ["br", "gzip"] if _load_brotli() else ["gzip"]
+    best, best_weight = None, 0.0
+    for coding in supported:
+        weight = weights.get(coding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return _load_brotli().compress(data, quality=COMPRESSION_LEVEL)
+    return gzip.compress(data, compresslevel=COMPRESSION_LEVEL)
+
+
+def compressor(encoding: str):
+    """
+    Incremental compression, for bodies compressed while they are produced.
+    :return: (compress(data) -> bytes, flush() -> bytes), the output of both
+        concatenated is the compressed body
+    """
+    if encoding == "br":
+        brotli_compressor = _load_brotli().Compressor(quality=COMPRESSION_LEVEL)
+        return brotli_compressor.process, brotli_compressor.finish
+    # wbits 16 + MAX_WBITS: gzip header and trailer, as gzip.compress
+    gzip_compressor = zlib.compressobj(
+        COMPRESSION_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+    )
+    return gzip_compressor.compress, gzip_compressor.flush
+
+
+@traced("encoding")
+def negotiate(data: bytes, accept_encoding: Optional[str]):
+    """
+    Compress a body when it is large enough and the client accepts it.
+    :return: (body, content encoding or None)
+    """
+    if len(data) < COMPRESSION_MIN_BYTES:
+        return data, None
+    encoding = choose_encoding(accept_encoding)
+    if encoding is None:
+        return data, None
+    return compress(data, encoding), encoding
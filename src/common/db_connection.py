@@ -1,6 +1,33 @@
+import functools
 import os
+import random
 import sqlite3
-from src.settings import SQLITE_PATH, logger
+import threading
+import time
+
+from src.common.exceptions import DatabaseBusy
+from src.common.read_replica import ReadReplica
+from src.common.sql_profiler import connection_factory
+from src.common.tracing import instrument_connection, record_lock_wait
+from src.common.unit_of_work import UnitOfWork
+from src.settings import (
+    SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_PATH,
+    SQLITE_READ_REPLICA,
+    SQLITE_RETRY_BASE_MS,
+    SQLITE_RETRY_MAX_MS,
+    SQLITE_REVALIDATE_SECONDS,
+    SQLITE_WRITE_DEADLINE_SECONDS,
+    logger,
+)
+
+# Applied once per physical connection, right after it is opened.
+SQLITE_PRAGMAS = (
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -8000",
+    f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}",
+)
+LOCK_ERROR_CODES = (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
 
 
 def connect_db(db_path: str = SQLITE_PATH):
@@ -8,7 +35,7 @@ def connect_db(db_path: str = SQLITE_PATH):
     if not os.path.exists(db_path):
         raise FileNotFoundError("Database file not found!")
 
-    conn = sqlite3.connect(db_path)
+    conn = sqlite3.connect(db_path, factory=connection_factory())
     logger.info("Connected to the database successfully.")
     return conn
 
@@ -25,17 +52,249 @@ def initialize_db(db_path: str = SQLITE_PATH):
         logger.info("Database created successfully.")
 
 
+class ConnectionManager:
+    """
+    Keep one open connection per thread and hand it out on every call.
+
+    A warm Lambda container runs one invocation at a time on the same thread,
+    and every Flask worker thread gets its own connection, so the sqlite3
+    same-thread check is never violated. The connection is validated before
+    it is reused and reopened when the check fails. Every
+    `revalidate_seconds` the database file is also stat'ed, so a file that was
+    removed and re-created (efs_handler init_db) is picked up by warm workers.
+
+    With a read replica mode ("memory" or "tmp") read-only calls are served
+    from a local copy of the database, see ReadReplica.
+    """
+
+    def __init__(
+        self,
+        db_path: str = SQLITE_PATH,
+        revalidate_seconds: float = SQLITE_REVALIDATE_SECONDS,
+        replica_mode: str = SQLITE_READ_REPLICA,
+    ):
+        self._db_path = db_path
+        self._revalidate_seconds = revalidate_seconds
+        self._local = threading.local()
+        self._replica = ReadReplica(replica_mode) if replica_mode else None
+
+    def get_connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._is_same_file() and self._is_healthy(conn):
+            return conn
+        if conn is not None:
+            logger.info("Cached database connection is unusable, reconnecting.")
+            self._close_quietly(conn)
+        conn = self._open()
+        self._local.conn = conn
+        self._local.file_id = self._file_id()
+        self._local.checked_at = time.monotonic()
+        return conn
+
+    def get_read_connection(self):
+        """
+        Connection for read-only calls: the replica when enabled, otherwise
+        the primary connection.
+        """
+        conn = self.get_connection()
+        if self._replica is None:
+            return conn
+        try:
+            return self._replica.get_connection(conn)
+        except sqlite3.Error as e:
+            logger.warning(f"Read replica unavailable, reading from primary: {e}")
+            self._replica.discard()
+            return conn
+
+    def release(self, conn, failed: bool = False):
+        """
+        Hand the connection back after a call. Any transaction left open is
+        rolled back so no lock survives into the next invocation. A failed
+        call drops the connection if it no longer passes the health check.
+        """
+        if self._replica is not None and self._replica.is_replica(conn):
+            if failed:
+                self._replica.discard()
+            return
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self.close()
+            return
+        if failed and not self._is_healthy(conn):
+            self.close()
+
+    def close(self):
+        if self._replica is not None:
+            self._replica.discard()
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            self._close_quietly(conn)
+            logger.info("Closing database connection.")
+
+    def _is_same_file(self) -> bool:
+        now = time.monotonic()
+        if now - self._local.checked_at < self._revalidate_seconds:
+            return True
+        self._local.checked_at = now
+        return self._file_id() == self._local.file_id
+
+    def _file_id(self):
+        try:
+            st = os.stat(self._db_path)
+        except OSError:
+            return None
+        return st.st_dev, st.st_ino
+
+    def _open(self):
+        conn = connect_db(self._db_path)
+        for pragma in SQLITE_PRAGMAS:
+            conn.execute(pragma)
+        return instrument_connection(conn)
+
+    @staticmethod
+    def _is_healthy(conn) -> bool:
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+
+connection_manager = ConnectionManager()
+
+
+def is_lock_error(e: Exception) -> bool:
+    """SQLITE_BUSY / SQLITE_LOCKED: another connection holds the lock."""
+    if not isinstance(e, sqlite3.OperationalError):
+        return False
+    error_code = getattr(e, "sqlite_errorcode", None)
+    if error_code is not None:
+        # Extended codes (e.g. SQLITE_BUSY_SNAPSHOT) keep the primary code in
+        # the low byte
+        return error_code & 0xFF in LOCK_ERROR_CODES
+    return "locked" in str(e) or "busy" in str(e)
+
+
+def retry_delay(attempt: int) -> float:
+    """Full jitter exponential backoff, in seconds."""
+    ceiling = min(SQLITE_RETRY_MAX_MS, SQLITE_RETRY_BASE_MS * 2**attempt)
+    return random.uniform(0, ceiling) / 1000
+
+
 def db_context_manager(func):
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        conn = connect_db()
+        conn = connection_manager.get_read_connection()
+        failed = False
         try:
             result = func(conn, *args, **kwargs)
             return result
         except Exception as e:
+            failed = True
             conn.rollback()  # Important to release the lock
+            if is_lock_error(e):
+                raise DatabaseBusy("Database is busy, retry later") from e
             raise e
         finally:
-            conn.close()
-            logger.info("Closing database connection.")
+            connection_manager.release(conn, failed)
+
+    return wrapper
+
+
+def db_stream(func):
+    """
+    db_context_manager for a generator function that reads while its output
+    is streamed: the connection is held until the generator is exhausted or
+    closed. The generator is advanced to its first item before returning, so
+    validation errors are raised while an error response can still be sent.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        conn = connection_manager.get_read_connection()
+        generator = func(conn, *args, **kwargs)
+        try:
+            first = next(generator)
+        except StopIteration:
+            connection_manager.release(conn)
+            return iter(())
+        except Exception as e:
+            conn.rollback()
+            connection_manager.release(conn, failed=True)
+            if is_lock_error(e):
+                raise DatabaseBusy("Database is busy, retry later") from e
+            raise e
+
+        def stream():
+            failed = False
+            try:
+                yield first
+                yield from generator
+            except Exception:
+                failed = True
+                raise
+            finally:
+                generator.close()
+                connection_manager.release(conn, failed)
+
+        return stream()
+
+    return wrapper
+
+
+def db_transaction(func):
+    """
+    db_context_manager for write requests: the whole call runs in one
+    BEGIN IMMEDIATE transaction and is committed exactly once.
+
+    When the database stays locked by other writers past the busy timeout,
+    the transaction is rolled back and the whole call retried after a
+    jittered backoff, until SQLITE_WRITE_DEADLINE_SECONDS; then it fails with
+    DatabaseBusy (503). Waits and retries are recorded on the request trace.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        deadline = time.monotonic() + SQLITE_WRITE_DEADLINE_SECONDS
+        attempt = 0
+        while True:
+            conn = connection_manager.get_connection()
+            failed = False
+            try:
+                with UnitOfWork(conn):
+                    return func(conn, *args, **kwargs)
+            except Exception as e:
+                failed = True
+                if not is_lock_error(e):
+                    raise e
+                lock_error = e
+            finally:
+                connection_manager.release(conn, failed)
+
+            # UnitOfWork records the wait of BEGIN itself, only the backoff is
+            # added here
+            attempt += 1
+            delay = retry_delay(attempt)
+            if time.monotonic() + delay >= deadline:
+                record_lock_wait(0, timeouts=1)
+                raise DatabaseBusy(
+                    f"Database is busy, gave up after {attempt} attempts"
+                ) from lock_error
+            logger.warning(
+                f"{func.__name__}: {lock_error}, retry {attempt} in"
+                f" {delay * 1000:.0f} ms"
+            )
+            time.sleep(delay)
+            record_lock_wait(delay * 1000, retries=1)
 
     return wrapper
@@ -0,0 +1,55 @@
+"""
+JSON encoding of the API responses.
+
+Every body is serialized exactly once by `dumps`. With JSON_BACKEND=auto
+(default) orjson is used when it is installed, otherwise the standard json
+module; both keep non-ASCII characters such as Vietnamese names unescaped.
+"""
+
+import json
+
+from src.common.tracing import traced
+from src.settings import JSON_BACKEND, logger
+
+
+def _json_dumps(body, default=None, sort_keys=False, indent=None) -> str:
+    return json.dumps(
+        body, ensure_ascii=False, default=default, sort_keys=sort_keys, indent=indent
+    )
+
+
+def _load_orjson():
+    if JSON_BACKEND not in ("auto", "orjson"):
+        return None
+    try:
+        import orjson
+    except ImportError:
+        if JSON_BACKEND == "orjson":
+            logger.warning("JSON_BACKEND=orjson but orjson is not installed")
+        return None
+    return orjson
+
+
+_orjson = _load_orjson()
+BACKEND = "orjson" if _orjson else "json"
+
+
+@traced("encoding")
+def dumps(body, default=None, sort_keys=False, indent=None) -> str:
+    """
+    :param default: called for values neither encoder supports, as in json.dumps
+    :param sort_keys: sort the keys of objects
+    :param indent: pretty-print with this indent (orjson only supports 2)
+    """
+    if _orjson is None or indent not in (None, 2):
+        return _json_dumps(body, default, sort_keys, indent)
+    option = _orjson.OPT_NON_STR_KEYS
+    if sort_keys:
+        option |= _orjson.OPT_SORT_KEYS
+    if indent:
+        option |= _orjson.OPT_INDENT_2
+    try:
+        return _orjson.dumps(body, default=default, option=option).decode()
+    except TypeError:
+        # Values orjson does not support, e.g. integers above 64 bits
+        return _json_dumps(body, default, sort_keys, indent)
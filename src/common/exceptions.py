@@ -12,3 +12,19 @@ class NotFound(Exception):
 
 class InvalidData(Exception):
     pass
+
+
+class MethodNotAllowed(Exception):
+    def __init__(self, message: str, allowed=()):
+        super().__init__(message)
+        self.allowed = list(allowed)
+
+
+class ExportTooLarge(Exception):
+    pass
+
+
+class DatabaseBusy(Exception):
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
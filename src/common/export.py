@@ -0,0 +1,97 @@
+"""
+File exports streamed as chunks of bytes: rows come from a database cursor
+and are encoded batch by batch, so memory does not grow with the export.
+
+CSV is always available. XLSX needs openpyxl, imported on the first XLSX
+export; its write-only workbook keeps rows in a temporary file, which is
+streamed back once the workbook is saved. The whole workbook is written before
+its first chunk, so XLSX exports are limited to EXPORT_XLSX_MAX_ROWS rows.
+"""
+
+import csv
+import io
+import itertools
+import tempfile
+from typing import Iterable, Iterator, NamedTuple, Sequence
+
+from src.common.exceptions import ExportTooLarge
+from src.settings import EXPORT_BATCH_ROWS, EXPORT_XLSX_MAX_ROWS
+
+# Bytes read at a time from the saved XLSX workbook
+XLSX_CHUNK_BYTES = 64 * 1024
+
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+_openpyxl = None
+
+
+class Export(NamedTuple):
+    filename: str
+    content_type: str
+    # Lazily encoded file content
+    chunks: Iterator[bytes]
+
+
+def _load_openpyxl():
+    """The openpyxl module or False, imported on the first XLSX export."""
+    global _openpyxl
+    if _openpyxl is None:
+        try:
+            import openpyxl
+
+            _openpyxl = openpyxl
+        except ImportError:
+            _openpyxl = False
+    return _openpyxl
+
+
+def available_formats() -> list:
+    """Export formats this installation can encode."""
+    return ["csv", "xlsx"] if _load_openpyxl() else ["csv"]
+
+
+def encode_csv(header: Sequence, rows: Iterable[Sequence]) -> Iterator[bytes]:
+    """
+    CSV chunks of EXPORT_BATCH_ROWS rows, the header first. A UTF-8 BOM lets
+    spreadsheet programs detect the encoding of Vietnamese nicknames.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    yield ("\ufeff" + buffer.getvalue()).encode()
+    rows = iter(rows)
+    while batch := list(itertools.islice(rows, EXPORT_BATCH_ROWS)):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(batch)
+        yield buffer.getvalue().encode()
+
+
+def encode_xlsx(
+    header: Sequence, rows: Iterable[Sequence], title: str = "Export"
+) -> Iterator[bytes]:
+    """
+    XLSX chunks of one sheet. The workbook is written in write-only mode, so
+    only the temporary file grows with the rows.
+    :raises ExportTooLarge: more than EXPORT_XLSX_MAX_ROWS rows, raised before
+        the first chunk
+    """
+    workbook = _load_openpyxl().Workbook(write_only=True)
+    sheet = workbook.create_sheet(title)
+    sheet.append(list(header))
+    for count, row in enumerate(rows, 1):
+        if count > EXPORT_XLSX_MAX_ROWS:
+            raise ExportTooLarge(
+                f"XLSX exports are limited to {EXPORT_XLSX_MAX_ROWS} rows,"
+                " narrow the range of months or export CSV"
+            )
+        sheet.append(list(row))
+    with tempfile.TemporaryFile() as file:
+        workbook.save(file)
+        file.seek(0)
+        while chunk := file.read(XLSX_CHUNK_BYTES):
+            yield chunk
+
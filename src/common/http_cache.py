@@ -0,0 +1,94 @@
+"""
+Conditional GET support for the read endpoints.
+
+ETags are derived from the data versions of the scopes a response depends on
+(see migration 0005_data_versions), never from the response body. A request
+whose If-None-Match still matches is answered with 304 after a single primary
+key lookup, without running the service and repo stack.
+
+Decorated api_logic functions take an extra `if_none_match` keyword and
+return Flask style tuples, which exception_handler also understands:
+(body, 200, headers) or ("", 304, headers).
+"""
+
+import functools
+import hashlib
+import json
+import sqlite3
+
+from src.common.db_connection import connection_manager
+from src.data_repo.data_version_repo import DataVersionRepo
+from src.settings import logger
+
+# Cache-Control values of the routes (api_utils.NO_STORE for everything else)
+REVALIDATE = "no-cache"
+SHORT_LIVED = "max-age=60, must-revalidate"
+
+
+def make_etag(name: str, versions: dict, params: dict) -> str:
+    key = json.dumps([name, versions, params], sort_keys=True, default=str)
+    return f'W/"{hashlib.sha1(key.encode()).hexdigest()[:20]}"'
+
+
+def etag_matches(if_none_match, etag: str) -> bool:
+    """
+    Weak comparison of an If-None-Match header against an ETag.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+def get_data_versions(scopes):
+    """
+    Read the versions of the scopes, or None when they are not available
+    (database not migrated yet).
+    """
+    conn = connection_manager.get_connection()
+    failed = False
+    try:
+        return DataVersionRepo(conn).get_versions(scopes)
+    except sqlite3.Error as e:
+        failed = True
+        logger.warning(f"Data versions unavailable, ETag skipped: {e}")
+        return None
+    finally:
+        connection_manager.release(conn, failed)
+
+
+def conditional_get(scopes, cache_control: str = REVALIDATE, key=None):
+    """
+    Add ETag and Cache-Control headers to a read endpoint and answer a
+    matching If-None-Match with 304.
+    :param scopes: function of the call's kwargs returning the data version
+        scopes the response depends on
+    :param cache_control: Cache-Control header of the route
+    :param key: optional function of the kwargs returning anything else the
+        response depends on, e.g. the current month
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(if_none_match=None, **kwargs):
+            headers = {"Cache-Control": cache_control}
+            versions = get_data_versions(scopes(kwargs))
+            if versions is None:
+                return func(**kwargs), 200, headers
+
+            params = dict(kwargs)
+            if key is not None:
+                params["_key"] = key(kwargs)
+            headers["ETag"] = make_etag(func.__name__, versions, params)
+            if etag_matches(if_none_match, headers["ETag"]):
+                return "", 304, headers
+            return func(**kwargs), 200, headers
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,180 @@
+"""
+Versioned schema migrations.
+
+Migrations are numbered SQL files in resources/migrations, named
+``NNNN_description.sql``. The number of the last applied migration is stored
+in ``PRAGMA user_version``. Each migration runs in its own
+``BEGIN IMMEDIATE`` transaction together with the version bump, so a failed
+migration leaves the database at the previous version.
+
+Index builds inside a migration only hold the write lock while they run;
+readers keep working until the commit. After anything was applied the
+planner statistics are refreshed with ANALYZE and PRAGMA optimize.
+"""
+
+import os
+import re
+import sqlite3
+import sys
+from typing import Optional
+
+from src.settings import MIGRATIONS_DIR, SQLITE_PATH, logger
+
+MIGRATION_FILE_PATTERN = re.compile(r"^(\d+)_([\w-]+)\.sql$")
+
+SCHEMA_HEADER = """\
+-- Schema of the latest migration, generated from resources/migrations with
+--     python -m src.common.migrations --schema > resources/ddl.sql
+-- Do not edit it, add a migration: databases are created and upgraded by
+-- applying the migrations (efs_handler "migrate" task).
+"""
+
+
+def list_migrations(migrations_dir: str = MIGRATIONS_DIR) -> list[tuple[int, str]]:
+    """
+    Return (version, path) for every migration file, ordered by version.
+    """
+    migrations = []
+    for file_name in os.listdir(migrations_dir):
+        match = MIGRATION_FILE_PATTERN.match(file_name)
+        if match:
+            migrations.append(
+                (int(match.group(1)), os.path.join(migrations_dir, file_name))
+            )
+    migrations.sort()
+
+    versions = [version for version, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Duplicate migration numbers in {migrations_dir}")
+    return migrations
+
+
+def get_schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def split_statements(sql_script: str) -> list[str]:
+    """
+    Split a script into complete statements. executescript() cannot be used
+    because it commits any open transaction before it starts.
+    """
+    statements = []
+    buffer = ""
+    for line in sql_script.splitlines(keepends=True):
+        if not buffer and (not line.strip() or line.lstrip().startswith("--")):
+            continue
+        buffer += line
+        if sqlite3.complete_statement(buffer):
+            statements.append(buffer.strip())
+            buffer = ""
+    if buffer.strip():
+        raise ValueError(f"Incomplete SQL statement: {buffer.strip()[:80]}")
+    return statements
+
+
+def apply_migration(conn, version: int, path: str) -> bool:
+    """
+    Apply one migration. Returns False when another writer applied it first.
+    """
+    with open(path, encoding="utf-8") as file:
+        statements = split_statements(file.read())
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Re-check under the write lock, another container may have migrated.
+        if get_schema_version(conn) >= version:
+            conn.rollback()
+            return False
+        for statement in statements:
+            conn.execute(statement)
+        conn.execute(f"PRAGMA user_version = {int(version)}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    logger.info(f"Applied migration {os.path.basename(path)}")
+    return True
+
+
+def optimize(conn):
+    """Refresh planner statistics after the schema or indexes changed."""
+    conn.execute("ANALYZE")
+    conn.execute("PRAGMA optimize")
+    conn.commit()
+
+
+def apply_migrations(
+    conn, target: Optional[int] = None, migrations_dir: str = MIGRATIONS_DIR
+) -> list[int]:
+    """
+    Apply every pending migration up to `target` (default: the latest).
+    :return: versions that were applied by this call
+    """
+    current = get_schema_version(conn)
+    applied = []
+    for version, path in list_migrations(migrations_dir):
+        if version <= current:
+            continue
+        if target is not None and version > target:
+            break
+        if apply_migration(conn, version, path):
+            applied.append(version)
+
+    if applied:
+        optimize(conn)
+    logger.info(
+        f"Schema version {get_schema_version(conn)}, applied migrations: {applied}"
+    )
+    return applied
+
+
+def dump_schema(conn) -> str:
+    """
+    CREATE statements of a database's schema (tables first, then indexes,
+    views and triggers, each in creation order) and its user_version.
+    """
+    rows = conn.execute(
+        """
+        SELECT sql FROM sqlite_master
+        WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%'
+        ORDER BY
+            CASE type WHEN 'table' THEN 0 WHEN 'index' THEN 1
+                      WHEN 'view' THEN 2 ELSE 3 END,
+            rowid
+        """
+    )
+    statements = [f"{sql};" for (sql,) in rows]
+    statements.append(f"PRAGMA user_version = {get_schema_version(conn)};")
+    return SCHEMA_HEADER + "\n" + "\n\n".join(statements) + "\n"
+
+
+def latest_schema(migrations_dir: str = MIGRATIONS_DIR) -> str:
+    """Schema of an empty database with every migration applied."""
+    conn = sqlite3.connect(":memory:")
+    try:
+        apply_migrations(conn, migrations_dir=migrations_dir)
+        return dump_schema(conn)
+    finally:
+        conn.close()
+
+
+def run_migrations(
+    db_path: str = SQLITE_PATH, target: Optional[int] = None
+) -> list[int]:
+    conn = sqlite3.connect(db_path)
+    try:
+        return apply_migrations(conn, target)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["--schema"]:
+        print(latest_schema(), end="")
+        sys.exit(0)
+    try:
+        path = sys.argv[1] if len(sys.argv) > 1 else SQLITE_PATH
+        print(f"Applied migrations: {run_migrations(path)}")
+    except Exception as e:
+        print(f"Failed to migrate database: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,114 @@
+"""
+In-process read-through cache of repository query results.
+
+Entries are keyed by the repo method and its arguments and tagged with the
+tables the query reads. Each lookup reads the current versions of those
+tables from data_versions (bumped by triggers, see migration
+0006_table_versions), so a write made by any Lambda container or Flask worker
+invalidates the entry on the next lookup. Size is bounded with LRU eviction.
+"""
+
+import copy
+import functools
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from src.data_repo.data_version_repo import DataVersionRepo
+from src.settings import QUERY_CACHE_SIZE, QUERY_CACHE_STATS_EVERY, logger
+
+
+class QueryCache:
+    def __init__(self, max_entries: int = QUERY_CACHE_SIZE):
+        self._max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (table versions, result)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bypasses = 0
+
+    def get_or_load(self, conn, key, tables, loader):
+        """
+        Return the cached result of `key` when the versions of `tables` did
+        not change since it was loaded, otherwise run `loader` and cache it.
+        Results are deep-copied so callers can modify them freely.
+        """
+        if self._max_entries <= 0:
+            return loader()
+        try:
+            versions = DataVersionRepo(conn).get_versions(
+                f"table:{table}" for table in tables
+            )
+        except sqlite3.Error as e:
+            # Database not migrated yet, nothing to validate entries with
+            logger.warning(f"Table versions unavailable, query cache skipped: {e}")
+            with self._lock:
+                self.bypasses += 1
+            return loader()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == versions:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self._log_stats()
+                return copy.deepcopy(entry[1])
+            self.misses += 1
+            self._log_stats()
+
+        result = loader()
+        with self._lock:
+            self._entries[key] = (versions, copy.deepcopy(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "maxEntries": self._max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "bypasses": self.bypasses,
+            "hitRatio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def _log_stats(self):
+        lookups = self.hits + self.misses
+        if QUERY_CACHE_STATS_EVERY and lookups % QUERY_CACHE_STATS_EVERY == 0:
+            logger.info(f"Query cache stats: {self.stats()}")
+
+
+query_cache = QueryCache()
+
+
+def cached_query(*tables):
+    """
+    Cache the result of a repo method (self._conn is used to validate it).
+    :param tables: the tables the query reads
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            key = (
+                func.__qualname__,
+                json.dumps([args, kwargs], sort_keys=True, default=str),
+            )
+            return query_cache.get_or_load(
+                self._conn, key, tables, lambda: func(self, *args, **kwargs)
+            )
+
+        return wrapper
+
+    return decorator
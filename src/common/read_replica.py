@@ -0,0 +1,75 @@
+import os
+import sqlite3
+import threading
+
+from src.common.sql_profiler import connection_factory
+from src.common.tracing import instrument_connection
+from src.settings import SQLITE_REPLICA_DIR, logger
+
+REPLICA_MODES = ("memory", "tmp")
+
+
+class ReadReplica:
+    """
+    Local copy of the primary database that serves read-only requests.
+
+    The copy is made with the sqlite backup API, either in memory or in a
+    file under /tmp, one per thread like the primary connections. Before a
+    read it is compared with the primary: PRAGMA data_version changes when
+    another connection (another Lambda container or Flask worker) committed,
+    and total_changes grows when this thread's own primary connection wrote.
+    Only then is the copy refreshed. Writes always go to the primary.
+    """
+
+    def __init__(self, mode: str, replica_dir: str = SQLITE_REPLICA_DIR):
+        if mode not in REPLICA_MODES:
+            raise ValueError(f"Replica mode must be one of {REPLICA_MODES}")
+        self._mode = mode
+        self._replica_dir = replica_dir
+        self._local = threading.local()
+
+    def get_connection(self, primary):
+        """
+        Replica connection that is up to date with the primary connection.
+        """
+        version = self._primary_version(primary)
+        replica = getattr(self._local, "conn", None)
+        if replica is None or self._local.version != version:
+            replica = self._refresh(primary, replica)
+            self._local.version = version
+        return replica
+
+    def discard(self):
+        """Drop the copy; the next read makes a fresh one."""
+        replica = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if replica is not None:
+            try:
+                replica.close()
+            except sqlite3.Error:
+                pass
+
+    def is_replica(self, conn) -> bool:
+        return conn is not None and conn is getattr(self._local, "conn", None)
+
+    @staticmethod
+    def _primary_version(primary):
+        data_version = primary.execute("PRAGMA data_version").fetchone()[0]
+        return data_version, primary.total_changes
+
+    def _refresh(self, primary, replica):
+        if replica is None:
+            replica = instrument_connection(
+                sqlite3.connect(self._replica_path(), factory=connection_factory())
+            )
+        primary.backup(replica)
+        self._local.conn = replica
+        logger.info(f"Refreshed {self._mode} read replica")
+        return replica
+
+    def _replica_path(self) -> str:
+        if self._mode == "memory":
+            return ":memory:"
+        return os.path.join(
+            self._replica_dir, f"feeminton-replica-{threading.get_ident()}.db"
+        )
@@ -0,0 +1,149 @@
+"""
+Router of the Lambda entry points.
+
+Routes are registered once at import. An API Gateway proxy event is
+dispatched on (httpMethod, resource), a dict lookup; events without a
+resource template (local tests) fall back to the precompiled path regexes.
+Path and query parameters are converted to the declared types before the
+api_logic function is called.
+"""
+
+import base64
+import importlib
+import json
+import re
+from typing import Callable, Dict, Optional, Union
+
+from src.common.api_utils import get_header
+from src.common.exceptions import InvalidData, MethodNotAllowed, NotFound
+
+PATH_PARAMETER_PATTERN = re.compile(r"\{(\w+)\}")
+
+
+class Route:
+    def __init__(
+        self,
+        method: str,
+        template: str,
+        handler: Union[Callable, str],
+        path_types: Optional[Dict[str, Callable]] = None,
+        query_types: Optional[Dict[str, Callable]] = None,
+        body_arg: Optional[str] = None,
+    ):
+        self.method = method
+        self.template = template
+        self.path_types = path_types or {}
+        self.query_types = query_types or {}
+        # Name of the argument that receives the whole JSON body; without it
+        # the body's fields are passed as keyword arguments.
+        self.body_arg = body_arg
+        self._handler = handler
+
+    @property
+    def handler(self) -> Callable:
+        """
+        The api_logic function. A "module:function" string is imported on
+        first use, so a handler only loads the modules of routes it serves.
+        """
+        if isinstance(self._handler, str):
+            module_name, function_name = self._handler.split(":")
+            module = importlib.import_module(module_name)
+            self._handler = getattr(module, function_name)
+        return self._handler
+
+    def build_kwargs(self, event: dict, path_parameters: dict) -> dict:
+        kwargs = {}
+        body = parse_body(event)
+        if self.body_arg:
+            kwargs[self.body_arg] = body
+        elif isinstance(body, dict):
+            kwargs.update(body)
+
+        # Path parameters win over query parameters and body fields
+        for name, value in (event.get("queryStringParameters") or {}).items():
+            kwargs[name] = convert(name, value, self.query_types.get(name))
+        for name, value in path_parameters.items():
+            kwargs[name] = convert(name, value, self.path_types.get(name))
+
+        if self.method == "GET":
+            kwargs["if_none_match"] = get_header(event, "If-None-Match")
+        return kwargs
+
+
+class Router:
+    def __init__(self):
+        self._routes = {}  # (method, template) -> Route
+        self._methods = {}  # template -> allowed methods
+        self._patterns = []  # (compiled path regex, template)
+
+    def add(self, method: str, template: str, handler, **options):
+        method = method.upper()
+        self._routes[(method, template)] = Route(method, template, handler, **options)
+        if template not in self._methods:
+            self._methods[template] = []
+            self._patterns.append((compile_template(template), template))
+            # Literal segments win over parameters: /schedules/recurring
+            # before /schedules/{schedule_id}
+            self._patterns.sort(key=lambda item: item[1].count("{"))
+        self._methods[template].append(method)
+
+    def resolve(self, event: dict):
+        """
+        Find the route of an event.
+        :return: (route, path parameters)
+        """
+        method = event.get("httpMethod", "GET").upper()
+        template = event.get("resource")
+        path_parameters = event.get("pathParameters") or {}
+        if template not in self._methods:
+            template, path_parameters = self._match_path(event.get("path", ""))
+
+        route = self._routes.get((method, template))
+        if route is None:
+            allowed = self._methods[template]
+            raise MethodNotAllowed(
+                f"Method {method} not allowed on {template}", allowed=allowed
+            )
+        return route, path_parameters
+
+    def dispatch(self, event: dict):
+        route, path_parameters = self.resolve(event)
+        return route.handler(**route.build_kwargs(event, path_parameters))
+
+    def _match_path(self, path: str):
+        for pattern, template in self._patterns:
+            match = pattern.fullmatch(path)
+            if match:
+                return template, match.groupdict()
+        raise NotFound(f"Path {path} not found")
+
+
+def compile_template(template: str):
+    """'/api/schedules/{schedule_id}' -> regex with a named group per parameter"""
+    parts = PATH_PARAMETER_PATTERN.split(template)
+    pattern = ""
+    for index, part in enumerate(parts):
+        # split() alternates literal text and parameter names
+        pattern += f"(?P<{part}>[^/]+)" if index % 2 else re.escape(part)
+    return re.compile(pattern + "/?")
+
+
+def convert(name: str, value, to_type: Optional[Callable]):
+    if to_type is None or value is None:
+        return value
+    try:
+        return to_type(value)
+    except (TypeError, ValueError):
+        raise InvalidData(f"{name} must be of type {to_type.__name__}")
+
+
+def parse_body(event: dict):
+    body = event.get("body")
+    if not body:
+        return {}
+    try:
+        if event.get("isBase64Encoded"):
+            body = base64.b64decode(body)
+        return json.loads(body)
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidData("Request body must be valid JSON")
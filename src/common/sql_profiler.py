@@ -0,0 +1,257 @@
+"""
+SQL profiler, enabled with SQL_PROFILER=1.
+
+Connections are opened with ProfiledConnection, whose cursors time every
+statement including the fetches of its rows. The first time a statement is
+seen its EXPLAIN QUERY PLAN is captured and full table scans are flagged.
+Statements slower than SQL_SLOW_MS are logged right away.
+
+The statements are also collected per request (profile_request for the
+Lambda handlers, start_profile and finish_profile for Flask), whether or not
+tracing is enabled: when the request ends a "sql_profile" JSON line
+summarizes them, with the slowest statements, the full scans and the
+statements repeated SQL_REPEAT_THRESHOLD times or more (the N+1 pattern).
+"""
+
+import contextvars
+import functools
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+
+from src.common.tracing import emit, lambda_route
+from src.settings import (
+    SQL_PROFILER_ENABLED,
+    SQL_REPEAT_THRESHOLD,
+    SQL_SLOW_MS,
+    logger,
+)
+
+EXPLAINED_STATEMENTS = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+# Normalized SQL -> query plan details, shared by all connections
+_plans = {}
+_current_profile = contextvars.ContextVar("current_sql_profile", default=None)
+
+
+def normalize(sql: str) -> str:
+    return WHITESPACE_PATTERN.sub(" ", sql).strip()
+
+
+def params_shape(params, many: bool = False) -> str:
+    """
+    Types of the parameters instead of their values, e.g. '(int, str)' or
+    '12 x (int, bool)' for executemany.
+    """
+    if many:
+        params = list(params)
+        first = params_shape(params[0]) if params else "()"
+        return f"{len(params)} x {first}"
+    if isinstance(params, dict):
+        items = [f"{key}: {type(value).__name__}" for key, value in params.items()]
+        return "{" + ", ".join(items) + "}"
+    return "(" + ", ".join(type(value).__name__ for value in params) + ")"
+
+
+def is_full_scan(detail: str) -> bool:
+    """A plan step reading a whole table instead of an index."""
+    if not detail.startswith("SCAN "):
+        return False
+    return not any(
+        marker in detail
+        for marker in ("USING", "VIRTUAL TABLE", "CONSTANT ROW", "(subquery", "CTE")
+    )
+
+
+class StatementStats:
+    def __init__(self, sql: str, shape: str):
+        self.sql = sql
+        self.shape = shape
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def to_dict(self) -> dict:
+        plan = _plans.get(self.sql) or []
+        return {
+            "sql": self.sql,
+            "params": self.shape,
+            "count": self.count,
+            "totalMs": round(self.total_ms, 3),
+            "maxMs": round(self.max_ms, 3),
+            "fullScans": [detail for detail in plan if is_full_scan(detail)],
+        }
+
+
+class RequestProfile:
+    """Statements of one request, keyed by normalized SQL."""
+
+    def __init__(self):
+        self.statements = OrderedDict()
+
+    def add(self, sql: str, shape: str, duration_ms: float) -> StatementStats:
+        stats = self.statements.get(sql)
+        if stats is None:
+            stats = self.statements[sql] = StatementStats(sql, shape)
+        stats.count += 1
+        stats.total_ms += duration_ms
+        stats.max_ms = max(stats.max_ms, duration_ms)
+        return stats
+
+    def finish(self, route: str) -> dict:
+        """Summary of the request, written by finish_profile."""
+        statements = [stats.to_dict() for stats in self.statements.values()]
+        summary = {
+            "type": "sql_profile",
+            "route": route,
+            "statementCount": sum(s["count"] for s in statements),
+            "distinctStatements": len(statements),
+            "totalMs": round(sum(s["totalMs"] for s in statements), 3),
+            "slowest": sorted(statements, key=lambda s: -s["totalMs"])[:5],
+            "fullScans": [s for s in statements if s["fullScans"]],
+            "repeated": [s for s in statements if s["count"] >= SQL_REPEAT_THRESHOLD],
+        }
+        if summary["repeated"]:
+            repeated = ", ".join(
+                f"{s['count']}x {s['sql'][:80]}" for s in summary["repeated"]
+            )
+            logger.warning(f"Repeated statements (N+1?) in {route}: {repeated}")
+        return summary
+
+
+def get_request_profile():
+    """Profile of the current request, None outside of a request."""
+    return _current_profile.get()
+
+
+def start_profile():
+    """Open the profile of a request, None when the profiler is disabled."""
+    if not SQL_PROFILER_ENABLED:
+        return None
+    profile = RequestProfile()
+    profile.token = _current_profile.set(profile)
+    return profile
+
+
+def finish_profile(profile, route: str):
+    """Close the profile of a request and write its summary."""
+    if profile is None:
+        return
+    _current_profile.reset(profile.token)
+    if profile.statements:
+        emit(profile.finish(route))
+
+
+def profile_request(func):
+    """Profile the statements of a Lambda handler, one profile per invocation."""
+
+    @functools.wraps(func)
+    def wrapper(event, context):
+        profile = start_profile()
+        try:
+            return func(event, context)
+        finally:
+            finish_profile(profile, lambda_route(event))
+
+    return wrapper
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    _stats = None
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._record(sql, parameters, False, started)
+
+    def executemany(self, sql, seq_of_parameters):
+        seq_of_parameters = list(seq_of_parameters)
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._record(sql, seq_of_parameters, True, started)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            self._add_fetch_time(started)
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        try:
+            return super().fetchmany(size if size is not None else self.arraysize)
+        finally:
+            self._add_fetch_time(started)
+
+    def fetchall(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            self._add_fetch_time(started)
+
+    def _record(self, sql, parameters, many: bool, started: float):
+        duration_ms = (time.perf_counter() - started) * 1000
+        normalized = normalize(sql)
+        if normalized not in _plans:
+            explain_params = parameters[0] if many and parameters else parameters
+            _plans[normalized] = explain(self.connection, sql, explain_params)
+        if duration_ms >= SQL_SLOW_MS:
+            logger.warning(f"Slow statement ({duration_ms:.1f} ms): {normalized[:120]}")
+
+        profile = get_request_profile()
+        self._stats = None
+        if profile is not None:
+            shape = params_shape(parameters, many)
+            self._stats = profile.add(normalized, shape, duration_ms)
+
+    def _add_fetch_time(self, started: float):
+        if self._stats is not None:
+            duration_ms = (time.perf_counter() - started) * 1000
+            self._stats.total_ms += duration_ms
+            self._stats.max_ms = max(self._stats.max_ms, duration_ms)
+
+
+class ProfiledConnection(sqlite3.Connection):
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    # The built-in shortcuts create their cursor without calling cursor()
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def explain(conn, sql: str, parameters) -> list:
+    """
+    EXPLAIN QUERY PLAN details of a statement, logged with its full scans.
+    Runs on a plain cursor so it is not profiled itself.
+    """
+    if not normalize(sql).upper().startswith(EXPLAINED_STATEMENTS):
+        return []
+    try:
+        cursor = sqlite3.Connection.cursor(conn)
+        rows = cursor.execute(f"EXPLAIN QUERY PLAN {sql}", parameters).fetchall()
+    except sqlite3.Error as e:
+        logger.info(f"No query plan for {normalize(sql)[:80]}: {e}")
+        return []
+    details = [row[3] for row in rows]
+    scans = [detail for detail in details if is_full_scan(detail)]
+    logger.info(f"Query plan of {normalize(sql)[:120]}: {details}")
+    if scans:
+        logger.warning(f"Full table scan {scans} in {normalize(sql)[:120]}")
+    return details
+
+
+def connection_factory():
+    """Connection class for sqlite3.connect(factory=...)."""
+    return ProfiledConnection if SQL_PROFILER_ENABLED else sqlite3.Connection
@@ -0,0 +1,249 @@
+"""
+Per-request span tracing and CloudWatch embedded metrics.
+
+A request (Lambda invocation or Flask request) opens a trace; every traced
+function called while it runs records a span with its layer: handler,
+api_logic, service, repo or encoding. When the request ends one JSON record
+with the spans, the time per layer, the query count, the time spent waiting
+for the database lock and the cold-start flag is written to stdout, followed
+by the same numbers in CloudWatch Embedded Metric Format. Both are single
+JSON lines, which the JSON log format of the functions (template.yml) leaves
+as they are.
+
+Outside of a trace the decorators cost one context variable lookup.
+"""
+
+import contextlib
+import contextvars
+import functools
+import inspect
+import json
+import sys
+import time
+from collections import defaultdict
+
+from src.settings import METRICS_NAMESPACE, TRACING_ENABLED, TRACING_MAX_SPANS
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_cold_start = True
+
+# Layer -> metric name of its total duration
+LAYER_METRICS = {
+    "handler": "HandlerMs",
+    "api_logic": "ApiLogicMs",
+    "service": "ServiceMs",
+    "repo": "RepoMs",
+    "encoding": "EncodingMs",
+}
+
+
+class Trace:
+    def __init__(self, route: str):
+        self.route = route
+        self.started = time.perf_counter()
+        self.spans = []
+        self.dropped_spans = 0
+        self.layers = defaultdict(float)
+        self.query_count = 0
+        self.lock_wait_ms = 0.0
+        self.lock_retries = 0
+        self.lock_timeouts = 0
+        self.status_code = None
+        self._open_layers = []
+
+    def to_record(self, cold_start: bool) -> dict:
+        return {
+            "type": "request_trace",
+            "route": self.route,
+            "statusCode": self.status_code,
+            "durationMs": round((time.perf_counter() - self.started) * 1000, 3),
+            "coldStart": cold_start,
+            "queryCount": self.query_count,
+            "lockWaitMs": round(self.lock_wait_ms, 3),
+            "lockRetries": self.lock_retries,
+            "lockTimeouts": self.lock_timeouts,
+            "layersMs": {layer: round(ms, 3) for layer, ms in self.layers.items()},
+            "spans": self.spans,
+            "droppedSpans": self.dropped_spans,
+        }
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def start_trace(route: str):
+    """Open the trace of a request, None when tracing is disabled."""
+    if not TRACING_ENABLED:
+        return None
+    trace = Trace(route)
+    trace.token = _current_trace.set(trace)
+    return trace
+
+
+def finish_trace(trace, status_code=None):
+    """Close the trace of a request and write its record and metrics."""
+    global _cold_start
+    if trace is None:
+        return
+    _current_trace.reset(trace.token)
+    if status_code is not None:
+        trace.status_code = status_code
+    record = trace.to_record(_cold_start)
+    _cold_start = False
+    emit(record)
+    emit(to_emf(record))
+
+
+@contextlib.contextmanager
+def span(name: str, layer: str):
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    # A service calling another service is counted once in the layer total
+    nested = layer in trace._open_layers
+    trace._open_layers.append(layer)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = (time.perf_counter() - started) * 1000
+        trace._open_layers.pop()
+        if not nested:
+            trace.layers[layer] += duration
+        if len(trace.spans) < TRACING_MAX_SPANS:
+            trace.spans.append(
+                {
+                    "name": name,
+                    "layer": layer,
+                    "startMs": round((started - trace.started) * 1000, 3),
+                    "durationMs": round(duration, 3),
+                }
+            )
+        else:
+            trace.dropped_spans += 1
+
+
+def traced(layer: str, name: str = None):
+    """Record every call of the decorated function as a span."""
+
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_trace.get() is None:
+                return func(*args, **kwargs)
+            with span(span_name, layer):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def trace_class(layer: str):
+    """Apply `traced(layer)` to every public method of a class."""
+
+    def decorator(cls):
+        for attr_name, attr in list(vars(cls).items()):
+            if not attr_name.startswith("_") and inspect.isfunction(attr):
+                setattr(cls, attr_name, traced(layer)(attr))
+        return cls
+
+    return decorator
+
+
+def lambda_route(event: dict) -> str:
+    """Route of a Lambda invocation: API Gateway method and resource."""
+    resource = event.get("resource") or event.get("path", "")
+    return f"{event.get('httpMethod', '')} {resource}".strip()
+
+
+def trace_request(func):
+    """
+    Trace a Lambda handler: one trace per invocation, routed by the API
+    Gateway method and resource.
+    """
+
+    @functools.wraps(func)
+    def wrapper(event, context):
+        trace = start_trace(lambda_route(event))
+        response = None
+        try:
+            with span("lambda_handler", "handler"):
+                response = func(event, context)
+            return response
+        finally:
+            status_code = response.get("statusCode") if response else 500
+            finish_trace(trace, status_code)
+
+    return wrapper
+
+
+def count_statement(statement: str):
+    """sqlite3 trace callback: count the statements of the current request."""
+    trace = _current_trace.get()
+    # Statements run by triggers are reported as "-- TRIGGER name" lines,
+    # the SQL profiler's query plans are not queries of the request
+    if trace is not None and not statement.startswith(("--", "EXPLAIN")):
+        trace.query_count += 1
+
+
+def record_lock_wait(wait_ms: float, retries: int = 0, timeouts: int = 0):
+    """Time the current request waited for the database write lock."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.lock_wait_ms += wait_ms
+        trace.lock_retries += retries
+        trace.lock_timeouts += timeouts
+
+
+def instrument_connection(conn):
+    if TRACING_ENABLED:
+        conn.set_trace_callback(count_statement)
+    return conn
+
+
+def to_emf(record: dict) -> dict:
+    """The numbers of a request record in CloudWatch Embedded Metric Format."""
+    metrics = {
+        "Duration": record["durationMs"],
+        "QueryCount": record["queryCount"],
+        "ColdStart": int(record["coldStart"]),
+        "LockWaitMs": record["lockWaitMs"],
+        "LockRetries": record["lockRetries"],
+        "LockTimeouts": record["lockTimeouts"],
+    }
+    for layer, ms in record["layersMs"].items():
+        metrics[LAYER_METRICS.get(layer, f"{layer}Ms")] = ms
+    units = {
+        "QueryCount": "Count",
+        "ColdStart": "Count",
+        "LockRetries": "Count",
+        "LockTimeouts": "Count",
+    }
+    return {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [
+                {
+                    "Namespace": METRICS_NAMESPACE,
+                    "Dimensions": [["Route"]],
+                    "Metrics": [
+                        {"Name": name, "Unit": units.get(name, "Milliseconds")}
+                        for name in metrics
+                    ],
+                }
+            ],
+        },
+        "Route": record["route"],
+        "StatusCode": record["statusCode"],
+        **metrics,
+    }
+
+
+def emit(record: dict):
+    sys.stdout.write(json.dumps(record, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
@@ -0,0 +1,45 @@
+import time
+
+from src.common.tracing import record_lock_wait
+
+
+class UnitOfWork:
+    """
+    Transaction scope for one unit of work across repositories.
+
+    Repositories only stage their writes; the outermost UnitOfWork commits
+    them once when the block exits cleanly and rolls everything back when it
+    raises. A UnitOfWork entered while a transaction is already open (e.g. a
+    service method called from a db_transaction API function) joins that
+    transaction and leaves commit/rollback to its owner.
+
+    Write transactions start with BEGIN IMMEDIATE so the write lock is taken
+    up front instead of failing half way when upgrading from a read lock. The
+    time BEGIN waits for that lock (busy_timeout) is recorded as lock wait,
+    whether it gets the lock or not.
+    """
+
+    def __init__(self, conn, immediate: bool = True):
+        self._conn = conn
+        self._immediate = immediate
+        self._owner = False
+
+    def __enter__(self):
+        self._owner = not self._conn.in_transaction
+        if self._owner:
+            started = time.perf_counter()
+            try:
+                self._conn.execute("BEGIN IMMEDIATE" if self._immediate else "BEGIN")
+            finally:
+                # Also when BEGIN gives up on the lock and db_transaction retries
+                record_lock_wait((time.perf_counter() - started) * 1000)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if not self._owner:
+            return False
+        if exc_type is None:
+            self._conn.commit()
+        else:
+            self._conn.rollback()
+        return False
@@ -0,0 +1,49 @@
+import datetime
+from typing import Optional, Tuple
+
+from src.settings import LOG_PAYLOADS, logger
+
+
+def shift_month(year: int, month: int, months: int) -> Tuple[int, int]:
+    """
+    Move (year, month) by a number of months, e.g. (2026, 1, -1) -> (2025, 12).
+    """
+    index = year * 12 + (month - 1) + months
+    return index // 12, index % 12 + 1
+
+
+def month_bounds(year: int, month: int) -> Tuple[str, str]:
+    """
+    Half-open ISO date range of a month: (first day, first day of next month).
+    Compare against schedules.schedule_day as `>= start AND < end`.
+    """
+    if not (1 <= int(month) <= 12):
+        raise ValueError("month must be an integer in the range 1..12")
+    next_year, next_month = shift_month(int(year), int(month), 1)
+    start = datetime.date(int(year), int(month), 1)
+    end = datetime.date(next_year, next_month, 1)
+    return start.isoformat(), end.isoformat()
+
+
+def current_month(today: Optional[datetime.date] = None) -> Tuple[int, int]:
+    """
+    (year, month) of today in UTC, matching SQLite's 'now'.
+    """
+    today = today or datetime.datetime.now(datetime.timezone.utc).date()
+    return today.year, today.month
+
+
+def month_key(year: int, month: int) -> str:
+    """
+    'YYYY-MM' key of the monthly ledger (refunds/bills month column).
+    """
+    return f"{int(year):04d}-{int(month):02d}"
+
+
+def log_payload(message: str, payload):
+    """
+    Log a full response payload, only when LOG_PAYLOADS is enabled: formatting
+    a year of schedules costs more than querying it.
+    """
+    if LOG_PAYLOADS:
+        logger.info(f"{message}: {payload}")
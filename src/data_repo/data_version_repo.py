@@ -0,0 +1,34 @@
+import json
+
+from src.common.tracing import trace_class
+
+
+@trace_class("repo")
+class DataVersionRepo:
+    """
+    Versions of the data_versions table, bumped by triggers on every write
+    (see migration 0005_data_versions).
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._cursor = conn.cursor()
+
+    def get_versions(self, scopes) -> dict:
+        """
+        Get the versions of the given scopes and the database epoch.
+        Scopes that were never written have version 0.
+        :return: {scope: version}
+        """
+        scopes = list(scopes)
+        self._cursor.execute(
+            """
+            SELECT scope, version
+            FROM data_versions
+            WHERE scope IN (SELECT value FROM json_each(?))
+            """,
+            (json.dumps(["epoch"] + scopes),),
+        )
+        versions = dict.fromkeys(scopes, 0)
+        versions.update(self._cursor.fetchall())
+        return versions
@@ -1,8 +1,32 @@
+import json
+
+from src.common.query_cache import cached_query
+from src.common.utils import month_key
+from src.common.tracing import trace_class
+
+
+def to_member_fee(member_id, member_nickname, member_fee, schedule_count, total_refund):
+    """
+    Member fee entry of a month: estimated_fee = member_fee * schedule_count of
+    the month - total_refund of the previous month.
+    """
+    return {
+        "memberId": member_id,
+        "memberNickname": member_nickname,
+        "memberFee": member_fee,
+        "scheduleCount": schedule_count,
+        "totalRefund": total_refund,
+        "estimatedFee": (member_fee * schedule_count) - total_refund,
+    }
+
+
+@trace_class("repo")
 class GroupRepo:
     def __init__(self, conn):
         self._conn = conn
         self._cursor = conn.cursor()
 
+    @cached_query("groups", "members")
     def get_all_groups(self):
         sql = """
             SELECT
@@ -88,70 +112,98 @@ class GroupRepo:
         """
         Calculate monthly fees for members:
         estimated_fee = (member_fee * schedule_count in given month) - total_refund(previous month)
+        Both figures come from the month's row in the bills ledger.
         """
-        # Determine previous month/year
-        if month == 1:
-            prev_month = 12
-            prev_year = year - 1
-        else:
-            prev_month = month - 1
-            prev_year = year
-
-        # --- Query 1: schedules in current month ---
-        sql_schedules = """
+        sql = """
             SELECT
                 m.id AS member_id,
                 m.nickname AS member_nickname,
                 m.member_fee AS member_fee,
-                COUNT(s.id) AS schedule_count
+                IFNULL(b.schedule_count, 0) AS schedule_count,
+                IFNULL(b.total_refund, 0) AS total_refund
             FROM members AS m
-            LEFT JOIN schedules AS s
-                ON s.group_id = m.group_id
-                AND strftime('%Y', s.schedule_date) = ?
-                AND strftime('%m', s.schedule_date) = ?
+            LEFT JOIN bills AS b
+                ON b.member_id = m.id
+                AND b.month = ?
             WHERE m.group_id = ?
-            GROUP BY m.id, m.nickname, m.member_fee
             ORDER BY m.nickname COLLATE NOCASE
         """
-        params = (str(year), f"{month:02d}", group_id)
-        self._cursor.execute(sql_schedules, params)
-        schedule_rows = self._cursor.fetchall()
+        self._cursor.execute(sql, (month_key(year, month), group_id))
+        rows = self._cursor.fetchall()
+
+        return [to_member_fee(*row) for row in rows]
 
-        # --- Query 2: refunds in previous month ---
-        sql_refunds = """
+    def iter_member_fees(self, months, group_id=None, batch_size=500):
+        """
+        Member fees of every month of a range, for one group or all of them, in
+        one query: the months are crossed with the members and joined to their
+        bills. Rows are read from the cursor in batches, ordered by group, month
+        and nickname.
+        :param months: 'YYYY-MM' keys, in order
+        :return: iterator of (group_id, group_name, month, member fee)
+        """
+        sql = """
+            WITH months(month) AS (SELECT value FROM json_each(?))
             SELECT
+                g.id AS group_id,
+                g.name AS group_name,
+                months.month AS month,
                 m.id AS member_id,
-                IFNULL(SUM(r.refund_amount), 0) AS total_refund
-            FROM members AS m
-            LEFT JOIN schedules AS ps
-                ON ps.group_id = m.group_id
-                AND strftime('%Y', ps.schedule_date) = ?
-                AND strftime('%m', ps.schedule_date) = ?
-            LEFT JOIN attendance AS r
-                ON r.schedule_id = ps.id
-                AND r.member_id = m.id
-            WHERE m.group_id = ?
-            GROUP BY m.id
+                m.nickname AS member_nickname,
+                m.member_fee AS member_fee,
+                IFNULL(b.schedule_count, 0) AS schedule_count,
+                IFNULL(b.total_refund, 0) AS total_refund
+            FROM groups AS g
+            JOIN members AS m
+                ON m.group_id = g.id
+            CROSS JOIN months
+            LEFT JOIN bills AS b
+                ON b.member_id = m.id
+                AND b.month = months.month
         """
-        params = (str(prev_year), f"{prev_month:02d}", group_id)
-        self._cursor.execute(sql_refunds, params)
-        refund_rows = self._cursor.fetchall()
-
-        # Convert refund_rows to dict for quick lookup
-        refund_map = {member_id: total_refund for member_id, total_refund in refund_rows}
+        params = [json.dumps(list(months))]
+        if group_id is not None:
+            sql += " WHERE g.id = ?"
+            params.append(group_id)
+        sql += " ORDER BY g.id, months.month, m.nickname COLLATE NOCASE"
+        # Own cursor: the caller may query the repo while iterating
+        cursor = self._conn.cursor()
+        try:
+            cursor.execute(sql, params)
+            while rows := cursor.fetchmany(batch_size):
+                for group_id, group_name, month, *fee in rows:
+                    yield group_id, group_name, month, to_member_fee(*fee)
+        finally:
+            cursor.close()
 
-        # --- Merge results ---
-        member_fees = []
-        for member_id, member_nickname, member_fee, schedule_count in schedule_rows:
-            total_refund = refund_map.get(member_id, 0)
-            estimated_fee = (member_fee * schedule_count) - total_refund
-            member_fees.append({
-                "memberId": member_id,
-                "memberNickname": member_nickname,
-                "memberFee": member_fee,
-                "scheduleCount": schedule_count,
-                "totalRefund": total_refund,
-                "estimatedFee": estimated_fee,
-            })
+    def get_member_fee_report(self, months, group_id=None):
+        """
+        Member fees of every month of a range, grouped by group and month in a
+        single pass over iter_member_fees.
+        :param months: 'YYYY-MM' keys, in order
+        :return: [{groupId, groupName, months: [{year, month, members}]}]
+        """
+        report = []
+        group = members = None
+        current = None
+        for group_id, group_name, month, fee in self.iter_member_fees(
+            months, group_id
+        ):
+            if group is None or group["groupId"] != group_id:
+                group = {"groupId": group_id, "groupName": group_name, "months": []}
+                report.append(group)
+                current = None
+            if month != current:
+                current = month
+                members = []
+                year_part, month_part = month.split("-")
+                group["months"].append(
+                    {
+                        "year": int(year_part),
+                        "month": int(month_part),
+                        "members": members,
+                    }
+                )
+            members.append(fee)
 
-        return member_fees
+        return report
@@ -0,0 +1,78 @@
+from src.common.tracing import trace_class
+
+
+@trace_class("repo")
+class LedgerRepo:
+    """
+    Monthly fee ledger stored in the refunds and bills tables.
+    The rows are maintained by triggers (see migration 0004_fee_ledger);
+    this repo only reads them and can rebuild them from scratch.
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._cursor = conn.cursor()
+
+    def rebuild(self):
+        """
+        Recompute refunds and bills from schedules and attendance.
+        Run inside a UnitOfWork so readers never see an empty ledger.
+        The ledger tables have no version triggers, so the global and group
+        data versions are bumped here, in the same transaction.
+        """
+        self._cursor.execute("DELETE FROM refunds")
+        self._cursor.execute("DELETE FROM bills")
+        self._cursor.execute(
+            """
+            INSERT INTO refunds (member_id, month, total_refund)
+            SELECT a.member_id, substr(s.schedule_day, 1, 7), SUM(a.refund_amount)
+            FROM attendance AS a
+            JOIN schedules AS s ON s.id = a.schedule_id
+            WHERE s.schedule_day IS NOT NULL
+            GROUP BY a.member_id, substr(s.schedule_day, 1, 7)
+            """
+        )
+        self._cursor.execute(
+            """
+            INSERT INTO bills (member_id, month, schedule_count, total_refund)
+            SELECT member_id, month, SUM(schedule_count), SUM(total_refund)
+            FROM (
+                SELECT
+                    m.id AS member_id,
+                    substr(s.schedule_day, 1, 7) AS month,
+                    COUNT(*) AS schedule_count,
+                    0 AS total_refund
+                FROM members AS m
+                JOIN schedules AS s ON s.group_id = m.group_id
+                WHERE s.schedule_day IS NOT NULL
+                GROUP BY m.id, substr(s.schedule_day, 1, 7)
+                UNION ALL
+                SELECT
+                    r.member_id,
+                    strftime('%Y-%m', r.month || '-01', '+1 month'),
+                    0,
+                    r.total_refund
+                FROM refunds AS r
+            )
+            GROUP BY member_id, month
+            """
+        )
+        self._bump_data_versions()
+
+    def _bump_data_versions(self):
+        """
+        Invalidate the ETags of every response showing fees: the global scope
+        and the scope of every group with members.
+        """
+        self._cursor.execute(
+            "UPDATE data_versions SET version = version + 1 WHERE scope = 'global'"
+        )
+        self._cursor.execute(
+            """
+            INSERT INTO data_versions (scope, version)
+            SELECT DISTINCT 'group:' || group_id, 1
+            FROM members
+            WHERE group_id IS NOT NULL
+            ON CONFLICT (scope) DO UPDATE SET version = version + 1
+            """
+        )
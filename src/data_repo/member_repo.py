@@ -1,11 +1,19 @@
+import json
+from typing import List, Optional
+
+from src.common.query_cache import cached_query
+from src.common.utils import current_month, month_key, shift_month
 from src.settings import logger
+from src.common.tracing import trace_class
 
 
+@trace_class("repo")
 class MemberRepo:
     def __init__(self, conn):
         self._conn = conn
         self._cursor = conn.cursor()
 
+    @cached_query("members")
     def get_all_members(self):
         self._cursor.execute("SELECT id, nickname, group_id FROM members")
         rows = self._cursor.fetchall()
@@ -14,64 +22,70 @@ class MemberRepo:
         ]
         return players
 
-    def get_member_by_id(self, member_id: int):
+    def get_member_by_id(self, member_id: int) -> Optional[dict]:
         """
-        Get a member by ID.
+        Get a member by ID in one query.
         - basic info
         - refund amount for all schedules of current month
         - estimated bill for next month
+        :return: the member, None when it does not exist
         """
         logger.info(f"Fetching member with ID {member_id}")
         self._cursor.execute(
-            "SELECT members.id, nickname, group_id, gender, member_fee FROM members join users on members.user_id= users.id where members.id = ?",
-            (member_id,),
+            MEMBER_BILL_SQL + " WHERE m.id = ?", (next_month_key(), member_id)
         )
         row = self._cursor.fetchone()
-        member = {
-            "id": row[0],
-            "nickname": row[1],
-            "groupId": row[2],
-            "gender": row[3],
-            "memberFee": row[4],
-        }
+        return to_member_bill(row) if row else None
 
-        # refund amount for all schedules of current month
+    def get_member_bills(
+        self, group_id: Optional[int] = None, member_ids: Optional[List[int]] = None
+    ) -> List[dict]:
+        """
+        The fields of get_member_by_id for all members of a group or for a
+        list of member IDs, in one query.
+        :return: members ordered by ID; unknown IDs are left out
+        """
+        if group_id is not None:
+            where, param = "m.group_id = ?", group_id
+        else:
+            where = "m.id IN (SELECT value FROM json_each(?))"
+            param = json.dumps(member_ids)
         self._cursor.execute(
-            """
-            SELECT SUM(refund_amount) 
-            FROM attendance a 
-            JOIN schedules s ON a.schedule_id = s.id 
-            WHERE a.member_id = ? 
-            AND a.joined = 0 
-            AND strftime('%Y-%m', s.schedule_date) = strftime('%Y-%m', 'now')
-        """,
-            (member_id,),
+            f"{MEMBER_BILL_SQL} WHERE {where} ORDER BY m.id", (next_month_key(), param)
         )
-        refund_row = self._cursor.fetchone()
-        member["currentMonthRefund"] = refund_row[0] if refund_row[0] is not None else 0
+        return [to_member_bill(row) for row in self._cursor.fetchall()]
 
-        # next month fee = unit_fee*schedules_amount - refund this month
-        # count of schedules for next month
-        self._cursor.execute(
-            """
-            SELECT COUNT(*) 
-            FROM schedules 
-            WHERE group_id = ? 
-            AND strftime('%Y-%m', schedule_date) = strftime('%Y-%m', 'now', '+1 month')
-        """,
-            (member["groupId"],),
-        )
-        schedule_count_row = self._cursor.fetchone()
-        schedule_count = (
-            schedule_count_row[0] if schedule_count_row[0] is not None else 0
-        )
-        logger.info(
-            f"Member ID {member_id} - Schedule count for next month: {schedule_count}"
-        )
 
-        estimated_bill = (
-            member["memberFee"] * schedule_count - member["currentMonthRefund"]
-        )
+# The bill of next month carries the schedule count of next month and the
+# refunds of the current month (see the bills ledger)
+MEMBER_BILL_SQL = """
+    SELECT
+        m.id,
+        m.nickname,
+        m.group_id,
+        u.gender,
+        m.member_fee,
+        IFNULL(b.schedule_count, 0),
+        IFNULL(b.total_refund, 0)
+    FROM members AS m
+    JOIN users AS u ON u.id = m.user_id
+    LEFT JOIN bills AS b ON b.member_id = m.id AND b.month = ?
+"""
+
+
+def next_month_key() -> str:
+    return month_key(*shift_month(*current_month(), 1))
+
 
-        member["estimatedBillNextMonth"] = estimated_bill if estimated_bill > 0 else 0
-        return member
+def to_member_bill(row) -> dict:
+    member_id, nickname, group_id, gender, member_fee, schedule_count, refund = row
+    estimated_bill = member_fee * schedule_count - refund
+    return {
+        "id": member_id,
+        "nickname": nickname,
+        "groupId": group_id,
+        "gender": gender,
+        "memberFee": member_fee,
+        "currentMonthRefund": refund,
+        "estimatedBillNextMonth": estimated_bill if estimated_bill > 0 else 0,
+    }
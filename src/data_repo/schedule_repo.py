@@ -1,24 +1,73 @@
-from typing import Optional, List, Dict
-from src.schemas.pydantic_models.schedules import NewScheduleModel
+import json
+import string
+from typing import TYPE_CHECKING, Optional, List, Dict
+from src.common.query_cache import cached_query
+from src.common.tracing import trace_class
 
+if TYPE_CHECKING:
+    from src.schemas.pydantic_models.schedules import NewScheduleModel
 
+# Python equivalent of SQLite's NOCASE collation, which only folds ASCII letters
+_NOCASE = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+@trace_class("repo")
 class ScheduleRepo:
 
     def __init__(self, conn):
         self._conn = conn
         self._cursor = conn.cursor()
 
-    def get_all_schedules(self, group_id: int) -> list[dict]:
+    @cached_query("schedules")
+    def get_schedules_in_range(
+        self, group_id: int, start_date: str, end_date: str
+    ) -> list[dict]:
+        """
+        Schedules of a group with start_date <= day < end_date (ISO dates),
+        newest first.
+        """
         self._cursor.execute(
             """
             SELECT schedules.id, schedule_date
-            FROM schedules where group_id = ?
+            FROM schedules
+            WHERE group_id = ?
+              AND schedule_day >= ?
+              AND schedule_day < ?
             ORDER BY schedule_date DESC""",
-            (group_id,),
+            (group_id, start_date, end_date),
         )
         rows = self._cursor.fetchall()
-        sections = [{"id": row[0], "scheduleDate": row[1]} for row in rows]
-        return sections
+        return [{"id": row[0], "scheduleDate": row[1]} for row in rows]
+
+    def iter_attendances_in_range(
+        self, group_id: int, start_date: str, end_date: str, batch_size: int = 500
+    ):
+        """
+        Attendance rows of the schedules of a group with
+        start_date <= day < end_date (ISO dates), oldest first, read from the
+        cursor in batches so memory does not grow with the range.
+        :return: iterator of (schedule date, member ID, nickname, joined, refund)
+        """
+        # Own cursor: the caller may query the repo while iterating
+        cursor = self._conn.cursor()
+        try:
+            cursor.execute(
+                """
+                SELECT s.schedule_date, m.id, m.nickname, a.joined, a.refund_amount
+                FROM schedules AS s
+                JOIN attendance AS a ON a.schedule_id = s.id
+                JOIN members    AS m ON m.id = a.member_id
+                WHERE s.group_id = ?
+                  AND s.schedule_day >= ?
+                  AND s.schedule_day < ?
+                ORDER BY s.schedule_date, m.nickname COLLATE NOCASE""",
+                (group_id, start_date, end_date),
+            )
+            while rows := cursor.fetchmany(batch_size):
+                for schedule_date, member_id, nickname, joined, refund in rows:
+                    yield schedule_date, member_id, nickname, bool(joined), refund
+        finally:
+            cursor.close()
 
     def get_schedule_by_id(self, schedule_id: int) -> Optional[dict]:
         self._cursor.execute(
@@ -37,7 +86,7 @@ class ScheduleRepo:
             }
         return None
 
-    def create_schedule(self, schedule_data: NewScheduleModel) -> int:
+    def create_schedule(self, schedule_data: "NewScheduleModel") -> int:
         self._cursor.execute(
             """
             INSERT INTO schedules (schedule_date, group_id) VALUES (?, ?)
@@ -48,29 +97,70 @@ class ScheduleRepo:
             ),
         )
         reservation_id = self._cursor.lastrowid
-        # commit
-        self._cursor.connection.commit()
         return reservation_id
 
-    def create_attendances_for_group_members(self, schedule_id: int) -> int:
+    def get_schedule_days(self, group_id: int, start_date: str, end_date: str) -> set:
         """
-        Insert attendance rows for all members that belong to the schedule's group.
-        Uses INSERT OR IGNORE (SQLite) to avoid duplicate rows (requires unique index).
-        Returns the number of rows that would be inserted (i.e., those not yet present).
+        Days (ISO dates) that already have a schedule for the group,
+        start_date <= day < end_date.
         """
-        # Count how many members still need attendance for this schedule
-        precheck_sql = """
-            SELECT COUNT(*)
+        self._cursor.execute(
+            """
+            SELECT DISTINCT schedule_day
+            FROM schedules
+            WHERE group_id = ?
+              AND schedule_day >= ?
+              AND schedule_day < ?
+            """,
+            (group_id, start_date, end_date),
+        )
+        return {row[0] for row in self._cursor.fetchall()}
+
+    def create_schedules(self, group_id: int, schedule_dates: List[str]) -> List[Dict]:
+        """
+        Insert many schedules of one group and the attendance rows of all the
+        group's members for them.
+        :param schedule_dates: 'YYYY-MM-DDTHH:MM:SS' values, not yet in the group
+        :return: the created schedules, oldest first
+        """
+        if not schedule_dates:
+            return []
+        self._cursor.executemany(
+            "INSERT INTO schedules (schedule_date, group_id) VALUES (?, ?)",
+            [(schedule_date, group_id) for schedule_date in schedule_dates],
+        )
+        dates_json = json.dumps(schedule_dates)
+        self._cursor.execute(
+            """
+            INSERT OR IGNORE INTO attendance (member_id, schedule_id, joined, refund_amount)
+            SELECT m.id, s.id, 1, 0
             FROM schedules s
             JOIN members  m ON m.group_id = s.group_id
-            LEFT JOIN attendance a
-                   ON a.schedule_id = s.id AND a.member_id = m.id
-            WHERE s.id = ?
-              AND a.id IS NULL
-        """
-        self._cursor.execute(precheck_sql, (schedule_id,))
-        to_insert = int(self._cursor.fetchone()[0])
+            WHERE s.group_id = ?
+              AND s.schedule_date IN (SELECT value FROM json_each(?))
+            """,
+            (group_id, dates_json),
+        )
+        self._cursor.execute(
+            """
+            SELECT id, schedule_date
+            FROM schedules
+            WHERE group_id = ?
+              AND schedule_date IN (SELECT value FROM json_each(?))
+            ORDER BY schedule_date
+            """,
+            (group_id, dates_json),
+        )
+        return [
+            {"id": row[0], "scheduleDate": row[1]} for row in self._cursor.fetchall()
+        ]
 
+    def create_attendances_for_group_members(self, schedule_id: int) -> int:
+        """
+        Insert attendance rows for all members that belong to the schedule's group.
+        Uses INSERT OR IGNORE (SQLite) to avoid duplicate rows (requires unique index).
+        Returns the number of rows inserted (i.e., those not yet present).
+        """
         insert_sql = """
             INSERT OR IGNORE INTO attendance (member_id, schedule_id, joined, refund_amount)
             SELECT m.id, s.id, 1, 0
@@ -79,10 +169,8 @@ class ScheduleRepo:
             WHERE s.id = ?
         """
         self._cursor.execute(insert_sql, (schedule_id,))
-        self._cursor.connection.commit()
-
-        # Optionally return the number of new rows
-        return to_insert
+        # rowcount does not include rows skipped by OR IGNORE
+        return self._cursor.rowcount
 
     def get_attendances_by_schedule_id(
         self,
@@ -128,6 +216,39 @@ class ScheduleRepo:
             for row in rows
         ]
 
+    def get_attendances_by_schedule_ids(
+        self, schedule_ids: List[int]
+    ) -> Dict[int, List[Dict]]:
+        """
+        Load the attendances of several schedules in one query.
+        :return: {schedule_id: [attendance, ...]} with an entry for every ID
+        """
+        attendances_by_schedule = {schedule_id: [] for schedule_id in schedule_ids}
+        if not schedule_ids:
+            return attendances_by_schedule
+
+        placeholders = ", ".join("?" for _ in schedule_ids)
+        sql = f"""
+            SELECT
+                a.schedule_id, a.id, m.id, m.nickname, a.joined, a.refund_amount
+            FROM attendance AS a
+            JOIN members      AS m ON a.member_id = m.id
+            WHERE a.schedule_id IN ({placeholders})
+            ORDER BY m.nickname COLLATE NOCASE, a.id
+        """
+        self._cursor.execute(sql, list(schedule_ids))
+        for row in self._cursor.fetchall():
+            attendances_by_schedule[row[0]].append(
+                {
+                    "attendanceId": row[1],
+                    "memberId": row[2],
+                    "memberName": row[3],
+                    "joined": bool(row[4]),
+                    "refundAmount": row[5],
+                }
+            )
+        return attendances_by_schedule
+
     def get_schedule_by_attendance_id(self, attendance_id: int) -> Optional[dict]:
         self._cursor.execute(
             """
@@ -157,10 +278,124 @@ class ScheduleRepo:
             """,
             (int(joined), refund_amount, attendance_id),
         )
-        # commit
-        self._cursor.connection.commit()
         return
 
+    def set_attendance_joined(self, attendance_id: int, joined: bool) -> Optional[dict]:
+        """
+        Set the joined flag and clear the refund of one attendance.
+        :return: {"id": schedule_id, "groupId": group_id} of the attendance's
+            schedule, or None if the attendance does not exist
+        """
+        self._cursor.execute(
+            """
+            UPDATE attendance
+            SET joined = ?, refund_amount = 0
+            WHERE id = ?
+            RETURNING
+                schedule_id,
+                (SELECT s.group_id FROM schedules AS s WHERE s.id = attendance.schedule_id)
+            """,
+            (int(joined), attendance_id),
+        )
+        row = self._cursor.fetchone()
+        if row:
+            return {"id": row[0], "groupId": row[1]}
+        return None
+
+    def get_attendance_schedules(self, attendance_ids: List[int]) -> Dict[int, dict]:
+        """
+        Schedule of each attendance, in one query.
+        :return: {attendance_id: {"id": schedule_id, "groupId": group_id}},
+            attendances that do not exist are missing from the result
+        """
+        self._cursor.execute(
+            """
+            SELECT a.id, s.id, s.group_id
+            FROM attendance AS a
+            JOIN schedules AS s ON s.id = a.schedule_id
+            WHERE a.id IN (SELECT value FROM json_each(?))
+            """,
+            (json.dumps(list(attendance_ids)),),
+        )
+        return {
+            row[0]: {"id": row[1], "groupId": row[2]}
+            for row in self._cursor.fetchall()
+        }
+
+    def set_attendances_joined(self, changes: List[tuple]):
+        """
+        Set the joined flag and clear the refund of many attendances.
+        :param changes: (attendance_id, joined) pairs
+        """
+        self._cursor.executemany(
+            """
+            UPDATE attendance
+            SET joined = ?, refund_amount = 0
+            WHERE id = ?
+            """,
+            [(int(joined), attendance_id) for attendance_id, joined in changes],
+        )
+
+    def get_schedules_by_ids(self, schedule_ids: List[int]) -> List[Dict]:
+        """
+        Schedules with the given IDs, newest first.
+        """
+        self._cursor.execute(
+            """
+            SELECT id, schedule_date
+            FROM schedules
+            WHERE id IN (SELECT value FROM json_each(?))
+            ORDER BY schedule_date DESC
+            """,
+            (json.dumps(list(schedule_ids)),),
+        )
+        return [
+            {"id": row[0], "scheduleDate": row[1]} for row in self._cursor.fetchall()
+        ]
+
+    def recalculate_refunds(
+        self, schedule_id: int, min_fee: int, max_refund: int
+    ) -> List[Dict]:
+        """
+        Split min_fee between the dropouts of a schedule, capped at max_refund,
+        and reset the refund of everyone who joined, in one statement.
+        :return: all attendances of the schedule after the update
+        """
+        self._cursor.execute(
+            """
+            UPDATE attendance
+            SET refund_amount = CASE
+                WHEN joined = 0 THEN MIN(
+                    ?,
+                    ? / (SELECT COUNT(*) FROM attendance
+                         WHERE schedule_id = ? AND joined = 0)
+                )
+                ELSE 0
+            END
+            WHERE schedule_id = ?
+            RETURNING
+                id,
+                member_id,
+                (SELECT m.nickname FROM members AS m WHERE m.id = attendance.member_id),
+                joined,
+                refund_amount
+            """,
+            (max_refund, min_fee, schedule_id, schedule_id),
+        )
+        rows = self._cursor.fetchall()
+        # RETURNING has no ORDER BY, keep the order of get_attendances_by_schedule_id
+        rows.sort(key=lambda row: ((row[2] or "").translate(_NOCASE), row[0]))
+        return [
+            {
+                "attendanceId": row[0],
+                "memberId": row[1],
+                "memberName": row[2],
+                "joined": bool(row[3]),
+                "refundAmount": row[4],
+            }
+            for row in rows
+        ]
+
     def get_attendance_by_id(self, attendance_id: int) -> Optional[dict]:
         self._cursor.execute(
             """
@@ -194,6 +429,4 @@ class ScheduleRepo:
             "DELETE FROM schedules WHERE id = ?",
             (schedule_id,),
         )
-        # commit
-        self._cursor.connection.commit()
         return
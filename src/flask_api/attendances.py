@@ -11,3 +11,9 @@ def patch_attendance(attendance_id):
     data = request.json
     joined = data.get("joined")
     return schedules.patch_attendance(attendance_id=attendance_id, joined=joined)
+
+
+@attendances_router.route("", methods=["PATCH"])
+def patch_attendances():
+    data = request.json
+    return schedules.patch_attendances(changes=data.get("changes"))
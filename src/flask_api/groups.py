@@ -1,4 +1,4 @@
-from flask import Blueprint
+from flask import Blueprint, Response, request
 
 from src.api_logic import groups
 
@@ -7,9 +7,47 @@ groups_router = Blueprint("groups", __name__)
 
 @groups_router.route("", methods=["GET"])
 def get_groups():
-    return groups.get_groups()
+    return groups.get_groups(if_none_match=request.headers.get("If-None-Match"))
+
+
+@groups_router.route("/fees", methods=["GET"])
+def get_fee_report():
+    return groups.get_fee_report(
+        fromYear=request.args.get("fromYear", type=int),
+        fromMonth=request.args.get("fromMonth", type=int),
+        toYear=request.args.get("toYear", type=int),
+        toMonth=request.args.get("toMonth", type=int),
+        groupId=request.args.get("groupId", type=int),
+        if_none_match=request.headers.get("If-None-Match"),
+    )
 
 
 @groups_router.route("/<int:group_id>/fees/<int:year>/<int:month>", methods=["GET"])
 def get_member_fees(group_id, year, month):
-    return groups.get_member_fees(group_id, year, month)
+    return groups.get_member_fees(
+        group_id=group_id,
+        year=year,
+        month=month,
+        if_none_match=request.headers.get("If-None-Match"),
+    )
+
+
+@groups_router.route("/<int:group_id>/export", methods=["GET"])
+def export_group(group_id):
+    export = groups.export_group(
+        group_id=group_id,
+        fromYear=request.args.get("fromYear", type=int),
+        fromMonth=request.args.get("fromMonth", type=int),
+        toYear=request.args.get("toYear", type=int),
+        toMonth=request.args.get("toMonth", type=int),
+        rows=request.args.get("rows", "attendance"),
+        format=request.args.get("format", "csv"),
+    )
+    # Without a Content-Length the chunks are sent with chunked encoding as
+    # they are encoded; they only need the database connection, not the
+    # request context
+    return Response(
+        export.chunks,
+        content_type=export.content_type,
+        headers={"Content-Disposition": f'attachment; filename="{export.filename}"'},
+    )
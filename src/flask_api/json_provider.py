@@ -0,0 +1,35 @@
+from flask.json.provider import DefaultJSONProvider
+
+from src.common.encoding import dumps
+
+# json.dumps arguments the shared encoder supports; "separators" is only what
+# Flask passes for compact output, which the encoder produces anyway
+_ENCODER_ARGS = {"default", "ensure_ascii", "sort_keys", "indent", "separators"}
+
+
+class ResponseJSONProvider(DefaultJSONProvider):
+    """
+    Serialize the blueprints' responses with the same encoder as the Lambda
+    handlers (src/common/encoding.py), once per response. Flask's default hook
+    still serializes dates, Decimals, UUIDs and dataclasses.
+
+    The defaults match the Lambda responses: keys in insertion order and
+    non-ASCII characters unescaped. sort_keys and compact are honoured when
+    set; ensure_ascii and other json.dumps arguments use Flask's encoder.
+    """
+
+    ensure_ascii = False
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs) -> str:
+        kwargs.setdefault("default", self.default)
+        kwargs.setdefault("ensure_ascii", self.ensure_ascii)
+        kwargs.setdefault("sort_keys", self.sort_keys)
+        if kwargs["ensure_ascii"] or not _ENCODER_ARGS.issuperset(kwargs):
+            return super().dumps(obj, **kwargs)
+        return dumps(
+            obj,
+            default=kwargs["default"],
+            sort_keys=kwargs["sort_keys"],
+            indent=kwargs.get("indent"),
+        )
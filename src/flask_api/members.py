@@ -1,4 +1,4 @@
-from flask import Blueprint
+from flask import Blueprint, request
 
 from src.api_logic import members
 
@@ -7,9 +7,20 @@ members_router = Blueprint("members", __name__)
 
 @members_router.route("", methods=["GET"])
 def get_members():
-    return members.get_members()
+    return members.get_members(if_none_match=request.headers.get("If-None-Match"))
+
+
+@members_router.route("/bills", methods=["GET"])
+def get_member_bills():
+    return members.get_member_bills(
+        groupId=request.args.get("groupId", type=int),
+        ids=request.args.get("ids"),
+        if_none_match=request.headers.get("If-None-Match"),
+    )
 
 
 @members_router.route("/<int:member_id>", methods=["GET"])
 def get_member(member_id):
-    return members.get_member(member_id)
+    return members.get_member(
+        member_id=member_id, if_none_match=request.headers.get("If-None-Match")
+    )
@@ -8,12 +8,16 @@ schedules_router = Blueprint("reservations", __name__)
 
 @schedules_router.route("", methods=["GET"])
 def get_all_reservations():
-    return schedules.get_schedules(**request.args)
+    return schedules.get_schedules(
+        if_none_match=request.headers.get("If-None-Match"), **request.args
+    )
 
 
 @schedules_router.route("/<int:schedule_id>", methods=["GET"])
 def get_reservation(schedule_id):
-    return schedules.get_schedule(schedule_id=schedule_id)
+    return schedules.get_schedule(
+        schedule_id=schedule_id, if_none_match=request.headers.get("If-None-Match")
+    )
 
 
 @schedules_router.route("", methods=["POST"])
@@ -21,6 +25,11 @@ def create_reservation():
     return schedules.create_schedule(schedule_data=request.json)
 
 
+@schedules_router.route("/recurring", methods=["POST"])
+def create_recurring_reservations():
+    return schedules.create_recurring_schedules(schedule_data=request.json)
+
+
 @schedules_router.route("/attendance/<int:attendance_id>", methods=["PATCH"])
 def patch_attendance(attendance_id):
     data = request.json
@@ -1,23 +1,22 @@
 import datetime
 import json
 import os
-import boto3
 
-from src.common.db_connection import connect_db, initialize_db
-from src.settings import SQLITE_PATH, DDL_PATH, DML_PATH, logger
+from src.common.db_connection import connect_db, connection_manager, initialize_db
+from src.common.migrations import apply_migrations
+from src.common.unit_of_work import UnitOfWork
+from src.data_repo.ledger_repo import LedgerRepo
+from src.settings import SQLITE_PATH, DML_PATH, logger
 
 
 def run_ddl():
-    """Run DDL script to create tables in the SQLite database."""
-    logger.info("Running DDL script ...")
-    conn = connect_db(SQLITE_PATH)
-    cursor = conn.cursor()
-
-    with open(DDL_PATH, "r", encoding="utf-8") as file:
-        ddl_script = file.read()
-    cursor.executescript(ddl_script)
-    conn.commit()
-    conn.close()
+    """
+    Create the tables of the latest schema. The schema lives in
+    resources/migrations (resources/ddl.sql is a generated copy), so this
+    applies the pending migrations.
+    """
+    logger.info("Running DDL ...")
+    return migrate()
 
 
 def run_dml():
@@ -37,9 +36,35 @@ def run_dml():
     conn.close()
 
 
+def migrate():
+    """
+    Apply pending numbered migrations from resources/migrations.
+    Unlike init_db this keeps the existing data.
+    """
+    logger.info("Running migrations ...")
+    conn = connect_db(SQLITE_PATH)
+    try:
+        applied = apply_migrations(conn)
+    finally:
+        conn.close()
+    return {"statusCode": 200, "body": json.dumps({"applied": applied})}
+
+
+def rebuild_ledger():
+    """Recompute the refunds/bills fee ledger from schedules and attendance."""
+    logger.info("Rebuilding fee ledger ...")
+    conn = connect_db(SQLITE_PATH)
+    try:
+        with UnitOfWork(conn):
+            LedgerRepo(conn).rebuild()
+    finally:
+        conn.close()
+
+
 def remove_db_file():
     """Remove the SQLite database file."""
     logger.info("Removing DB file ...")
+    connection_manager.close()
     if os.path.exists(SQLITE_PATH):
         os.remove(SQLITE_PATH)
         logger.info(f"Removed database file at: {SQLITE_PATH}")
@@ -49,6 +74,8 @@ def remove_db_file():
 
 def push_to_s3():
     logger.info("Pushing to S3 ...")
+    import boto3  # only this task needs it, keep it out of the cold start
+
     s3 = boto3.client("s3")
     bucket_name = "badminton-recharging-website"
     s3_key = "bmt_recharging.db"
@@ -89,7 +116,7 @@ def init_db():
     logger.info("Initializing DB ...")
     remove_db_file()
     initialize_db()
-    run_ddl()
+    migrate()
     run_dml()
     return {"statusCode": 200, "body": json.dumps("Initialized DB")}
 
@@ -99,6 +126,8 @@ db_strategies = {
     "init_db": init_db,
     "run_ddl": run_ddl,
     "run_dml": run_dml,
+    "migrate": migrate,
+    "rebuild_ledger": rebuild_ledger,
     "push_to_s3": push_to_s3,
 }
 
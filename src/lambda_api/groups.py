@@ -1,50 +1,26 @@
 import json
 
-from src.api_logic import groups
 from src.common.api_utils import exception_handler
+from src.common.sql_profiler import profile_request
+from src.common.tracing import trace_request
+from src.lambda_api.routes import router
 from src.settings import logger
 
 
+@profile_request
+@trace_request
 @exception_handler
 def lambda_handler(event, context):
-
-    get_paths = {
-        "/api/groups": groups.get_groups,
-        "/groups/{group_id}/fees/{year}/{month}": groups.get_member_fees,
-    }
-    post_paths = {}
-
-    path = event.get("path", "")
-    logger.info(f"Path: {path}")
-    method = event.get("httpMethod", "GET")
-    body = json.loads(event.get("body", "{}") or "{}")
-    if method == "GET":
-        paths = get_paths
-    elif method == "POST":
-        paths = post_paths
-    else:
-        raise Exception("Method Not Allowed")
-    if path in paths:
-        function_name = paths[path]
-        result = function_name(**body)
-    else:
-        raise Exception("Not found")
-    return result
+    logger.info(f"Path: {event.get('httpMethod')} {event.get('path')}")
+    return router.dispatch(event)
 
 
 if __name__ == "__main__":
     event = {
-        "body": json.dumps(
-            {
-                "players": ["Đạt", "Thảo", "Văn", "Huy", "Vu", "Thinh"],
-                "numberOfPlayers": 6,
-                "rentalCost": 200,
-                "shuttleAmount": 3,
-                "shuttlePrice": 26,
-            }
-        ),
-        "path": "/api/players",
+        "resource": "/api/groups/{group_id}/fees/{year}/{month}",
+        "path": "/api/groups/1/fees/2026/1",
         "httpMethod": "GET",
+        "pathParameters": {"group_id": "1", "year": "2026", "month": "1"},
     }
     response = lambda_handler(event, None)
     body = response["body"]
@@ -0,0 +1,85 @@
+from src.common.router import Router
+
+# Shared by the groups, members and schedules Lambda handlers. Every function
+# only receives the events of its own API Gateway routes (template.yml).
+# Handlers are "module:function" strings, imported on first use.
+router = Router()
+
+router.add("GET", "/api/groups", "src.api_logic.groups:get_groups")
+router.add(
+    "GET",
+    "/api/groups/fees",
+    "src.api_logic.groups:get_fee_report",
+    query_types={
+        "fromYear": int,
+        "fromMonth": int,
+        "toYear": int,
+        "toMonth": int,
+        "groupId": int,
+    },
+)
+router.add(
+    "GET",
+    "/api/groups/{group_id}/export",
+    "src.api_logic.groups:export_group",
+    path_types={"group_id": int},
+    query_types={"fromYear": int, "fromMonth": int, "toYear": int, "toMonth": int},
+)
+router.add(
+    "GET",
+    "/api/groups/{group_id}/fees/{year}/{month}",
+    "src.api_logic.groups:get_member_fees",
+    path_types={"group_id": int, "year": int, "month": int},
+)
+
+router.add("GET", "/api/members", "src.api_logic.members:get_members")
+router.add(
+    "GET",
+    "/api/members/bills",
+    "src.api_logic.members:get_member_bills",
+    query_types={"groupId": int},
+)
+router.add(
+    "GET",
+    "/api/members/{member_id}",
+    "src.api_logic.members:get_member",
+    path_types={"member_id": int},
+)
+
+router.add(
+    "GET",
+    "/api/schedules",
+    "src.api_logic.schedules:get_schedules",
+    query_types={"groupId": int, "year": int, "month": int},
+)
+router.add(
+    "POST",
+    "/api/schedules",
+    "src.api_logic.schedules:create_schedule",
+    body_arg="schedule_data",
+)
+router.add(
+    "POST",
+    "/api/schedules/recurring",
+    "src.api_logic.schedules:create_recurring_schedules",
+    body_arg="schedule_data",
+)
+router.add(
+    "GET",
+    "/api/schedules/{schedule_id}",
+    "src.api_logic.schedules:get_schedule",
+    path_types={"schedule_id": int},
+)
+router.add(
+    "DELETE",
+    "/api/schedules/{schedule_id}",
+    "src.api_logic.schedules:delete_schedule",
+    path_types={"schedule_id": int},
+)
+router.add("PATCH", "/api/attendances", "src.api_logic.schedules:patch_attendances")
+router.add(
+    "PATCH",
+    "/api/attendances/{attendance_id}",
+    "src.api_logic.schedules:patch_attendance",
+    path_types={"attendance_id": int},
+)
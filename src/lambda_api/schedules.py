@@ -1,66 +1,26 @@
 import json
 
-from src.api_logic import schedules
 from src.common.api_utils import exception_handler
+from src.common.sql_profiler import profile_request
+from src.common.tracing import trace_request
+from src.lambda_api.routes import router
 from src.settings import logger
 
 
+@profile_request
+@trace_request
 @exception_handler
 def lambda_handler(event, context):
-
-    get_paths = {
-        "/api/schedules": schedules.get_schedules,
-        "/api/schedules/{schedule_id}": schedules.get_schedule,
-    }
-    post_paths = {
-        "/api/schedules": schedules.create_schedule,
-    }
-    patch_paths = {
-        "/api/attendances/{attendance_id}": schedules.patch_attendance,
-    }
-    delete_paths = {
-        "/api/schedules/{schedule_id}": schedules.delete_schedule,
-    }
-
-    path = event.get("path", "")
-    logger.info(f"Path: {path}")
-    method = event.get("httpMethod", "GET")
-    data = {}
-    data.update(event.get("pathParameters", {}) or {})
-    data.update(event.get("queryStringParameters", {}) or {})
-    data.update(json.loads(event.get("body", "{}") or "{}"))
-
-    if method == "GET":
-        paths = get_paths
-    elif method == "POST":
-        paths = post_paths
-    elif method == "PATCH":
-        paths = patch_paths
-    elif method == "DELETE":
-        paths = delete_paths
-    else:
-        raise Exception("Method Not Allowed")
-    if path in paths:
-        function_name = paths[path]
-        result = function_name(**data)
-    else:
-        raise Exception("Not found")
-    return result
+    logger.info(f"Path: {event.get('httpMethod')} {event.get('path')}")
+    return router.dispatch(event)
 
 
 if __name__ == "__main__":
     event = {
-        "body": json.dumps(
-            {
-                "players": ["Đạt", "Thảo", "Văn", "Huy", "Vu", "Thinh"],
-                "numberOfPlayers": 6,
-                "rentalCost": 200,
-                "shuttleAmount": 3,
-                "shuttlePrice": 26,
-            }
-        ),
-        "path": "/api/players",
+        "resource": "/api/schedules",
+        "path": "/api/schedules",
         "httpMethod": "GET",
+        "queryStringParameters": {"groupId": "1", "year": "2026", "month": "1"},
     }
     response = lambda_handler(event, None)
     body = response["body"]
@@ -1,5 +1,5 @@
-from datetime import datetime
-from typing import Optional
+from datetime import date, datetime, time
+from typing import List, Literal, Optional
 
 from pydantic import BaseModel, Field, model_validator
 
@@ -18,3 +18,65 @@ class SearchScheduleModel(BaseModel):
 
     class Config:
         validate_by_name = True
+
+
+class RecurringScheduleModel(BaseModel):
+    """
+    Recurrence rule expanded into schedules between start_date and end_date
+    (both inclusive). Weekdays use Python numbering: 0=Monday .. 6=Sunday.
+    - weekly: every listed weekday
+    - monthly: the nth (1..5, or -1 for last) listed weekday of every month
+    - interval: every interval_days days starting at start_date
+    """
+
+    group_id: int = Field(alias="groupId", description="ID of the group")
+    start_date: date = Field(alias="startDate", description="First day of the range")
+    end_date: date = Field(alias="endDate", description="Last day of the range")
+    frequency: Literal["weekly", "monthly", "interval"] = Field(
+        default="weekly", description="Kind of recurrence"
+    )
+    weekdays: List[int] = Field(
+        default=[], description="Weekdays of the schedules, 0=Monday .. 6=Sunday"
+    )
+    nth: Optional[int] = Field(
+        default=None, description="Occurrence of the weekday in the month (monthly)"
+    )
+    interval_days: Optional[int] = Field(
+        default=None, alias="intervalDays", description="Days between schedules"
+    )
+    start_time: time = Field(
+        default=time(0, 0), alias="time", description="Time of every schedule"
+    )
+
+    class Config:
+        validate_by_name = True
+
+    @model_validator(mode="after")
+    def check_rule(self):
+        if self.end_date < self.start_date:
+            raise ValueError("endDate must be >= startDate")
+        if (self.end_date - self.start_date).days > 366 * 2:
+            raise ValueError("date range must not exceed two years")
+        if any(not 0 <= weekday <= 6 for weekday in self.weekdays):
+            raise ValueError("weekdays must be in the range 0..6")
+        if self.frequency in ("weekly", "monthly") and not self.weekdays:
+            raise ValueError(f"weekdays is required for {self.frequency} schedules")
+        if self.frequency == "monthly" and self.nth not in (1, 2, 3, 4, 5, -1):
+            raise ValueError("nth must be 1..5 or -1 for monthly schedules")
+        if self.frequency == "interval" and not (self.interval_days or 0) > 0:
+            raise ValueError("intervalDays must be > 0 for interval schedules")
+        return self
+
+
+class AttendanceChangeModel(BaseModel):
+    attendance_id: int = Field(alias="attendanceId", description="ID of the attendance")
+    joined: bool = Field(description="Whether the member joins the schedule")
+
+    class Config:
+        validate_by_name = True
+
+
+class BulkAttendanceModel(BaseModel):
+    changes: List[AttendanceChangeModel] = Field(
+        min_length=1, max_length=500, description="Attendance changes to apply"
+    )
@@ -1,6 +1,53 @@
+from typing import List, Optional
+
 from src.data_repo.group_repo import GroupRepo
+from src.data_repo.schedule_repo import ScheduleRepo
+from src.common.exceptions import InvalidData
+from src.common.tracing import trace_class
+from src.common.utils import month_bounds, month_key, shift_month
+from src.settings import EXPORT_BATCH_ROWS
+
+# Longest range of the fee report, ten years of months
+MAX_REPORT_MONTHS = 120
+
+# Columns of the group exports, by kind of rows
+EXPORT_HEADERS = {
+    "attendance": ("Schedule date", "Member ID", "Member", "Joined", "Refund"),
+    "fees": (
+        "Month",
+        "Member ID",
+        "Member",
+        "Member fee",
+        "Schedule count",
+        "Total refund",
+        "Estimated fee",
+    ),
+}
 
 
+def month_range(
+    from_year: Optional[int],
+    from_month: Optional[int],
+    to_year: Optional[int],
+    to_month: Optional[int],
+) -> List[str]:
+    """
+    'YYYY-MM' keys of the months from (from_year, from_month) to
+    (to_year, to_month) included.
+    """
+    if None in (from_year, from_month, to_year, to_month):
+        raise InvalidData("fromYear, fromMonth, toYear and toMonth are required")
+    if not (1 <= from_month <= 12 and 1 <= to_month <= 12):
+        raise InvalidData("fromMonth and toMonth must be in the range 1..12")
+    count = (to_year * 12 + to_month) - (from_year * 12 + from_month) + 1
+    if count < 1:
+        raise InvalidData("The range must not end before it starts")
+    if count > MAX_REPORT_MONTHS:
+        raise InvalidData(f"The range must not exceed {MAX_REPORT_MONTHS} months")
+    return [month_key(*shift_month(from_year, from_month, n)) for n in range(count)]
+
+
+@trace_class("service")
 class GroupService:
     def __init__(self, conn):
         self._conn = conn
@@ -19,3 +66,60 @@ class GroupService:
         :return:
         """
         return GroupRepo(self._conn).get_month_member_fees(group_id, year, month)
+
+    def get_fee_report(
+        self,
+        from_year: Optional[int],
+        from_month: Optional[int],
+        to_year: Optional[int],
+        to_month: Optional[int],
+        group_id: Optional[int] = None,
+    ):
+        """
+        Get the member fees of every month from (from_year, from_month) to
+        (to_year, to_month) included, for one group or all groups.
+        :return:
+        """
+        months = month_range(from_year, from_month, to_year, to_month)
+        return GroupRepo(self._conn).get_member_fee_report(months, group_id)
+
+    def get_export_rows(
+        self,
+        group_id: int,
+        from_year: Optional[int],
+        from_month: Optional[int],
+        to_year: Optional[int],
+        to_month: Optional[int],
+        rows: str = "attendance",
+    ):
+        """
+        Rows of a group export over a range of months, read lazily from the
+        database: "attendance" rows of every schedule or monthly "fees" rows.
+        :return: (header, iterator of rows)
+        """
+        if rows not in EXPORT_HEADERS:
+            raise InvalidData(f"rows must be one of: {', '.join(EXPORT_HEADERS)}")
+        months = month_range(from_year, from_month, to_year, to_month)
+        if rows == "attendance":
+            start, _ = month_bounds(from_year, from_month)
+            _, end = month_bounds(to_year, to_month)
+            records = ScheduleRepo(self._conn).iter_attendances_in_range(
+                group_id, start, end, EXPORT_BATCH_ROWS
+            )
+        else:
+            fees = GroupRepo(self._conn).iter_member_fees(
+                months, group_id, EXPORT_BATCH_ROWS
+            )
+            records = (
+                (
+                    month,
+                    fee["memberId"],
+                    fee["memberNickname"],
+                    fee["memberFee"],
+                    fee["scheduleCount"],
+                    fee["totalRefund"],
+                    fee["estimatedFee"],
+                )
+                for _, _, month, fee in fees
+            )
+        return EXPORT_HEADERS[rows], records
@@ -1,6 +1,11 @@
+from typing import List, Optional
+
+from src.common.exceptions import InvalidData, NotFound
 from src.data_repo.member_repo import MemberRepo
+from src.common.tracing import trace_class
 
 
+@trace_class("service")
 class MemberService:
     def __init__(self, conn):
         self._conn = conn
@@ -18,4 +23,25 @@ class MemberService:
         Get a member by ID.
         :return:
         """
-        return MemberRepo(self._conn).get_member_by_id(member_id)
+        member = MemberRepo(self._conn).get_member_by_id(member_id)
+        if member is None:
+            raise NotFound(f"Member with ID {member_id} does not exist.")
+        return member
+
+    def get_member_bills(
+        self, group_id: Optional[int] = None, member_ids: Optional[str] = None
+    ) -> List[dict]:
+        """
+        Get the member detail of all members of a group or of a list of IDs.
+        :param member_ids: comma separated member IDs, e.g. "1,2,5"
+        :return:
+        """
+        if (group_id is None) == (member_ids is None):
+            raise InvalidData("Exactly one of groupId and ids is required")
+        ids = None
+        if member_ids is not None:
+            try:
+                ids = [int(member_id) for member_id in member_ids.split(",")]
+            except ValueError:
+                raise InvalidData("ids must be a comma separated list of integers")
+        return MemberRepo(self._conn).get_member_bills(group_id, ids)
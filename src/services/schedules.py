@@ -1,12 +1,38 @@
 import datetime
 import calendar
-from typing import List, Dict, Optional, Tuple
+from typing import TYPE_CHECKING, List, Dict, Optional, Tuple
 
+from src.common.exceptions import NotFound
+from src.common.tracing import trace_class
+from src.common.unit_of_work import UnitOfWork
+from src.common.utils import log_payload
 from src.data_repo.schedule_repo import ScheduleRepo
-from src.schemas.pydantic_models.schedules import NewScheduleModel, SearchScheduleModel
 from src.settings import logger
 
+# The pydantic models are imported by the methods that validate input:
+# pydantic is the slowest import of a Lambda cold start.
+if TYPE_CHECKING:
+    from src.schemas.pydantic_models.schedules import (
+        RecurringScheduleModel,
+        SearchScheduleModel,
+    )
 
+
+# hard code
+# Amount split between the dropouts of one schedule, per group
+MIN_FEE_GROUPS = {
+    1: 40,
+    2: 90,
+}
+# Upper bound of a single refund, per group
+MAX_REFUND_GROUPS = {
+    1: 40,
+    2: 50,
+}
+# end hard code
+
+
+@trace_class("service")
 class ScheduleService:
     def __init__(self, conn):
         self._conn = conn
@@ -43,7 +69,7 @@ class ScheduleService:
         """
         return ScheduleService._month_range()
 
-    def get_schedules(self, params: SearchScheduleModel) -> List[Dict]:
+    def get_schedules(self, params: "SearchScheduleModel") -> List[Dict]:
         """
         Get reservations within a date range (defaults to the current month),
         and attach their associated attendances.
@@ -61,39 +87,23 @@ class ScheduleService:
         if end_dt < start_dt:
             raise ValueError("end_date must be >= start_date")
 
-        # Filter reservations within [start_dt, end_dt]
-        filtered: List[Dict] = []
-        self.schedules = ScheduleRepo(self._conn).get_all_schedules(
-            group_id=params.group_id
+        # Schedules within [start_dt, end_dt], attendances loaded in one batch
+        repo = ScheduleRepo(self._conn)
+        self.schedules = repo.get_schedules_in_range(
+            group_id=params.group_id,
+            start_date=start_dt.isoformat(),
+            end_date=(end_dt + datetime.timedelta(days=1)).isoformat(),
+        )
+        attendances_by_schedule = repo.get_attendances_by_schedule_ids(
+            [schedule["id"] for schedule in self.schedules]
         )
 
-        for r in self.schedules or []:
-            r_date_str = r.get("scheduleDate")
-            if not r_date_str:
-                # Skip if reservation has no date
-                continue
-            try:
-                r_date = datetime.date.fromisoformat(
-                    r_date_str[:10]
-                )  # handle potential 'YYYY-MM-DD...' strings
-            except ValueError:
-                # Skip malformed date strings
-                continue
-            if start_dt <= r_date <= end_dt:
-                filtered.append(r)
         response_data: List[Dict] = []
-        repo = ScheduleRepo(self._conn)
-
-        for schedule in filtered:
-            # If your get_attendances_by_reservation_id supports date range, pass it.
-            # Otherwise, remove start/end params.
-            attendances = repo.get_attendances_by_schedule_id(
-                schedule_id=schedule["id"],
-                start_date=start_dt.isoformat(),
-                end_date=end_dt.isoformat(),
-            )
+        for schedule in self.schedules:
             reservation_with_attendances = dict(schedule)
-            reservation_with_attendances["attendances"] = attendances
+            reservation_with_attendances["attendances"] = attendances_by_schedule[
+                schedule["id"]
+            ]
             response_data.append(reservation_with_attendances)
 
         return response_data
@@ -126,77 +136,185 @@ class ScheduleService:
         :param schedule_data:
         :return:
         """
+        from src.schemas.pydantic_models.schedules import NewScheduleModel
+
         new_reservation = NewScheduleModel(**schedule_data)
-        schedule_id = ScheduleRepo(self._conn).create_schedule(new_reservation)
-        ScheduleRepo(self._conn).create_attendances_for_group_members(schedule_id)
+        with UnitOfWork(self._conn):
+            repo = ScheduleRepo(self._conn)
+            schedule_id = repo.create_schedule(new_reservation)
+            repo.create_attendances_for_group_members(schedule_id)
         return schedule_id
 
+    @staticmethod
+    def _expand_recurrence(rule: "RecurringScheduleModel") -> List[datetime.date]:
+        """
+        Dates matched by a recurrence rule, in order.
+        """
+        if rule.frequency == "interval":
+            step = datetime.timedelta(days=rule.interval_days)
+            dates = []
+            day = rule.start_date
+            while day <= rule.end_date:
+                dates.append(day)
+                day += step
+            return dates
+
+        weekdays = set(rule.weekdays)
+        days = [
+            rule.start_date + datetime.timedelta(days=offset)
+            for offset in range((rule.end_date - rule.start_date).days + 1)
+        ]
+        if rule.frequency == "weekly":
+            return [day for day in days if day.weekday() in weekdays]
+
+        # monthly: nth occurrence of the weekday, counted over the whole month
+        dates = []
+        for day in days:
+            if day.weekday() not in weekdays:
+                continue
+            days_in_month = calendar.monthrange(day.year, day.month)[1]
+            if rule.nth == -1:
+                matches = day.day + 7 > days_in_month
+            else:
+                matches = (day.day - 1) // 7 + 1 == rule.nth
+            if matches:
+                dates.append(day)
+        return dates
+
+    def create_recurring_schedules(self, rule_data) -> dict:
+        """
+        Expand a recurrence rule and create all its schedules, with their
+        attendances, in one transaction. Days that already have a schedule
+        for the group are skipped.
+        :return: {"created": [schedule, ...], "skippedDates": [iso date, ...]}
+        """
+        from src.schemas.pydantic_models.schedules import RecurringScheduleModel
+
+        rule = RecurringScheduleModel(**rule_data)
+        dates = self._expand_recurrence(rule)
+
+        with UnitOfWork(self._conn):
+            repo = ScheduleRepo(self._conn)
+            existing_days = repo.get_schedule_days(
+                rule.group_id,
+                rule.start_date.isoformat(),
+                (rule.end_date + datetime.timedelta(days=1)).isoformat(),
+            )
+            new_dates = [day for day in dates if day.isoformat() not in existing_days]
+            created = repo.create_schedules(
+                rule.group_id,
+                [
+                    datetime.datetime.combine(day, rule.start_time).strftime(
+                        "%Y-%m-%dT%H:%M:%S"
+                    )
+                    for day in new_dates
+                ],
+            )
+
+        logger.info(
+            f"Created {len(created)} recurring schedules for group {rule.group_id}"
+        )
+        return {
+            "created": created,
+            "skippedDates": [
+                day.isoformat() for day in dates if day.isoformat() in existing_days
+            ],
+        }
+
     def patch_attendance(self, attendance_id, joined) -> dict:
         """
         Patch attendance status.
+        The status change and the refund recalculation share one transaction.
         :return:
         """
+        with UnitOfWork(self._conn):
+            repo = ScheduleRepo(self._conn)
+            schedule = repo.set_attendance_joined(attendance_id, joined)
+            if not schedule:
+                raise NotFound(f"Attendance with ID {attendance_id} does not exist.")
 
-        refund_amount = 0
-        ScheduleRepo(self._conn).update_attendance(attendance_id, joined, refund_amount)
+            logger.info(
+                f"Calculating refund for attendance ID {attendance_id} with joined={joined}"
+            )
+            attendances = self._update_refunds_for_dropouts(
+                schedule["id"], schedule["groupId"]
+            )
 
-        logger.info(
-            f"Calculating refund for attendance ID {attendance_id} with joined={joined}"
+        data = next(
+            att for att in attendances if att["attendanceId"] == attendance_id
         )
-        schedule = self._get_schedule_by_attendance_id(attendance_id)
-        self._update_refunds_for_dropouts(schedule["id"])
-
-        data = ScheduleRepo(self._conn).get_attendance_by_id(attendance_id)
-        if not data:
-            raise ValueError(f"Attendance with ID {attendance_id} does not exist.")
-        logger.info(f"Updated attendance: {data}")
+        log_payload("Updated attendance", data)
         return data
 
-    def _update_refunds_for_dropouts(self, schedule_id: int):
+    def patch_attendances(self, changes_data) -> List[Dict]:
         """
-        Recalculate and update refund amounts for all dropouts in a schedule.
-        :param schedule_id:
-        :return:
+        Apply many attendance changes, possibly across schedules, in one
+        transaction and recalculate the refunds once per affected schedule.
+        :param changes_data: {"changes": [{"attendanceId": .., "joined": ..}, ..]}
+        :return: the affected schedules with their updated attendances
         """
-        # hard code
-        min_fee_groups = {
-            1: 40,
-            2: 90,
-        }
-        max_refund_groups = {
-            1: 40,
-            2: 50,
-        }
+        from src.schemas.pydantic_models.schedules import BulkAttendanceModel
+
+        params = BulkAttendanceModel(**changes_data)
+        changes = [(change.attendance_id, change.joined) for change in params.changes]
+
+        with UnitOfWork(self._conn):
+            repo = ScheduleRepo(self._conn)
+            schedules_by_attendance = repo.get_attendance_schedules(
+                [attendance_id for attendance_id, _ in changes]
+            )
+            missing = sorted(
+                {
+                    attendance_id
+                    for attendance_id, _ in changes
+                    if attendance_id not in schedules_by_attendance
+                }
+            )
+            if missing:
+                raise NotFound(f"Attendances with IDs {missing} do not exist.")
+
+            repo.set_attendances_joined(changes)
+
+            group_by_schedule = {
+                schedule["id"]: schedule["groupId"]
+                for schedule in schedules_by_attendance.values()
+            }
+            attendances_by_schedule = {
+                schedule_id: self._update_refunds_for_dropouts(schedule_id, group_id)
+                for schedule_id, group_id in group_by_schedule.items()
+            }
+            schedules = repo.get_schedules_by_ids(list(group_by_schedule))
+
+        for schedule in schedules:
+            schedule["attendances"] = attendances_by_schedule[schedule["id"]]
+        logger.info(
+            f"Patched {len(changes)} attendances in {len(schedules)} schedules"
+        )
+        return schedules
+
+    def _update_refunds_for_dropouts(
+        self, schedule_id: int, group_id: Optional[int] = None
+    ) -> List[Dict]:
         """
-        New logic:
+        Recalculate and update refund amounts for all dropouts in a schedule.
         Refund amount logic:
-        refund_amount = int(min_fee_groups.get(group_id, 50) / drop_out_count)
+        refund_amount = min(int(min_fee / drop_out_count), max_refund)
+        :param schedule_id:
+        :param group_id: group of the schedule, looked up when not given
+        :return: all attendances of the schedule with their new refund amounts
         """
-        # end hard code
-        # update refund amounts for other dropouts
-
-        schedule = ScheduleRepo(self._conn).get_schedule_by_id(schedule_id)
-        all_attendances = ScheduleRepo(self._conn).get_attendances_by_schedule_id(
-            schedule_id
-        )
-        drop_out_count = sum(1 for att in all_attendances if not att["joined"])
-        refund_amount = (
-            int(min_fee_groups.get(schedule["groupId"], 50) / drop_out_count)
-            if drop_out_count > 0
-            else 0
-        )
-        # check max refund
-        max_refund = max_refund_groups.get(schedule["groupId"], 50)
-        if refund_amount > max_refund:
-            refund_amount = max_refund
-        for att in all_attendances:
-            if not att["joined"]:
-                ScheduleRepo(self._conn).update_attendance(
-                    att["attendanceId"], False, refund_amount
-                )
-        logger.info(
-            f"Updated refund amounts for dropouts in schedule ID {schedule_id} to {refund_amount}"
+        if group_id is None:
+            group_id = ScheduleRepo(self._conn).get_schedule_by_id(schedule_id)[
+                "groupId"
+            ]
+        attendances = ScheduleRepo(self._conn).recalculate_refunds(
+            schedule_id,
+            min_fee=MIN_FEE_GROUPS.get(group_id, 50),
+            max_refund=MAX_REFUND_GROUPS.get(group_id, 50),
         )
+        logger.info(f"Updated refund amounts for dropouts in schedule ID {schedule_id}")
+        return attendances
 
     def delete_schedule(self, schedule_id: int):
-        ScheduleRepo(self._conn).delete_schedule(schedule_id)
+        with UnitOfWork(self._conn):
+            ScheduleRepo(self._conn).delete_schedule(schedule_id)
@@ -6,21 +6,107 @@ logging.basicConfig(level=logging.INFO)
 
 ENV = os.environ.get("ENV", "local")
 
+# Responses: JSON encoder ("auto" uses orjson when installed, or "json") and
+# whether full response payloads are logged
+JSON_BACKEND = os.environ.get("JSON_BACKEND", "auto")
+LOG_PAYLOADS = os.environ.get("LOG_PAYLOADS", "").lower() in ("1", "true", "yes")
+
+# Compression of response bodies of at least COMPRESSION_MIN_BYTES bytes,
+# gzip level / brotli quality
+COMPRESSION_MIN_BYTES = int(os.environ.get("COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSION_LEVEL = int(os.environ.get("COMPRESSION_LEVEL", "5"))
+
+# Per-request trace record and embedded metrics on stdout
+TRACING_ENABLED = os.environ.get("TRACING_ENABLED", "1").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+TRACING_MAX_SPANS = int(os.environ.get("TRACING_MAX_SPANS", "200"))
+METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE", "Feeminton")
+
+# SQL profiler (src/common/sql_profiler.py): statements slower than
+# SQL_SLOW_MS are logged, statements run SQL_REPEAT_THRESHOLD times in one
+# request are reported as repeated
+SQL_PROFILER_ENABLED = os.environ.get("SQL_PROFILER", "").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+SQL_SLOW_MS = float(os.environ.get("SQL_SLOW_MS", "50"))
+SQL_REPEAT_THRESHOLD = int(os.environ.get("SQL_REPEAT_THRESHOLD", "3"))
+
+# Exports: rows read from the database cursor per batch, each batch is encoded
+# and sent as one chunk of the response
+EXPORT_BATCH_ROWS = int(os.environ.get("EXPORT_BATCH_ROWS", "500"))
+# Lambda cannot stream its response and refuses payloads above 6 MB: exports
+# whose response body (compressed and base64 encoded as sent) exceeds
+# LAMBDA_RESPONSE_MAX_BYTES, or whose file exceeds EXPORT_MAX_FILE_BYTES before
+# compression, answer 413 as soon as the size is exceeded
+LAMBDA_RESPONSE_MAX_BYTES = int(
+    os.environ.get("LAMBDA_RESPONSE_MAX_BYTES", str(6 * 1024 * 1024 - 64 * 1024))
+)
+EXPORT_MAX_FILE_BYTES = int(
+    os.environ.get("EXPORT_MAX_FILE_BYTES", str(32 * 1024 * 1024))
+)
+# An XLSX workbook is only readable once saved, so it is built whole before
+# its first byte is sent: larger XLSX exports answer 413 (CSV has no limit)
+EXPORT_XLSX_MAX_ROWS = int(os.environ.get("EXPORT_XLSX_MAX_ROWS", "100000"))
+
+# Repository query cache: max entries per process (0 disables it) and how
+# many lookups between two stats log lines (0 never logs them)
+QUERY_CACHE_SIZE = int(os.environ.get("QUERY_CACHE_SIZE", "256"))
+QUERY_CACHE_STATS_EVERY = int(os.environ.get("QUERY_CACHE_STATS_EVERY", "100"))
+
 # DB
-SQLITE_PATH = "/mnt/efs/feeminton.db"
-DDL_PATH = os.path.join("/var/task", "resources", "ddl.sql")
-DML_PATH = os.path.join("/var/task", "resources", "dml.sql")
-if ENV == "local":
-    if not os.path.exists(SQLITE_PATH):
-        logger.info("Running in Flask local environment")
-        SQLITE_PATH = "resources/feeminton.db"
-        DDL_PATH = os.path.join("../resources", "ddl.sql")
-        DML_PATH = os.path.join("../resources", "dml.sql")
-
-    if not os.path.exists(SQLITE_PATH):
-        # # run aws lambda in local
-        # someone set working directory to feeminton/src/lambda_api
-        logger.info("Running in lambda local environment")
-        SQLITE_PATH = os.path.join(os.pardir, os.pardir, "resources", "feeminton.db")
-        DDL_PATH = os.path.join(os.pardir, os.pardir, "resources", "ddl.sql")
-        DML_PATH = os.path.join(os.pardir, os.pardir, "resources", "dml.sql")
+# How often a warm connection re-checks that the database file was not replaced
+SQLITE_REVALIDATE_SECONDS = float(os.environ.get("SQLITE_REVALIDATE_SECONDS", "60"))
+# Serve reads from a local copy of the database: "memory", "tmp" or "" (off)
+SQLITE_READ_REPLICA = os.environ.get("SQLITE_READ_REPLICA", "")
+SQLITE_REPLICA_DIR = os.environ.get("SQLITE_REPLICA_DIR", "/tmp")
+# Concurrent writers: every attempt waits up to SQLITE_BUSY_TIMEOUT_MS for the
+# lock, a write transaction that still finds the database locked is retried
+# after a jittered exponential backoff until SQLITE_WRITE_DEADLINE_SECONDS
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "1000"))
+SQLITE_WRITE_DEADLINE_SECONDS = float(
+    os.environ.get("SQLITE_WRITE_DEADLINE_SECONDS", "8")
+)
+SQLITE_RETRY_BASE_MS = float(os.environ.get("SQLITE_RETRY_BASE_MS", "20"))
+SQLITE_RETRY_MAX_MS = float(os.environ.get("SQLITE_RETRY_MAX_MS", "500"))
+
+
+def _resolve_paths():
+    """
+    Resolve (database file, resources directory) once at import.
+    When SQLITE_PATH and RESOURCES_DIR are both set in the environment the
+    probing is skipped; either one alone overrides its probed value. Only the
+    local environment probes the file system for a database.
+    """
+    env_db_path = os.environ.get("SQLITE_PATH")
+    env_resources_dir = os.environ.get("RESOURCES_DIR")
+    if env_db_path and env_resources_dir:
+        return env_db_path, env_resources_dir
+
+    candidates = [("/mnt/efs/feeminton.db", os.path.join("/var/task", "resources"))]
+    if ENV == "local":
+        candidates += [
+            # Flask, run from the project root
+            (os.path.join("resources", "feeminton.db"), "resources"),
+            # aws lambda run locally, working directory feeminton/src/lambda_api
+            (
+                os.path.join(os.pardir, os.pardir, "resources", "feeminton.db"),
+                os.path.join(os.pardir, os.pardir, "resources"),
+            ),
+        ]
+        for candidate in candidates:
+            if os.path.exists(candidate[0]):
+                break
+        logger.info(f"Running locally with database {env_db_path or candidate[0]}")
+    else:
+        candidate = candidates[0]
+    return env_db_path or candidate[0], env_resources_dir or candidate[1]
+
+
+SQLITE_PATH, RESOURCES_DIR = _resolve_paths()
+DML_PATH = os.path.join(RESOURCES_DIR, "dml.sql")
+MIGRATIONS_DIR = os.path.join(RESOURCES_DIR, "migrations")
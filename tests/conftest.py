@@ -0,0 +1,24 @@
+"""
+The tests run against a copy of resources/feeminton.db. settings resolves the
+database path at import, so the environment is set before src is imported.
+"""
+
+import os
+import shutil
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESOURCES_DIR = os.path.join(ROOT, "resources")
+
+_tmp_dir = tempfile.mkdtemp(prefix="feeminton-tests-")
+DB_PATH = os.path.join(_tmp_dir, "feeminton.db")
+shutil.copyfile(os.path.join(RESOURCES_DIR, "feeminton.db"), DB_PATH)
+
+os.environ["SQLITE_PATH"] = DB_PATH
+os.environ["RESOURCES_DIR"] = RESOURCES_DIR
+os.environ["SQLITE_READ_REPLICA"] = ""
+os.environ["TRACING_ENABLED"] = "0"
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_tmp_dir, ignore_errors=True)
@@ -0,0 +1,29 @@
+"""Invalid bulk attendance patches answer 400 with a message, on Lambda and Flask."""
+
+import pytest
+
+from flask_main import app
+from src.lambda_api.schedules import lambda_handler
+from tests.utils import call
+
+CASES = [
+    ({}, "changes Input should be a valid list"),
+    (
+        {"changes": [{"attendanceId": "first", "joined": True}]},
+        "changes.0.attendanceId Input should be a valid integer, unable to parse"
+        " string as an integer",
+    ),
+]
+
+
+@pytest.mark.parametrize("body, message", CASES)
+def test_lambda_answers_400(body, message):
+    result = call(lambda_handler, "PATCH", "/api/attendances", body=body)
+    assert result == (400, {"message": message})
+
+
+@pytest.mark.parametrize("body, message", CASES)
+def test_flask_answers_400(body, message):
+    response = app.test_client().patch("/api/attendances", json=body)
+    assert response.status_code == 400
+    assert response.get_json() == {"message": message}
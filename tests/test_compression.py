@@ -0,0 +1,87 @@
+import base64
+import gzip
+import json
+
+import pytest
+
+from flask_main import app
+from src.common import compression
+from src.lambda_api.schedules import lambda_handler
+from tests.utils import make_event
+
+LARGE = ("/api/schedules", {"groupId": "1", "year": "2026", "month": "1"})
+SMALL = ("/api/groups", None)
+
+
+class FakeBrotli:
+    """Stand-in for the brotli package, which is optional."""
+
+    @staticmethod
+    def compress(data, quality):
+        return b"br" + data
+
+
+@pytest.fixture
+def brotli(monkeypatch):
+    monkeypatch.setattr(compression, "_brotli", FakeBrotli)
+
+
+def get(request, accept_encoding=None):
+    path, query = request
+    headers = {"Accept-Encoding": accept_encoding} if accept_encoding else None
+    return lambda_handler(make_event("GET", path, query, headers=headers), None)
+
+
+def test_gzip():
+    plain = get(LARGE)
+    response = get(LARGE, "gzip, deflate")
+    assert response["headers"]["Content-Encoding"] == "gzip"
+    assert response["isBase64Encoded"] is True
+    body = gzip.decompress(base64.b64decode(response["body"]))
+    assert json.loads(body) == json.loads(plain["body"])
+    assert "Content-Encoding" not in plain["headers"]
+    assert not plain.get("isBase64Encoded")
+
+
+def test_br_wins_ties_when_installed(brotli):
+    response = get(LARGE, "gzip, br")
+    assert response["headers"]["Content-Encoding"] == "br"
+    assert base64.b64decode(response["body"]).startswith(b"br{")
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, encoding",
+    [
+        ("gzip;q=0.5, br", "br"),
+        ("br;q=0.5, gzip", "gzip"),
+        ("*", "br"),
+        ("*;q=0, gzip", "gzip"),
+        ("br;q=0, gzip;q=0", None),
+        ("identity", None),
+    ],
+)
+def test_quality_values(brotli, accept_encoding, encoding):
+    assert compression.choose_encoding(accept_encoding) == encoding
+
+
+def test_without_brotli_br_only_clients_get_identity(monkeypatch):
+    monkeypatch.setattr(compression, "_brotli", False)
+    response = get(LARGE, "br")
+    assert "Content-Encoding" not in response["headers"]
+    assert not response.get("isBase64Encoded")
+
+
+def test_small_bodies_are_not_compressed():
+    response = get(SMALL, "gzip")
+    assert "Content-Encoding" not in response["headers"]
+    assert json.loads(response["body"])["data"]
+
+
+def test_flask_gzip():
+    path, query = LARGE
+    client = app.test_client()
+    plain = client.get(path, query_string=query)
+    response = client.get(path, query_string=query, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert json.loads(gzip.decompress(response.data)) == plain.get_json()
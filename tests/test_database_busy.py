@@ -0,0 +1,74 @@
+"""Writes retry while another connection holds the lock, then answer 503."""
+
+import json
+import sqlite3
+import threading
+
+import pytest
+
+from flask_main import app
+from src.common import db_connection
+from src.common.db_connection import connection_manager
+from src.lambda_api.schedules import lambda_handler
+from src.settings import SQLITE_BUSY_TIMEOUT_MS
+from tests.conftest import DB_PATH
+from tests.utils import make_event
+
+SCHEDULE = {"groupId": 2, "scheduleDate": "2027-07-08T19:00:00"}
+
+
+@pytest.fixture
+def retries(monkeypatch):
+    """Short waits for the API's writes; the attempts that were retried."""
+    attempts = []
+    monkeypatch.setattr(db_connection, "SQLITE_WRITE_DEADLINE_SECONDS", 0.5)
+    monkeypatch.setattr(
+        db_connection, "retry_delay", lambda attempt: attempts.append(attempt) or 0.02
+    )
+    conn = connection_manager.get_connection()
+    conn.execute("PRAGMA busy_timeout = 20")
+    yield attempts
+    conn.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+
+
+@pytest.fixture
+def writer(retries):
+    """Another connection holding the write lock."""
+    writer = sqlite3.connect(DB_PATH, isolation_level=None, check_same_thread=False)
+    writer.execute("BEGIN IMMEDIATE")
+    yield writer
+    if writer.in_transaction:
+        writer.rollback()
+    writer.close()
+
+
+def create_schedule():
+    return lambda_handler(make_event("POST", "/api/schedules", body=SCHEDULE), None)
+
+
+def delete_schedule(response):
+    schedule_id = json.loads(response["body"])["scheduleId"]
+    event = make_event("DELETE", f"/api/schedules/{schedule_id}")
+    assert lambda_handler(event, None)["statusCode"] == 200
+
+
+def test_lambda_answers_503_after_the_deadline(writer, retries):
+    response = create_schedule()
+    assert response["statusCode"] == 503
+    assert response["headers"]["Retry-After"] == "1"
+    assert json.loads(response["body"])["message"].startswith("Database is busy")
+    assert len(retries) > 1
+
+
+def test_flask_answers_503_after_the_deadline(writer):
+    response = app.test_client().post("/api/schedules", json=SCHEDULE)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_write_succeeds_once_the_lock_is_released(writer, retries):
+    threading.Timer(0.1, writer.rollback).start()
+    response = create_schedule()
+    assert response["statusCode"] == 200
+    assert retries
+    delete_schedule(response)
@@ -0,0 +1,148 @@
+import base64
+import csv
+import gzip
+import io
+
+import pytest
+
+from flask_main import app
+from src.common import api_utils, export
+from src.common.api_utils import make_export_response
+from src.common.export import CONTENT_TYPES, Export
+from src.lambda_api.groups import lambda_handler
+from tests.utils import make_event
+
+EXPORT_PATH = "/api/groups/1/export"
+RANGE = {"fromYear": "2026", "fromMonth": "1", "toYear": "2026", "toMonth": "2"}
+
+
+def get_export(accept_encoding=None, **query):
+    headers = {"Accept-Encoding": accept_encoding} if accept_encoding else None
+    event = make_event("GET", EXPORT_PATH, {**RANGE, **query}, headers=headers)
+    return lambda_handler(event, None)
+
+
+def read_csv(text):
+    assert text.startswith("﻿")
+    return list(csv.reader(io.StringIO(text[1:])))
+
+
+def test_csv():
+    response = get_export()
+    assert response["statusCode"] == 200
+    assert response["headers"]["Content-Type"] == CONTENT_TYPES["csv"]
+    assert response["headers"]["Content-Disposition"] == (
+        'attachment; filename="group-1-attendance-2026-01-2026-02.csv"'
+    )
+    header, *rows = read_csv(response["body"])
+    assert header == ["Schedule date", "Member ID", "Member", "Joined", "Refund"]
+    assert len(rows) == 48
+    dates = [row[0] for row in rows]
+    assert dates == sorted(dates)
+
+
+def test_flask_streams_the_same_csv():
+    response = app.test_client().get(EXPORT_PATH, query_string=RANGE)
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.get_data(as_text=True) == get_export()["body"]
+
+
+def test_csv_gzip():
+    response = get_export("gzip")
+    assert response["headers"]["Content-Encoding"] == "gzip"
+    assert response["isBase64Encoded"] is True
+    body = gzip.decompress(base64.b64decode(response["body"])).decode()
+    assert body == get_export()["body"]
+
+
+def test_fee_rows():
+    response = get_export(rows="fees")
+    header, *rows = read_csv(response["body"])
+    assert header[0] == "Month"
+    assert {row[0] for row in rows} == {"2026-01", "2026-02"}
+
+
+def test_xlsx():
+    openpyxl = pytest.importorskip("openpyxl")
+    response = get_export(format="xlsx")
+    assert response["statusCode"] == 200
+    assert response["headers"]["Content-Type"] == CONTENT_TYPES["xlsx"]
+    assert response["isBase64Encoded"] is True
+    workbook = openpyxl.load_workbook(io.BytesIO(base64.b64decode(response["body"])))
+    sheet = workbook["Attendance"]
+    values = [
+        [str(value) for value in row] for row in sheet.iter_rows(values_only=True)
+    ]
+    csv_rows = read_csv(get_export()["body"])
+    assert values[0] == csv_rows[0]
+    assert len(values) == len(csv_rows)
+
+
+def test_xlsx_row_limit(monkeypatch):
+    pytest.importorskip("openpyxl")
+    monkeypatch.setattr(export, "EXPORT_XLSX_MAX_ROWS", 10)
+    response = get_export(format="xlsx")
+    assert response["statusCode"] == 413
+    assert "limited to 10 rows" in response["body"]
+
+    query = {**RANGE, "format": "xlsx"}
+    response = app.test_client().get(EXPORT_PATH, query_string=query)
+    assert response.status_code == 413
+    assert get_export()["statusCode"] == 200
+
+
+class Chunks:
+    """Export chunks that count how many were read."""
+
+    def __init__(self, chunk, count):
+        self.read = 0
+        self.closed = False
+        self._chunk = chunk
+        self._count = count
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.read == self._count:
+            raise StopIteration
+        self.read += 1
+        return self._chunk
+
+    def close(self):
+        self.closed = True
+
+
+def test_413_stops_reading_the_export(monkeypatch):
+    monkeypatch.setattr(api_utils, "LAMBDA_RESPONSE_MAX_BYTES", 5000)
+    chunks = Chunks(b"x" * 1000, 100)
+    response = make_export_response(Export("a.csv", CONTENT_TYPES["csv"], chunks))
+    assert response["statusCode"] == 413
+    assert (chunks.read, chunks.closed) == (6, True)
+
+
+def test_binary_size_is_checked_base64_encoded(monkeypatch):
+    monkeypatch.setattr(api_utils, "LAMBDA_RESPONSE_MAX_BYTES", 5000)
+    # 3900 bytes are 5200 once base64 encoded
+    chunks = Chunks(b"x" * 1300, 3)
+    response = make_export_response(Export("a.xlsx", CONTENT_TYPES["xlsx"], chunks))
+    assert response["statusCode"] == 413
+    assert chunks.closed
+
+    chunks = Chunks(b"x" * 1250, 3)
+    response = make_export_response(Export("a.xlsx", CONTENT_TYPES["xlsx"], chunks))
+    assert response["statusCode"] == 200
+    assert len(response["body"]) == 5000
+
+
+def test_compressed_size_is_checked(monkeypatch):
+    monkeypatch.setattr(api_utils, "LAMBDA_RESPONSE_MAX_BYTES", 5000)
+    chunks = Chunks(b"2026-01-07,1,Minh,True,0\n" * 40, 100)
+    response = make_export_response(
+        Export("a.csv", CONTENT_TYPES["csv"], chunks), "gzip"
+    )
+    assert response["statusCode"] == 200
+    assert chunks.read == 100
+    body = gzip.decompress(base64.b64decode(response["body"]))
+    assert len(body) == 100 * 40 * 25
@@ -0,0 +1,80 @@
+import pytest
+
+from src.common.exceptions import InvalidData
+from src.lambda_api.groups import lambda_handler
+from src.services.groups import MAX_REPORT_MONTHS, month_range
+from tests.utils import call
+
+
+def fee_report(from_year, from_month, to_year, to_month, group_id=None):
+    query = {
+        "fromYear": from_year,
+        "fromMonth": from_month,
+        "toYear": to_year,
+        "toMonth": to_month,
+        "groupId": group_id,
+    }
+    query = {name: str(value) for name, value in query.items() if value is not None}
+    return call(lambda_handler, "GET", "/api/groups/fees", query=query)
+
+
+def test_month_range_crosses_years():
+    assert month_range(2025, 11, 2026, 2) == [
+        "2025-11",
+        "2025-12",
+        "2026-01",
+        "2026-02",
+    ]
+
+
+def test_month_range_of_one_month():
+    assert month_range(2026, 12, 2026, 12) == ["2026-12"]
+
+
+def test_month_range_limit():
+    months = month_range(2017, 1, 2026, 12)
+    assert len(months) == MAX_REPORT_MONTHS == 120
+    assert (months[0], months[-1]) == ("2017-01", "2026-12")
+    with pytest.raises(InvalidData, match="120 months"):
+        month_range(2016, 12, 2026, 12)
+
+
+@pytest.mark.parametrize(
+    "bounds, message",
+    [
+        ((2026, 2, 2026, 1), "must not end before it starts"),
+        ((2026, 0, 2026, 1), "range 1..12"),
+        ((2026, 1, 2026, 13), "range 1..12"),
+        ((2026, None, 2026, 1), "are required"),
+    ],
+)
+def test_invalid_ranges_answer_400(bounds, message):
+    status, body = fee_report(*bounds)
+    assert status == 400
+    assert message in body["message"]
+
+
+def test_report_months_match_the_month_fees():
+    status, body = fee_report(2025, 12, 2026, 2, group_id=1)
+    assert status == 200
+    (group,) = body["data"]
+    assert group["groupId"] == 1
+    months = [(month["year"], month["month"]) for month in group["months"]]
+    assert months == [(2025, 12), (2026, 1), (2026, 2)]
+    for month in group["months"]:
+        status, fees = call(
+            lambda_handler,
+            "GET",
+            f"/api/groups/1/fees/{month['year']}/{month['month']}",
+        )
+        assert status == 200
+        assert month["members"] == fees["data"]
+
+
+def test_report_of_all_groups():
+    status, body = fee_report(2026, 12, 2026, 12)
+    assert status == 200
+    assert [group["groupId"] for group in body["data"]] == [1, 2]
+    for group in body["data"]:
+        assert [month["month"] for month in group["months"]] == [12]
+        assert group["months"][0]["members"]
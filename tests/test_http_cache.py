@@ -0,0 +1,91 @@
+"""ETags of the read endpoints change with the data they depend on."""
+
+import sqlite3
+
+from flask_main import app
+from src.lambda_api.groups import lambda_handler
+from tests.conftest import DB_PATH
+from tests.utils import call, make_event
+
+FEES_PATH = "/api/groups/1/fees/2026/1"
+REPORT_QUERY = {"fromYear": "2026", "fromMonth": "1", "toYear": "2026", "toMonth": "2"}
+
+
+def get(path, etag=None, query=None):
+    headers = {"If-None-Match": etag} if etag else None
+    return lambda_handler(make_event("GET", path, query, headers=headers), None)
+
+
+def group_attendance_id(group_id):
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        return conn.execute(
+            """
+            SELECT a.id FROM attendance AS a
+            JOIN schedules AS s ON s.id = a.schedule_id
+            WHERE s.group_id = ?
+            ORDER BY a.id
+            """,
+            (group_id,),
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_matching_etag_answers_304():
+    response = get(FEES_PATH)
+    assert response["statusCode"] == 200
+    etag = response["headers"]["ETag"]
+
+    response = get(FEES_PATH, etag)
+    assert response["statusCode"] == 304
+    assert not response["body"]
+    assert response["headers"]["ETag"] == etag
+
+
+def test_write_to_the_group_changes_the_etag():
+    etag = get(FEES_PATH)["headers"]["ETag"]
+    attendance_id = group_attendance_id(1)
+    for joined in (False, True):
+        status, _ = call(
+            lambda_handler,
+            "PATCH",
+            f"/api/attendances/{attendance_id}",
+            body={"joined": joined},
+        )
+        assert status == 200
+
+        response = get(FEES_PATH, etag)
+        assert response["statusCode"] == 200
+        assert response["headers"]["ETag"] != etag
+        etag = response["headers"]["ETag"]
+
+
+def test_write_to_another_group_keeps_the_etag():
+    etag = get(FEES_PATH)["headers"]["ETag"]
+    report_etag = get("/api/groups/fees", query=REPORT_QUERY)["headers"]["ETag"]
+    status, body = call(
+        lambda_handler,
+        "POST",
+        "/api/schedules",
+        body={"groupId": 2, "scheduleDate": "2027-06-10T19:00:00"},
+    )
+    assert status == 200
+    status, _ = call(lambda_handler, "DELETE", f"/api/schedules/{body['scheduleId']}")
+    assert status == 200
+
+    assert get(FEES_PATH, etag)["statusCode"] == 304
+    # The all-groups report depends on every group
+    response = get("/api/groups/fees", report_etag, REPORT_QUERY)
+    assert response["statusCode"] == 200
+
+
+def test_flask_answers_304():
+    client = app.test_client()
+    response = client.get(FEES_PATH)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    response = client.get(FEES_PATH, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
@@ -0,0 +1,52 @@
+import datetime
+import json
+
+import pytest
+
+from flask_main import app
+from src.common import encoding
+
+BODY = {"name": "Nguyễn Văn A", "at": datetime.date(2026, 1, 5), "id": 1}
+
+
+@pytest.fixture(params=["orjson", "json"])
+def provider(request, monkeypatch):
+    if request.param == "json":
+        monkeypatch.setattr(encoding, "_orjson", None)
+    elif encoding._orjson is None:
+        pytest.skip("orjson is not installed")
+    for name in ("sort_keys", "compact", "ensure_ascii"):
+        monkeypatch.setattr(app.json, name, getattr(app.json, name))
+    return app.json
+
+
+def response_text(provider):
+    with app.app_context():
+        return provider.response(BODY).get_data(as_text=True)
+
+
+def test_defaults_match_the_lambda_responses(provider):
+    text = response_text(provider)
+    assert list(json.loads(text)) == ["name", "at", "id"]
+    assert "Nguyễn Văn A" in text
+    assert "2026" in json.loads(text)["at"]
+    assert "\n " not in text
+
+
+def test_sort_keys(provider):
+    provider.sort_keys = True
+    assert list(json.loads(response_text(provider))) == ["at", "id", "name"]
+
+
+def test_not_compact_is_indented(provider):
+    provider.compact = False
+    text = response_text(provider)
+    assert text.startswith('{\n  "name": ')
+    assert json.loads(text)["id"] == 1
+
+
+def test_ensure_ascii(provider):
+    provider.ensure_ascii = True
+    text = response_text(provider)
+    assert "Nguy\\u1ec5n" in text
+    assert json.loads(text)["name"] == BODY["name"]
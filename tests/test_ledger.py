@@ -0,0 +1,144 @@
+"""
+The refunds/bills ledger is maintained by triggers (migration 0004_fee_ledger).
+After every kind of write it must equal LedgerRepo.rebuild() from scratch.
+
+Rows whose figures are all zero bill nothing and are not compared: the
+triggers leave them behind after deletes, rebuild() creates them for months
+without refunds.
+"""
+
+import sqlite3
+
+from src.data_repo.ledger_repo import LedgerRepo
+from src.lambda_api.schedules import lambda_handler
+from tests.conftest import DB_PATH
+from tests.utils import call
+
+
+def read_ledger(conn):
+    refunds = conn.execute(
+        "SELECT member_id, month, total_refund FROM refunds WHERE total_refund <> 0"
+    )
+    bills = conn.execute(
+        """
+        SELECT member_id, month, schedule_count, total_refund FROM bills
+        WHERE schedule_count <> 0 OR total_refund <> 0
+        """
+    )
+    return sorted(refunds), sorted(bills)
+
+
+def read_versions(conn, scopes):
+    versions = dict.fromkeys(scopes, 0)
+    for scope in scopes:
+        row = conn.execute(
+            "SELECT version FROM data_versions WHERE scope = ?", (scope,)
+        ).fetchone()
+        if row is not None:
+            versions[scope] = row[0]
+    return versions
+
+
+def assert_ledger_matches_rebuild():
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        ledger = read_ledger(conn)
+        conn.execute("BEGIN")
+        LedgerRepo(conn).rebuild()
+        rebuilt = read_ledger(conn)
+        conn.rollback()
+    finally:
+        conn.close()
+    assert ledger == rebuilt
+
+
+def first_attendance_ids(count):
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        rows = conn.execute("SELECT id FROM attendance ORDER BY id LIMIT ?", (count,))
+        return [row[0] for row in rows]
+    finally:
+        conn.close()
+
+
+def test_ledger_matches_rebuild_initially():
+    assert_ledger_matches_rebuild()
+
+
+def test_patch_attendance():
+    attendance_id = first_attendance_ids(1)[0]
+    for joined in (False, True, False):
+        status, _ = call(
+            lambda_handler,
+            "PATCH",
+            f"/api/attendances/{attendance_id}",
+            body={"joined": joined},
+        )
+        assert status == 200
+        assert_ledger_matches_rebuild()
+
+
+def test_patch_attendances():
+    changes = [
+        {"attendanceId": attendance_id, "joined": index % 2 == 0}
+        for index, attendance_id in enumerate(first_attendance_ids(6))
+    ]
+    status, _ = call(
+        lambda_handler, "PATCH", "/api/attendances", body={"changes": changes}
+    )
+    assert status == 200
+    assert_ledger_matches_rebuild()
+
+
+def test_create_and_delete_schedules():
+    status, body = call(
+        lambda_handler,
+        "POST",
+        "/api/schedules",
+        body={"groupId": 1, "scheduleDate": "2027-03-10T19:00:00"},
+    )
+    assert status == 200
+    schedule_ids = [body["scheduleId"]]
+    assert_ledger_matches_rebuild()
+
+    status, body = call(
+        lambda_handler,
+        "POST",
+        "/api/schedules/recurring",
+        body={
+            "groupId": 2,
+            "startDate": "2027-04-01",
+            "endDate": "2027-05-31",
+            "frequency": "weekly",
+            "weekdays": [4],
+        },
+    )
+    assert status == 200
+    schedule_ids += [schedule["id"] for schedule in body["data"]["created"]]
+    assert_ledger_matches_rebuild()
+
+    for schedule_id in schedule_ids:
+        status, _ = call(lambda_handler, "DELETE", f"/api/schedules/{schedule_id}")
+        assert status == 200
+        assert_ledger_matches_rebuild()
+
+
+def test_rebuild_bumps_data_versions():
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        group_scopes = [
+            f"group:{row[0]}"
+            for row in conn.execute(
+                "SELECT DISTINCT group_id FROM members WHERE group_id IS NOT NULL"
+            )
+        ]
+        assert group_scopes
+        scopes = ["global"] + group_scopes
+        before = read_versions(conn, scopes)
+        conn.execute("BEGIN")
+        LedgerRepo(conn).rebuild()
+        after = read_versions(conn, scopes)
+        conn.rollback()
+    finally:
+        conn.close()
+    assert all(after[scope] == before[scope] + 1 for scope in scopes)
@@ -0,0 +1,105 @@
+"""The batch bills query returns what the per-member queries used to."""
+
+import sqlite3
+
+import pytest
+
+from flask_main import app
+from src.data_repo import member_repo
+from src.lambda_api.members import lambda_handler
+from tests.conftest import DB_PATH
+from tests.utils import call
+
+
+@pytest.fixture(autouse=True)
+def january(monkeypatch):
+    # February's bills carry January's refunds
+    monkeypatch.setattr(member_repo, "current_month", lambda: (2026, 1))
+
+
+def old_member_detail(conn, member_id):
+    """The member detail as it was computed before, with one query per part."""
+    member_id, nickname, group_id, gender, member_fee = conn.execute(
+        """
+        SELECT members.id, nickname, group_id, gender, member_fee
+        FROM members JOIN users ON members.user_id = users.id
+        WHERE members.id = ?
+        """,
+        (member_id,),
+    ).fetchone()
+    bill_row = conn.execute(
+        """
+        SELECT schedule_count, total_refund FROM bills
+        WHERE member_id = ? AND month = ?
+        """,
+        (member_id, "2026-02"),
+    ).fetchone()
+    schedule_count, refund = bill_row if bill_row else (0, 0)
+    estimated_bill = member_fee * schedule_count - refund
+    return {
+        "id": member_id,
+        "nickname": nickname,
+        "groupId": group_id,
+        "gender": gender,
+        "memberFee": member_fee,
+        "currentMonthRefund": refund,
+        "estimatedBillNextMonth": estimated_bill if estimated_bill > 0 else 0,
+    }
+
+
+def group_member_ids(group_id):
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        rows = conn.execute(
+            "SELECT id FROM members WHERE group_id = ? ORDER BY id", (group_id,)
+        )
+        return [row[0] for row in rows]
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("group_id", [1, 2])
+def test_group_bills_match_the_per_member_queries(group_id):
+    member_ids = group_member_ids(group_id)
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        expected = [old_member_detail(conn, member_id) for member_id in member_ids]
+    finally:
+        conn.close()
+
+    status, body = call(
+        lambda_handler, "GET", "/api/members/bills", query={"groupId": str(group_id)}
+    )
+    assert status == 200
+    assert body["data"] == expected
+
+    for member in expected:
+        status, body = call(lambda_handler, "GET", f"/api/members/{member['id']}")
+        assert (status, body["data"]) == (200, member)
+
+
+def test_refunds_of_the_current_month_are_billed():
+    status, body = call(
+        lambda_handler, "GET", "/api/members/bills", query={"groupId": "1"}
+    )
+    assert status == 200
+    assert any(member["currentMonthRefund"] for member in body["data"])
+
+
+def test_bills_of_ids_leave_unknown_ids_out():
+    ids = group_member_ids(1)[:2]
+    status, body = call(
+        lambda_handler,
+        "GET",
+        "/api/members/bills",
+        query={"ids": f"{ids[1]},999999,{ids[0]}"},
+    )
+    assert status == 200
+    assert [member["id"] for member in body["data"]] == ids
+
+
+@pytest.mark.parametrize("query", [{}, {"groupId": "1", "ids": "1"}, {"ids": "1,two"}])
+def test_invalid_bills_queries_answer_400(query):
+    response = app.test_client().get("/api/members/bills", query_string=query)
+    assert response.status_code == 400
+    assert response.get_json()["message"]
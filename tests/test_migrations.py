@@ -0,0 +1,94 @@
+import shutil
+import sqlite3
+
+import pytest
+
+from src.common.migrations import (
+    apply_migration,
+    apply_migrations,
+    get_schema_version,
+    latest_schema,
+    list_migrations,
+)
+from src.lambda_api import efs_handler
+from tests.conftest import RESOURCES_DIR
+
+VERSIONS = [version for version, _ in list_migrations()]
+
+
+def read_schema(conn):
+    return sorted(
+        conn.execute(
+            "SELECT type, name, sql FROM sqlite_master"
+            " WHERE name NOT LIKE 'sqlite_stat%'"
+        )
+    )
+
+
+@pytest.fixture
+def empty_db(tmp_path):
+    conn = sqlite3.connect(tmp_path / "empty.db")
+    yield conn
+    conn.close()
+
+
+def test_migrations_apply_to_an_empty_database(empty_db):
+    assert apply_migrations(empty_db) == VERSIONS
+    assert get_schema_version(empty_db) == VERSIONS[-1]
+
+
+def test_migrations_applied_twice_are_a_no_op(empty_db):
+    apply_migrations(empty_db)
+    schema = read_schema(empty_db)
+
+    assert apply_migrations(empty_db) == []
+    assert get_schema_version(empty_db) == VERSIONS[-1]
+    assert read_schema(empty_db) == schema
+
+
+def test_migrations_resume_from_a_target(empty_db):
+    assert apply_migrations(empty_db, target=VERSIONS[2]) == VERSIONS[:3]
+    assert apply_migrations(empty_db) == VERSIONS[3:]
+
+
+def test_applied_migration_is_skipped(empty_db):
+    apply_migrations(empty_db)
+    version, path = list_migrations()[-1]
+    assert apply_migration(empty_db, version, path) is False
+
+
+def test_shipped_database_is_up_to_date(tmp_path):
+    db_path = tmp_path / "feeminton.db"
+    shutil.copyfile(f"{RESOURCES_DIR}/feeminton.db", db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        assert apply_migrations(conn) == []
+    finally:
+        conn.close()
+
+
+def test_ddl_is_the_migrated_schema(empty_db):
+    with open(f"{RESOURCES_DIR}/ddl.sql", encoding="utf-8") as file:
+        ddl = file.read()
+    assert ddl == latest_schema(), "regenerate resources/ddl.sql"
+
+    migrated = sqlite3.connect(":memory:")
+    apply_migrations(migrated)
+    empty_db.executescript(ddl)
+    assert read_schema(empty_db) == read_schema(migrated)
+    assert get_schema_version(empty_db) == VERSIONS[-1]
+
+
+def test_run_ddl_creates_the_migrated_schema(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "new.db")
+    sqlite3.connect(db_path).close()
+    monkeypatch.setattr(efs_handler, "SQLITE_PATH", db_path)
+    efs_handler.run_ddl()
+
+    conn = sqlite3.connect(db_path)
+    try:
+        assert get_schema_version(conn) == VERSIONS[-1]
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
+        assert {"schedules", "bills", "refunds", "data_versions"} <= tables
+    finally:
+        conn.close()
@@ -0,0 +1,55 @@
+"""Cached repo queries are reused until a write bumps the tables they read."""
+
+import sqlite3
+
+import pytest
+
+from src.common.query_cache import query_cache
+from src.data_repo.schedule_repo import ScheduleRepo
+from src.lambda_api.schedules import lambda_handler
+from tests.conftest import DB_PATH
+from tests.utils import call
+
+RANGE = (2, "2027-08-01", "2027-09-01")
+
+
+@pytest.fixture
+def conn():
+    query_cache.clear()
+    conn = sqlite3.connect(DB_PATH)
+    yield conn
+    conn.close()
+
+
+def lookups():
+    return query_cache.hits, query_cache.misses
+
+
+def test_result_is_reused_while_unchanged(conn):
+    hits, misses = lookups()
+    first = ScheduleRepo(conn).get_schedules_in_range(*RANGE)
+    first.append({"id": 0})
+    second = ScheduleRepo(conn).get_schedules_in_range(*RANGE)
+    assert second == []
+    assert lookups() == (hits + 1, misses + 1)
+
+
+def test_write_invalidates_the_result(conn):
+    assert ScheduleRepo(conn).get_schedules_in_range(*RANGE) == []
+    status, body = call(
+        lambda_handler,
+        "POST",
+        "/api/schedules",
+        body={"groupId": 2, "scheduleDate": "2027-08-12T19:00:00"},
+    )
+    assert status == 200
+    schedule_id = body["scheduleId"]
+
+    hits, misses = lookups()
+    schedules = ScheduleRepo(conn).get_schedules_in_range(*RANGE)
+    assert [schedule["id"] for schedule in schedules] == [schedule_id]
+    assert lookups() == (hits, misses + 1)
+
+    status, _ = call(lambda_handler, "DELETE", f"/api/schedules/{schedule_id}")
+    assert status == 200
+    assert ScheduleRepo(conn).get_schedules_in_range(*RANGE) == []
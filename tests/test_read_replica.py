@@ -0,0 +1,64 @@
+import shutil
+import sqlite3
+
+import pytest
+
+from src.common.db_connection import ConnectionManager
+from tests.conftest import DB_PATH
+
+GROUP_NAME = "SELECT name FROM groups WHERE id = 1"
+
+
+@pytest.fixture(params=["memory", "tmp"])
+def manager(request, tmp_path, monkeypatch):
+    db_path = str(tmp_path / "primary.db")
+    shutil.copyfile(DB_PATH, db_path)
+    manager = ConnectionManager(db_path, replica_mode=request.param)
+    monkeypatch.setattr(manager._replica, "_replica_dir", str(tmp_path))
+    refreshes = []
+    refresh = manager._replica._refresh
+    monkeypatch.setattr(
+        manager._replica,
+        "_refresh",
+        lambda primary, replica: refreshes.append(1) or refresh(primary, replica),
+    )
+    manager.refreshes = refreshes
+    manager.db_path = db_path
+    yield manager
+    manager.close()
+
+
+def read_group_name(manager):
+    conn = manager.get_read_connection()
+    try:
+        assert conn is not manager.get_connection()
+        return conn.execute(GROUP_NAME).fetchone()[0]
+    finally:
+        manager.release(conn)
+
+
+def test_replica_is_reused_while_unchanged(manager):
+    name = read_group_name(manager)
+    assert read_group_name(manager) == name
+    assert len(manager.refreshes) == 1
+
+
+def test_replica_refreshes_after_write_of_another_connection(manager):
+    read_group_name(manager)
+    other = sqlite3.connect(manager.db_path)
+    with other:
+        other.execute("UPDATE groups SET name = 'Renamed elsewhere' WHERE id = 1")
+    other.close()
+
+    assert read_group_name(manager) == "Renamed elsewhere"
+    assert len(manager.refreshes) == 2
+
+
+def test_replica_refreshes_after_own_write(manager):
+    read_group_name(manager)
+    primary = manager.get_connection()
+    with primary:
+        primary.execute("UPDATE groups SET name = 'Renamed here' WHERE id = 1")
+
+    assert read_group_name(manager) == "Renamed here"
+    assert len(manager.refreshes) == 2
@@ -0,0 +1,38 @@
+"""Invalid recurrence rules answer 400 with a message, on Lambda and on Flask."""
+
+import pytest
+
+from flask_main import app
+from src.lambda_api.schedules import lambda_handler
+from tests.utils import call
+
+RULE = {
+    "groupId": 1,
+    "startDate": "2027-01-01",
+    "endDate": "2027-01-31",
+    "frequency": "weekly",
+    "weekdays": [2],
+}
+
+CASES = [
+    # Errors of the rule's model validator have no field
+    ({**RULE, "endDate": "2026-12-01"}, "Value error, endDate must be >= startDate"),
+    ({**RULE, "weekdays": [7]}, "Value error, weekdays must be in the range 0..6"),
+    (
+        {key: value for key, value in RULE.items() if key != "groupId"},
+        "groupId Field required",
+    ),
+]
+
+
+@pytest.mark.parametrize("body, message", CASES)
+def test_lambda_answers_400(body, message):
+    result = call(lambda_handler, "POST", "/api/schedules/recurring", body=body)
+    assert result == (400, {"message": message})
+
+
+@pytest.mark.parametrize("body, message", CASES)
+def test_flask_answers_400(body, message):
+    response = app.test_client().post("/api/schedules/recurring", json=body)
+    assert response.status_code == 400
+    assert response.get_json() == {"message": message}
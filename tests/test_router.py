@@ -0,0 +1,94 @@
+import pytest
+
+from src.common.exceptions import InvalidData, MethodNotAllowed, NotFound
+from src.common.router import Router
+from src.lambda_api.schedules import lambda_handler
+from tests.utils import call, make_event
+
+
+def echo(**kwargs):
+    return kwargs
+
+
+def recent(**kwargs):
+    return "recent"
+
+
+@pytest.fixture
+def router():
+    router = Router()
+    router.add("GET", "/api/items", echo, query_types={"limit": int})
+    router.add("POST", "/api/items", echo, body_arg="item")
+    router.add("GET", "/api/items/{item_id}", echo, path_types={"item_id": int})
+    router.add("DELETE", "/api/items/{item_id}", echo, path_types={"item_id": int})
+    router.add("GET", "/api/items/recent", recent)
+    router.add("PATCH", "/api/items/{item_id}/tags", echo)
+    return router
+
+
+def test_path_parameters_are_converted(router):
+    kwargs = router.dispatch(make_event("GET", "/api/items/7"))
+    assert kwargs == {"item_id": 7, "if_none_match": None}
+
+
+def test_resource_template_is_used_when_present(router):
+    event = {
+        **make_event("DELETE", "/api/items/7"),
+        "resource": "/api/items/{item_id}",
+        "pathParameters": {"item_id": "7"},
+    }
+    assert router.dispatch(event) == {"item_id": 7}
+
+
+def test_literal_segments_win_over_parameters(router):
+    assert router.dispatch(make_event("GET", "/api/items/recent")) == "recent"
+
+
+def test_trailing_slash_is_accepted(router):
+    assert router.dispatch(make_event("GET", "/api/items/7/"))["item_id"] == 7
+
+
+def test_query_parameters_are_converted(router):
+    kwargs = router.dispatch(make_event("GET", "/api/items", query={"limit": "5"}))
+    assert kwargs["limit"] == 5
+
+
+def test_body_fields_and_body_arg(router):
+    body = {"name": "shuttlecocks"}
+    assert router.dispatch(make_event("POST", "/api/items", body=body)) == {
+        "item": body
+    }
+    kwargs = router.dispatch(make_event("PATCH", "/api/items/7/tags", body=body))
+    assert kwargs == {"name": "shuttlecocks", "item_id": "7"}
+
+
+@pytest.mark.parametrize(
+    "event",
+    [
+        make_event("GET", "/api/items/abc"),
+        make_event("GET", "/api/items", query={"limit": "many"}),
+    ],
+)
+def test_type_errors_are_invalid_data(router, event):
+    with pytest.raises(InvalidData):
+        router.dispatch(event)
+
+
+def test_unknown_path_is_not_found(router):
+    with pytest.raises(NotFound):
+        router.dispatch(make_event("GET", "/api/other"))
+
+
+def test_wrong_method_is_not_allowed(router):
+    with pytest.raises(MethodNotAllowed) as error:
+        router.dispatch(make_event("PUT", "/api/items/7"))
+    assert error.value.allowed == ["GET", "DELETE"]
+
+
+def test_handler_status_codes():
+    assert call(lambda_handler, "GET", "/api/unknown")[0] == 404
+    assert call(lambda_handler, "GET", "/api/schedules/abc")[0] == 400
+
+    response = lambda_handler(make_event("PUT", "/api/schedules/1"), None)
+    assert response["statusCode"] == 405
+    assert response["headers"]["Allow"] == "GET, DELETE"
@@ -0,0 +1,54 @@
+"""The SQL profile of a request is written whether or not tracing is enabled."""
+
+import json
+import sqlite3
+
+import pytest
+
+from src.common import sql_profiler, tracing
+from tests.conftest import DB_PATH
+from tests.utils import make_event
+
+
+@pytest.fixture
+def conn(monkeypatch):
+    monkeypatch.setattr(sql_profiler, "SQL_PROFILER_ENABLED", True)
+    conn = sqlite3.connect(DB_PATH, factory=sql_profiler.ProfiledConnection)
+    yield conn
+    conn.close()
+
+
+def profile_records(capsys):
+    lines = capsys.readouterr().out.splitlines()
+    records = [json.loads(line) for line in lines if line.startswith("{")]
+    return [record for record in records if record["type"] == "sql_profile"]
+
+
+def test_lambda_handler_profile_without_tracing(conn, capsys):
+    assert not tracing.TRACING_ENABLED
+
+    @sql_profiler.profile_request
+    def handler(event, context):
+        for member_id in range(1, 4):
+            conn.execute("SELECT id FROM members WHERE id = ?", (member_id,))
+        return {"statusCode": 200}
+
+    handler(make_event("GET", "/api/members"), None)
+    (record,) = profile_records(capsys)
+    assert record["route"] == "GET /api/members"
+    assert record["statementCount"] == 3
+    assert record["repeated"][0]["params"] == "(int)"
+    assert sql_profiler.get_request_profile() is None
+
+
+def test_statements_outside_a_request_are_not_collected(conn, capsys):
+    conn.execute("SELECT 1")
+    profile = sql_profiler.start_profile()
+    sql_profiler.finish_profile(profile, "GET /api/groups")
+    assert profile_records(capsys) == []
+
+
+def test_disabled_profiler_collects_nothing(capsys):
+    assert sql_profiler.start_profile() is None
+    sql_profiler.finish_profile(None, "GET /api/groups")
+    assert profile_records(capsys) == []
@@ -0,0 +1,22 @@
+import json
+
+
+def make_event(method, path, query=None, body=None, headers=None):
+    """
+    API Gateway proxy event of a request. Without a resource template the
+    router matches the path itself.
+    """
+    return {
+        "httpMethod": method,
+        "path": path,
+        "queryStringParameters": query,
+        "headers": headers or {},
+        "body": None if body is None else json.dumps(body),
+    }
+
+
+def call(handler, method, path, **kwargs):
+    """:return: (status code, decoded JSON body) of a Lambda handler"""
+    response = handler(make_event(method, path, **kwargs), None)
+    body = json.loads(response["body"]) if response["body"] else None
+    return response["statusCode"], body
@@ -121,25 +121,24 @@ document.getElementById('recurringForm').addEventListener('submit', async (evt)
   const month = Number(mStr);
   const days = daysInMonth(year, month);
 
-  // Build all ISO timestamps for selected DOWs in the month
-  const toCreate = [];
-  for (let day = 1; day <= days; day++) {
-    const d = new Date(year, month - 1, day);
-    const dow = d.getDay(); // 0=Sun..6=Sat
-    if (selectedDOW.includes(dow)) {
-      toCreate.push(buildISO(year, month, day, timeVal));
-    }
-  }
-
-  if (toCreate.length === 0) {
-    showAlert('info', 'No matching days in the selected month.');
-    return;
-  }
-
-  // Submit all (sequentially to keep server happy; switch to Promise.all if backend tolerates parallel)
+  // One request for the whole month; the server expands the rule and skips existing dates.
+  // Server weekdays are 0=Mon..6=Sun, JS getDay() is 0=Sun..6=Sat.
   try {
-    for (const iso of toCreate) {
-      await postSchedule(iso, groupIdVal);
+    const res = await fetch(API.join('/schedules/recurring'), {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        groupId: Number(groupIdVal),
+        startDate: `${yStr}-${mStr}-01`,
+        endDate: `${yStr}-${mStr}-${String(days).padStart(2, '0')}`,
+        frequency: 'weekly',
+        weekdays: selectedDOW.map(dow => (dow + 6) % 7),
+        time: timeVal,
+      }),
+    });
+    if (!res.ok) {
+      const text = await res.text().catch(() => '');
+      throw new Error(`Failed to create schedules: ${res.status} ${res.statusText}${text ? ' - ' + text : ''}`);
     }
     // Success → back to schedules page
     window.location.href = API.link(`schedules.html?groupId=${encodeURIComponent(groupId)}&groupName=${encodeURIComponent(groupName)}&year=${encodeURIComponent(year)}&month=${encodeURIComponent(month)}`);